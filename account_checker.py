@@ -11,9 +11,11 @@ import argparse
 from typing import List, Dict, Any
 import s4
 import s4.clarity
-import keyring
 import traceback
 from openpyxl import load_workbook
+from clarity_servers import api_url
+from credentials import get_secret
+from lims_cassette import RECORD, REPLAY, use_cassette
 
 
 class ExcelParser:
@@ -131,11 +133,16 @@ def main():
         epilog="""
 Examples:
   python account_checker.py data.xlsx
+  python account_checker.py data.xlsx --record accounts.cassette   # keep every LIMS response
+  python account_checker.py data.xlsx --replay accounts.cassette   # re-run offline from them
         """,
     )
 
     parser.add_argument("filename", help="Excel (.xlsx) file to parse")
     parser.add_argument("--unknown", "-u", action="store_true", help="Manually process unknown accounts")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="CASSETTE", help="Record every LIMS call to a cassette file")
+    cassette.add_argument("--replay", metavar="CASSETTE", help="Replay LIMS calls from a cassette instead of the server")
 
     args = parser.parse_args()
 
@@ -202,10 +209,13 @@ Examples:
 
         # account settings
         username = "bgriffiths"
-        password = keyring.get_password(f"clarity-{server}", username)
+        password = None if args.replay else get_secret(f"clarity-{server}", username)
 
         # lims object
-        lims = s4.clarity.LIMS(f"https://clarity-{server}.btolims.com/api/v2/", username, password)
+        lims = s4.clarity.LIMS(api_url(server), username, password)
+        if args.record or args.replay:
+            cassette = use_cassette(lims, args.record or args.replay, RECORD if args.record else REPLAY, username)
+            print(f"{'Recording to' if args.record else 'Replaying from'} {cassette.path}")
         print(f'API version: {lims.versions[0]["major"]}')
 
         # load all accounts
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+API Permission Sweep
+====================
+Which /api/v2 resources can an account read and write?
+
+permissions_API_login only shows that the API can be reached. The sweep
+probes every resource below with GET, PUT and POST as the TEST account (or
+any stored account), all at the same time over one pooled session, and
+prints a resource x verb matrix:
+
+  GET   list the resource
+  PUT   write an existing entity back unchanged (nothing is modified)
+  POST  create a new entity; whatever gets created is deleted again with
+        the MASTER account
+
+Each cell is one of:
+  allowed   2xx
+  denied    401/403
+  rejected  another 4xx: not refused for permissions, but the payload was
+            (e.g. a sample without a container, a built-in role)
+  n/a       the API has no such operation (404/405)
+  error     5xx or the request failed
+
+Samples and processes are POSTed without location or inputs on purpose:
+a permitted account gets "rejected" instead of a real sample or process,
+which the API could not delete again.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from api_probes import ProbeContext, control_type_xml, project_xml, reagent_kit_xml, researcher_xml, role_xml
+from clarity_api import ClarityAPI, list_uris, xml_escape
+from clarity_servers import SERVER_NAMES
+
+DEFAULT_WORKERS = 16
+RESULTS_DIR = "test_results/api_matrix"
+VERBS = ("GET", "PUT", "POST")
+
+# resource path -> element tag in its list response
+RESOURCES = {
+    "researchers": "researcher",
+    "roles": "role",
+    "projects": "project",
+    "samples": "sample",
+    "artifacts": "artifact",
+    "processes": "process",
+    "controltypes": "control-type",
+    "reagentkits": "reagent-kit",
+}
+
+
+def classify(status_code):
+    """Matrix cell for an HTTP status code."""
+    if 200 <= status_code < 300:
+        return "allowed"
+    if status_code in (401, 403):
+        return "denied"
+    if status_code in (404, 405):
+        return "n/a"
+    if 400 <= status_code < 500:
+        return "rejected"
+    return "error"
+
+
+def sample_xml(name, project_uri):
+    # No location: enough to pass a permission check, never enough to create a sample
+    return (
+        '<smp:samplecreation xmlns:smp="http://genologics.com/ri/sample">'
+        f"<name>{xml_escape(name)}</name>"
+        f'<project uri="{xml_escape(project_uri)}"/>'
+        "</smp:samplecreation>"
+    )
+
+
+def process_xml(name):
+    return '<prx:process xmlns:prx="http://genologics.com/ri/process"><type>Role Audit</type></prx:process>'
+
+
+def artifact_xml(name):
+    return f'<art:artifact xmlns:art="http://genologics.com/ri/artifact"><name>{xml_escape(name)}</name></art:artifact>'
+
+
+class ApiPermissionSweep:
+    """Resource x verb permission matrix for stored accounts."""
+
+    def __init__(self, server="dev", master_account="MASTER", workers=DEFAULT_WORKERS, resources=None):
+        """
+        Args:
+            server: Server environment
+            master_account: Stored account used to find entities and delete created ones
+            workers: Concurrent requests
+            resources: Resource paths to sweep (default: all of RESOURCES)
+        """
+        self.server = server
+        self.workers = workers
+        self.resources = list(resources or RESOURCES)
+        self.master_api = ClarityAPI.for_account(server, master_account, pool_size=workers)
+        self.run_id = time.strftime("%Y%m%d%H%M%S")
+        self._existing = {}  # resource -> (uri, xml) of an entity to PUT back
+
+    def _find_existing(self, resource):
+        """First entity of a resource and its XML, read with the MASTER account."""
+        uris = list_uris(self.master_api.get(resource), RESOURCES[resource])
+        if not uris:
+            return None
+        response = self.master_api.get(uris[0])
+        return (uris[0], response.text) if response.status_code == 200 else None
+
+    def _post_xml(self, ctx, resource):
+        name = ctx.name("sweep")
+        if resource == "researchers":
+            return researcher_xml(name, ctx.lab_uri())
+        if resource == "projects":
+            return project_xml(name, self._any_uri("researchers"))
+        if resource == "samples":
+            return sample_xml(name, self._any_uri("projects"))
+        builders = {
+            "roles": role_xml,
+            "artifacts": artifact_xml,
+            "processes": process_xml,
+            "controltypes": control_type_xml,
+            "reagentkits": reagent_kit_xml,
+        }
+        return builders[resource](name)
+
+    def _any_uri(self, resource):
+        existing = self._existing.get(resource) or self._find_existing(resource)
+        if not existing:
+            raise RuntimeError(f"Setup failed: no {resource} found")
+        return existing[0]
+
+    def _probe(self, api, resource, verb):
+        """
+        One request as the account under test.
+
+        Returns:
+            dict: {"resource", "verb", "status", "cell", "seconds", "error"}
+        """
+        ctx = ProbeContext(api, self.master_api, self.run_id)
+        start = time.time()
+        status, cell, error = None, "error", None
+        try:
+            if verb == "GET":
+                response = api.get(resource)
+            elif verb == "PUT":
+                existing = self._existing.get(resource)
+                if not existing:
+                    raise RuntimeError(f"no existing {resource} to update")
+                response = api.put(existing[0], existing[1])
+            else:
+                response = ctx.track(api.post(resource, self._post_xml(ctx, resource)))
+            status, cell = response.status_code, classify(response.status_code)
+            if cell == "error":
+                error = response.text[:200]
+        except Exception as e:
+            error = str(e)
+        finally:
+            leftovers = ctx.rollback()
+        if leftovers:
+            print(f"  Warning: could not delete {', '.join(leftovers)}")
+        return {
+            "resource": resource,
+            "verb": verb,
+            "status": status,
+            "cell": cell,
+            "seconds": round(time.time() - start, 2),
+            "error": error,
+        }
+
+    def run(self, account="TEST"):
+        """
+        Sweep every resource and verb for one account concurrently.
+
+        Returns:
+            dict: resource -> verb -> probe result
+        """
+        api = ClarityAPI.for_account(self.server, account, pool_size=self.workers)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                missing = [r for r in self.resources if r not in self._existing]
+                for resource, existing in zip(missing, pool.map(self._find_existing, missing)):
+                    self._existing[resource] = existing
+                probes = [(r, v) for r in self.resources for v in VERBS]
+                results = list(pool.map(lambda rv: self._probe(api, *rv), probes))
+        finally:
+            api.close()
+
+        matrix = {}
+        for result in results:
+            matrix.setdefault(result["resource"], {})[result["verb"]] = result
+        return matrix
+
+    def close(self):
+        self.master_api.close()
+
+
+def print_matrix(account, matrix):
+    """Print a resource x verb table."""
+    print("=" * 80)
+    print(f"API PERMISSIONS: {account}")
+    print("=" * 80)
+    print(f"{'Resource':<16}" + "".join(f"{verb:<12}" for verb in VERBS))
+    print("-" * 80)
+    for resource, verbs in matrix.items():
+        print(f"{resource:<16}" + "".join(f"{verbs[verb]['cell']:<12}" for verb in VERBS))
+    errors = [r for verbs in matrix.values() for r in verbs.values() if r["error"]]
+    for result in errors:
+        print(f"  ⚠ {result['verb']} {result['resource']}: {result['error']}")
+
+
+def save_matrix(server, matrices):
+    """Save {account: matrix} to test_results/api_matrix/ and return the path."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"api_matrix_{server}_{timestamp}.json")
+    with open(path, "w") as f:
+        json.dump({"server": server, "timestamp": timestamp, "accounts": matrices}, f, indent=2)
+    return path
+
+
+def main():
+    """Sweep the API permissions of stored accounts."""
+    parser = argparse.ArgumentParser(
+        description="Resource x verb API permission matrix for stored accounts",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python api_permission_sweep.py                           # TEST account, all resources
+  python api_permission_sweep.py --resources samples artifacts
+  python api_permission_sweep.py --accounts TEST MASTER --server staging
+
+To check a role, give the TEST user only that role first:
+  python change_role.py "Emil" "Test" "BTO - API"
+"""
+    )
+    parser.add_argument("-s", "--server", default="dev", choices=SERVER_NAMES, help="Server environment (default: dev)")
+    parser.add_argument("--accounts", nargs="+", default=["TEST"], help="Stored accounts to sweep (default: TEST)")
+    parser.add_argument("--resources", nargs="+", choices=list(RESOURCES), help="Resources to sweep (default: all)")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Concurrent requests (default: {DEFAULT_WORKERS})")
+    args = parser.parse_args()
+
+    sweep = ApiPermissionSweep(args.server, workers=args.workers, resources=args.resources)
+    matrices = {}
+    try:
+        start = time.time()
+        for account in args.accounts:
+            matrix = sweep.run(account)
+            print_matrix(account, matrix)
+            matrices[account] = matrix
+    finally:
+        sweep.close()
+    probes = sum(len(verbs) for matrix in matrices.values() for verbs in matrix.values())
+    print(f"\n{probes} probe(s) in {time.time() - start:.1f}s")
+    print(f"Matrix saved to: {save_matrix(args.server, matrices)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+API Permission Probes
+=====================
+Decides CRUD permission tests through the REST API instead of the browser.
+
+Each probe attempts one operation (create, update or delete a control type,
+reagent kit, process type, researcher or role) as the TEST account:
+  - 2xx       the permission is granted (passed)
+  - 403       the permission is denied (not passed)
+  - other     the probe itself failed (error); 401 means TEST could not
+              authenticate to the API at all, which says nothing about the
+              CRUD permission
+
+Roles without API login get 401 on everything, so the runner checks once per
+combination that TEST can reach the API (can_use_api()) and otherwise runs
+the probed tests in the browser.
+
+Entities a probe needs (the victim of an update or delete) are created with
+the MASTER account first. Everything a probe created is deleted again with
+the MASTER account afterwards, whatever the outcome.
+
+Probes run concurrently in a thread pool and produce results in the same
+schema as RolePermissionTester, so the JSON and PDF reports are unchanged.
+"""
+
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from clarity_api import ClarityAPI, entity_uri, list_uris, xml_escape
+from clarity_servers import SERVER_NAMES
+from role_matrix import format_test_name, inspect_test_module
+
+DEFAULT_WORKERS = 4
+NAME_PREFIX = "role_audit"
+GRANTED = range(200, 300)
+DENIED = (403,)
+UNAUTHENTICATED = 401
+
+
+def control_type_xml(name, supplier="Role Audit"):
+    return (
+        '<ctrltp:control-type xmlns:ctrltp="http://genologics.com/ri/controltype" '
+        f'name="{xml_escape(name)}">'
+        f"<supplier>{xml_escape(supplier)}</supplier>"
+        "<catalogue-number>RA-0</catalogue-number>"
+        "<archived>false</archived>"
+        "</ctrltp:control-type>"
+    )
+
+
+def reagent_kit_xml(name, supplier="Role Audit"):
+    return (
+        '<kit:reagent-kit xmlns:kit="http://genologics.com/ri/reagentkit">'
+        f"<name>{xml_escape(name)}</name>"
+        f"<supplier>{xml_escape(supplier)}</supplier>"
+        "<catalogue-number>RA-0</catalogue-number>"
+        "<archived>false</archived>"
+        "</kit:reagent-kit>"
+    )
+
+
+def process_type_xml(name):
+    return (
+        '<ptp:process-type xmlns:ptp="http://genologics.com/ri/processtype" '
+        f'name="{xml_escape(name)}"/>'
+    )
+
+
+def project_xml(name, owner_uri):
+    return (
+        '<prj:project xmlns:prj="http://genologics.com/ri/project">'
+        f"<name>{xml_escape(name)}</name>"
+        f"<open-date>{date.today().isoformat()}</open-date>"
+        f'<researcher uri="{xml_escape(owner_uri)}"/>'
+        "</prj:project>"
+    )
+
+
+def role_xml(name):
+    return f'<role:role xmlns:role="http://genologics.com/ri/role" name="{xml_escape(name)}"/>'
+
+
+def researcher_xml(name, lab_uri, email="role.audit@example.com", username=None, password=None, role_uri=None):
+    """Researcher XML; with a username it is a (locked) user account with one role."""
+    credentials = ""
+    if username:
+        credentials = (
+            "<credentials>"
+            f"<username>{xml_escape(username)}</username>"
+            f"<password>{xml_escape(password or uuid.uuid4().hex)}</password>"
+            "<account-locked>true</account-locked>"
+            + (f'<role uri="{xml_escape(role_uri)}"/>' if role_uri else "")
+            + "</credentials>"
+        )
+    return (
+        '<res:researcher xmlns:res="http://genologics.com/ri/researcher">'
+        "<first-name>Role Audit</first-name>"
+        f"<last-name>{xml_escape(name)}</last-name>"
+        f"<email>{xml_escape(email)}</email>"
+        f'<lab uri="{xml_escape(lab_uri)}"/>'
+        f"{credentials}"
+        "</res:researcher>"
+    )
+
+
+class ProbeContext:
+    """What a probe needs: both API clients and a list of entities to roll back."""
+
+    def __init__(self, test_api, master_api, run_id):
+        self.test = test_api
+        self.master = master_api
+        self.run_id = run_id
+        self.created = []
+        self._lab_uri = None
+
+    def name(self, kind):
+        """Unique, recognizable name for a probe entity."""
+        return f"{NAME_PREFIX}_{kind}_{self.run_id}_{uuid.uuid4().hex[:6]}"
+
+    def track(self, response):
+        """Remember an entity created by a successful response for rollback."""
+        if response.status_code in GRANTED:
+            uri = entity_uri(response)
+            if uri:
+                self.created.append(uri)
+        return response
+
+    def create_as_master(self, path, xml):
+        """Create a victim entity with the MASTER account and return its URI."""
+        response = self.track(self.master.post(path, xml))
+        if response.status_code not in GRANTED or not self.created:
+            raise RuntimeError(f"Setup failed: POST {path} returned HTTP {response.status_code}")
+        return self.created[-1]
+
+    def lab_uri(self):
+        """Any lab, for researchers (which must belong to one)."""
+        if self._lab_uri is None:
+            labs = list_uris(self.master.get("labs"), "lab")
+            if not labs:
+                raise RuntimeError("Setup failed: no labs found")
+            self._lab_uri = labs[0]
+        return self._lab_uri
+
+    def rollback(self):
+        """
+        Delete everything created, newest first, with the MASTER account.
+
+        Returns:
+            list: URIs that could not be deleted
+        """
+        leftovers = []
+        for uri in reversed(self.created):
+            try:
+                response = self.master.delete(uri)
+                if response.status_code not in GRANTED and response.status_code != 404:
+                    leftovers.append(uri)
+            except Exception:
+                leftovers.append(uri)
+        self.created = []
+        return leftovers
+
+
+def _create_probe(path, build_xml, kind):
+    def probe(ctx):
+        return ctx.track(ctx.test.post(path, build_xml(ctx.name(kind))))
+    return probe
+
+
+def _update_probe(path, build_xml, kind):
+    def probe(ctx):
+        name = ctx.name(kind)
+        uri = ctx.create_as_master(path, build_xml(name))
+        return ctx.test.put(uri, build_xml(name + "_updated"))
+    return probe
+
+
+def _delete_probe(path, build_xml, kind):
+    def probe(ctx):
+        uri = ctx.create_as_master(path, build_xml(ctx.name(kind)))
+        return ctx.test.delete(uri)
+    return probe
+
+
+def _researcher_probe(action):
+    def probe(ctx):
+        name = ctx.name("user")
+        if action == "create":
+            return ctx.track(ctx.test.post("researchers", researcher_xml(name, ctx.lab_uri())))
+        uri = ctx.create_as_master("researchers", researcher_xml(name, ctx.lab_uri()))
+        if action == "update":
+            return ctx.test.put(uri, researcher_xml(name + "_updated", ctx.lab_uri()))
+        return ctx.test.delete(uri)
+    return probe
+
+
+# permissions_* module -> probe function taking a ProbeContext and returning
+# the response to the operation under test
+PROBES = {
+    "permissions_create_control": _create_probe("controltypes", control_type_xml, "control"),
+    "permissions_update_control": _update_probe("controltypes", control_type_xml, "control"),
+    "permissions_delete_control": _delete_probe("controltypes", control_type_xml, "control"),
+    "permissions_create_reagent_kit": _create_probe("reagentkits", reagent_kit_xml, "kit"),
+    "permissions_update_reagent_kit": _update_probe("reagentkits", reagent_kit_xml, "kit"),
+    "permissions_delete_reagent_kit": _delete_probe("reagentkits", reagent_kit_xml, "kit"),
+    "permissions_create_process": _create_probe("processtypes", process_type_xml, "process"),
+    "permissions_update_process": _update_probe("processtypes", process_type_xml, "process"),
+    "permissions_delete_process": _delete_probe("processtypes", process_type_xml, "process"),
+    "permissions_create_role": _create_probe("roles", role_xml, "role"),
+    "permissions_update_role": _update_probe("roles", role_xml, "role"),
+    "permissions_delete_role": _delete_probe("roles", role_xml, "role"),
+    "permissions_create_user": _researcher_probe("create"),
+    "permissions_update_user": _researcher_probe("update"),
+    "permissions_delete_user": _researcher_probe("delete"),
+}
+
+
+class ApiProbeEngine:
+    """Runs API probes for a suite concurrently and returns tester-style results."""
+
+    def __init__(self, server="dev", test_account="TEST", master_account="MASTER", workers=DEFAULT_WORKERS):
+        """
+        Args:
+            server: Server environment
+            test_account: Stored account whose roles are under test
+            master_account: Stored account used for setup and rollback
+            workers: Probes run at the same time
+        """
+        self.server = server
+        self.workers = workers
+        self.test_api = ClarityAPI.for_account(server, test_account, pool_size=workers)
+        self.master_api = ClarityAPI.for_account(server, master_account, pool_size=workers)
+        self.run_id = time.strftime("%Y%m%d%H%M%S")
+
+    def split_suite(self, suite):
+        """
+        Split a suite into the part probes can decide and the part that needs a browser.
+
+        Returns:
+            tuple: (api suite, browser suite), both module -> expected
+        """
+        api_suite = {m: e for m, e in suite.items() if isinstance(m, str) and m in PROBES}
+        browser_suite = {m: e for m, e in suite.items() if m not in api_suite}
+        return api_suite, browser_suite
+
+    def can_use_api(self):
+        """
+        True if the TEST account can authenticate to the API with its current roles.
+
+        Check it after every role change: without API login, every probe would
+        get 401 and say nothing about the permission it probes.
+        """
+        try:
+            response = self.test_api.get("")
+        except Exception as e:
+            print(f"  API check failed: {e}")
+            return False
+        return response.status_code in GRANTED
+
+    def run_suite(self, suite):
+        """
+        Run the probes for a suite concurrently.
+
+        Args:
+            suite: Dict of module -> expected outcome (modules without a probe are ignored)
+
+        Returns:
+            list: Result dicts in RolePermissionTester's schema, in suite order
+        """
+        api_suite = {m: e for m, e in suite.items() if m in PROBES}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.run_probe, m, e) for m, e in api_suite.items()]
+            return [future.result() for future in futures]
+
+    def run_probe(self, module_name, expected=True):
+        """Run one probe, roll back what it created, and return its result."""
+        test_name, _ = inspect_test_module(module_name)
+        test_name = test_name or format_test_name(module_name.replace("permissions_", "test_", 1))
+        ctx = ProbeContext(self.test_api, self.master_api, self.run_id)
+        start = time.time()
+        passed, status, error = False, "error", None
+        try:
+            response = PROBES[module_name](ctx)
+            if response.status_code in GRANTED:
+                passed = True
+            elif response.status_code == UNAUTHENTICATED:
+                raise RuntimeError("HTTP 401: the TEST account could not authenticate to the API")
+            elif response.status_code not in DENIED:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            status = "pass" if passed == expected else "fail"
+        except Exception as e:
+            error = str(e)
+        finally:
+            leftovers = ctx.rollback()
+        if leftovers:
+            print(f"  Warning: {test_name} probe could not delete: {', '.join(leftovers)}")
+
+        result = {
+            "test_name": test_name,
+            "description": f"Checks if role can {test_name.lower()} (API probe)",
+            "execution_time": round(time.time() - start, 1),
+            "expected": expected,
+            "passed": passed,
+            "result": status,
+            "error": error,
+            "screenshot": None,
+        }
+        mark = "✓" if status == "pass" else ("⚠" if status == "error" else "✗")
+        print(f"  {mark} {test_name} (API): {'allowed' if passed else 'denied'}"
+              f"{f' - {error}' if error else ''} ({result['execution_time']}s)")
+        return result
+
+    def close(self):
+        self.test_api.close()
+        self.master_api.close()
+
+
+def main():
+    """Probe permissions for the TEST account's current roles."""
+    parser = argparse.ArgumentParser(
+        description="Check CRUD permissions of the TEST account through the REST API",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python api_probes.py                                   # every probe
+  python api_probes.py permissions_create_control permissions_delete_user
+  python api_probes.py --server staging --workers 8
+"""
+    )
+    parser.add_argument("modules", nargs="*", help=f"Probes to run (default: all {len(PROBES)})")
+    parser.add_argument("-s", "--server", default="dev", choices=SERVER_NAMES, help="Server environment (default: dev)")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Concurrent probes (default: {DEFAULT_WORKERS})")
+    args = parser.parse_args()
+
+    unknown = [m for m in args.modules if m not in PROBES]
+    if unknown:
+        parser.error(f"No probe for: {', '.join(unknown)}")
+
+    engine = ApiProbeEngine(server=args.server, workers=args.workers)
+    try:
+        start = time.time()
+        results = engine.run_suite({m: True for m in (args.modules or PROBES)})
+    finally:
+        engine.close()
+    allowed = sum(1 for r in results if r["passed"])
+    errors = sum(1 for r in results if r["result"] == "error")
+    print(f"\n{len(results)} probe(s) in {time.time() - start:.1f}s: "
+          f"{allowed} allowed, {len(results) - allowed - errors} denied, {errors} error(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,186 @@
-import s4
-from s4 import clarity
+"""
+Change Role
+===========
+LIMS connections and role changes for the test user.
+
+Importing this module has no side effects: s4 and keyring are loaded on the
+first get_lims_connection() call, so helpers can be imported without
+touching the network.
+
+Run it directly to add or remove a role by hand:
+    python change_role.py "Emil" "Test" "Lab Operator (BTO)" --remove
+"""
+
+import argparse
 import os
 import time
-import keyring
-from s4.clarity import researcher, role
+import threading
+from clarity_servers import SERVER_NAMES, api_url
+from rate_limiter import throttle_lims
+from circuit_breaker import protect_lims
+from credentials import get_credentials
+
+
+CLARITY_SERVERS = {server: api_url(server) for server in SERVER_NAMES}
+
+# One LIMS connection (and its HTTP session) per (server, account) per process
+_connections = {}
+_connections_lock = threading.Lock()
+_connections_pid = os.getpid()
+_connection_stats = {"created": 0, "reused": 0}
+
+def get_lims_connection(account="MASTER", server="dev", fresh=False):
+    """
+    Login to Clarity API using stored credentials.
+    
+    The connection is cached per (server, account) and shared by every caller
+    in the process, so repeated calls reuse one authenticated LIMS object.
+    Pass fresh=True to replace the cached connection.
+    """
+    global _connections_pid
+    key = (server, account)
+    with _connections_lock:
+        if _connections_pid != os.getpid():
+            # Forked child: the parent's HTTP sockets must not be shared
+            _connections.clear()
+            _connection_stats.update(created=0, reused=0)
+            _connections_pid = os.getpid()
+        if key in _connections and not fresh:
+            _connection_stats["reused"] += 1
+            return _connections[key]
+        
+        import s4.clarity
+        from lims_cassette import REPLAY, cassette_username, env_cassette, use_cassette
+        
+        cassette = env_cassette()
+        if cassette and cassette[1] == REPLAY:
+            # Replays need no secrets: the cassette knows who each account recorded as
+            username, password = cassette_username(cassette[0], account), None
+        else:
+            username, password = get_credentials(account)
+        lims = s4.clarity.LIMS(CLARITY_SERVERS[server], username, password)
+        lims = protect_lims(throttle_lims(lims, server), server)
+        if cassette:
+            use_cassette(lims, *cassette, username=username, account=account)
+            print(f"Using cassette {cassette[0]} ({cassette[1]})")
+        print(f"Connected to {server} - API version: {lims.versions[0]['major']}")
+        _connections[key] = (lims, username)
+        _connection_stats["created"] += 1
+        return lims, username
 
+def connection_stats():
+    """How many LIMS connections this process created and reused."""
+    with _connections_lock:
+        return dict(_connection_stats)
+
+LOOKUP_TTL = 600  # seconds a cached role or researcher lookup stays valid
+
+class LookupCache:
+    """
+    Name-to-object cache for roles and researchers on one LIMS connection.
+    
+    Roles are cached by name; researchers by (first name, last name) and by
+    username. Entries expire after ttl seconds, and a researcher's entries
+    are dropped explicitly after changes to it are committed.
+    """
+    
+    def __init__(self, lims, ttl=LOOKUP_TTL):
+        self.lims = lims
+        self.ttl = ttl
+        self._roles = {}
+        self._researchers = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _get(self, table, key):
+        entry = table.get(key)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+    
+    def _put_researcher(self, user):
+        now = time.time()
+        self._researchers[("name", user.first_name, user.last_name)] = (user, now)
+        self._researchers[("username", user.username)] = (user, now)
+    
+    def role(self, role_name):
+        """Role object by name."""
+        with self._lock:
+            role_obj = self._get(self._roles, role_name)
+            if role_obj is None:
+                role_obj = self.lims.roles.get_by_name(role_name)
+                self._roles[role_name] = (role_obj, time.time())
+            return role_obj
+    
+    def researcher(self, first_name, last_name):
+        """Researcher object by first and last name."""
+        with self._lock:
+            user = self._get(self._researchers, ("name", first_name, last_name))
+            if user is None:
+                user = self.lims.researchers.query(firstname=[first_name], lastname=last_name)[0]
+                self._put_researcher(user)
+            return user
+    
+    def researcher_by_username(self, username):
+        """Researcher object by username."""
+        with self._lock:
+            user = self._get(self._researchers, ("username", username))
+            if user is None:
+                user = self.lims.researchers.query(username=username)[0]
+                self._put_researcher(user)
+            return user
+    
+    def prefetch_roles(self, role_names=None):
+        """Load roles in one request (all roles if role_names is None)."""
+        with self._lock:
+            now = time.time()
+            for role_obj in self.lims.roles.all():
+                if role_names is None or role_obj.name in role_names:
+                    self._roles[role_obj.name] = (role_obj, now)
+    
+    def prefetch_researchers(self, names):
+        """Load researchers by (first name, last name) with one query per last name."""
+        by_last_name = {}
+        for first_name, last_name in names:
+            by_last_name.setdefault(last_name, []).append(first_name)
+        with self._lock:
+            for last_name, first_names in by_last_name.items():
+                for user in self.lims.researchers.query(firstname=first_names, lastname=last_name):
+                    self._put_researcher(user)
+    
+    def invalidate_researcher(self, user):
+        """Drop every cached entry for a researcher, e.g. after committing changes to it."""
+        with self._lock:
+            for key in [k for k, (cached, _) in self._researchers.items() if cached.username == user.username]:
+                del self._researchers[key]
+    
+    def clear(self):
+        """Drop all cached lookups."""
+        with self._lock:
+            self._roles.clear()
+            self._researchers.clear()
+    
+    def stats(self):
+        """Lookup hit and miss counts."""
+        return {"hits": self.hits, "misses": self.misses}
 
-SERVICE_NAME = "role_audit_app"
-CLARITY_SERVERS = {
-    "prod": "https://billiontoone-prod.claritylims.com/api/v2",
-    "staging": "https://clarity-staging.btolims.com/api/v2",
-    "dev": "https://clarity-dev.btolims.com/api/v2"
-}
+_lookup_caches = {}
 
-def get_lims_connection(account="MASTER", server="dev"):
-    """Login to Clarity API using stored credentials."""
-    username = keyring.get_password(SERVICE_NAME, f"USERNAME_{account}")
-    password = keyring.get_password(SERVICE_NAME, username)
-    lims = s4.clarity.LIMS(CLARITY_SERVERS[server], username, password)
-    print(f"Connected to {server} - API version: {lims.versions[0]['major']}")
-    return lims, username
+def get_lookup_cache(lims):
+    """Shared LookupCache for a LIMS connection."""
+    with _connections_lock:
+        if id(lims) not in _lookup_caches or _lookup_caches[id(lims)].lims is not lims:
+            _lookup_caches[id(lims)] = LookupCache(lims)
+        return _lookup_caches[id(lims)]
 
 def modify_user_role(lims, user_firstname, user_lastname, role_name, action="add"):
     """Add or remove a role for a given user."""
-    user = lims.researchers.query(firstname=[user_firstname], lastname=user_lastname)[0]
-    role_obj = lims.roles.get_by_name(role_name)
+    lookups = get_lookup_cache(lims)
+    user = lookups.researcher(user_firstname, user_lastname)
+    role_obj = lookups.role(role_name)
     
     if action == "add":
         user.add_role(role_obj)
@@ -35,16 +191,68 @@ def modify_user_role(lims, user_firstname, user_lastname, role_name, action="add
     else:
         raise ValueError("Action must be 'add' or 'remove'")
     
-    user.commit()
+    try:
+        user.commit()
+    finally:
+        # The cached object holds the edited roles even if the commit failed
+        lookups.invalidate_researcher(user)
     return user
 
+def set_user_roles(lims, user_firstname, user_lastname, role_names):
+    """
+    Make the user's roles exactly role_names with a single commit.
+
+    Missing roles are added before extra roles are removed, so the user
+    always keeps at least one role.
+    """
+    lookups = get_lookup_cache(lims)
+    user = lookups.researcher(user_firstname, user_lastname)
+    target_roles = list(dict.fromkeys(role_names))
+    current_roles = [r.name for r in user.roles]
+    changed = False
+
+    for role_name in target_roles:
+        if role_name not in current_roles:
+            user.add_role(lookups.role(role_name))
+            print(f"Added role '{role_name}' to {user.username}")
+            changed = True
+
+    for r in list(user.roles):
+        if r.name not in target_roles:
+            user.remove_role(r)
+            print(f"Removed role '{r.name}' from {user.username}")
+            changed = True
+
+    if changed:
+        try:
+            user.commit()
+        finally:
+            # The cached object holds the edited roles even if the commit failed
+            lookups.invalidate_researcher(user)
+    else:
+        print(f"Roles for {user.username} already set: {', '.join(target_roles)}")
+    return user
+
+
+def main():
+    """Add or remove one role for a user."""
+    parser = argparse.ArgumentParser(description="Add or remove a Clarity role for a user")
+    parser.add_argument("firstname", help="First name of the user")
+    parser.add_argument("lastname", help="Last name of the user")
+    parser.add_argument("role", help='Role name, e.g. "Lab Operator (BTO)"')
+    parser.add_argument("--remove", action="store_true", help="Remove the role instead of adding it")
+    parser.add_argument("-s", "--server", default="dev", choices=SERVER_NAMES, help="Server environment (default: dev)")
+    parser.add_argument("-a", "--account", default="MASTER", help="Account name for credentials (default: MASTER)")
+    args = parser.parse_args()
 
-# Uncomment this to add or remove a role
-lims, username = get_lims_connection()
+    lims, username = get_lims_connection(account=args.account, server=args.server)
+    user = modify_user_role(lims, args.firstname, args.lastname, args.role,
+                            action="remove" if args.remove else "add")
 
-user = modify_user_role(lims, "Emil", "Test", "Lab Operator (BTO)", action="remove")
+    print(f"Current roles for {user.username}:")
+    for r in user.roles:
+        print(f"  - {r.name}")
 
-print(f"Current roles for {username}:")
-for r in user.roles:
-    print(f"  - {r.name}")
 
+if __name__ == "__main__":
+    main()
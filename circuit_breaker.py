@@ -0,0 +1,198 @@
+"""
+Circuit Breaker
+===============
+Stops a run from grinding through timeouts when a Clarity server goes down.
+
+The breaker for a server trips (opens) after a burst of connection errors or
+5xx responses. While it is open, anything that calls wait_until_closed()
+pauses. The breaker probes the server with a cheap unauthenticated request
+to the API root and closes again as soon as the server answers.
+
+States:
+  closed     Normal operation, failures are counted
+  open       Server considered down, callers wait
+  half-open  Probe in flight; one success closes the breaker
+"""
+
+import re
+import threading
+import time
+import urllib.error
+
+from clarity_servers import api_url
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+FAILURE_THRESHOLD = 5  # failures within FAILURE_WINDOW that trip the breaker
+FAILURE_WINDOW = 60.0  # seconds
+PROBE_INTERVAL = 15.0  # seconds between recovery probes, doubled up to MAX_PROBE_INTERVAL
+MAX_PROBE_INTERVAL = 300.0
+PROBE_TIMEOUT = 10.0
+
+# Error text that means the server could not be reached or failed, as opposed
+# to a permission being denied
+OUTAGE_PATTERNS = re.compile(
+    r"net::ERR_(CONNECTION|NAME_NOT_RESOLVED|INTERNET_DISCONNECTED|ADDRESS_UNREACHABLE|TIMED_OUT|EMPTY_RESPONSE)"
+    r"|Connection (refused|reset|aborted)|Max retries exceeded|Name or service not known"
+    r"|\b50[0234]\b.*(Server Error|Bad Gateway|Service Unavailable|Gateway Time-?out)",
+    re.IGNORECASE
+)
+
+
+def is_outage_error(error):
+    """True if an exception or error message points at the server being down."""
+    if error is None:
+        return False
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status >= 500
+    if isinstance(error, (ConnectionError, urllib.error.URLError)):
+        return True
+    return bool(OUTAGE_PATTERNS.search(str(error)))
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one Clarity server."""
+
+    def __init__(self, server, failure_threshold=FAILURE_THRESHOLD, failure_window=FAILURE_WINDOW,
+                 probe_interval=PROBE_INTERVAL):
+        """
+        Args:
+            server: Server name (dev, staging, prod, local)
+            failure_threshold: Failures within failure_window that open the breaker
+            failure_window: Seconds over which failures are counted
+            probe_interval: Initial seconds between recovery probes
+        """
+        self.server = server
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.probe_interval = probe_interval
+        self.state = CLOSED
+        self.opened_at = None
+        self.trips = 0
+        self.paused = 0.0
+        self._failures = []
+        self._lock = threading.RLock()
+
+    def record_success(self):
+        """Record a successful call."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._close()
+
+    def record_failure(self, error=None):
+        """Record a connection error or 5xx response; may open the breaker."""
+        now = time.time()
+        with self._lock:
+            if self.state == OPEN:
+                return
+            self._failures = [t for t in self._failures if now - t < self.failure_window]
+            self._failures.append(now)
+            if self.state == HALF_OPEN or len(self._failures) >= self.failure_threshold:
+                self._open(error)
+
+    def _open(self, error):
+        self.state = OPEN
+        self.opened_at = time.time()
+        self.trips += 1
+        self._failures = []
+        print("\n" + "!" * 80)
+        print(f"CIRCUIT OPEN: {self.server} looks down, pausing the run")
+        if error is not None:
+            print(f"Last error: {str(error).splitlines()[0][:200]}")
+        print("!" * 80)
+
+    def _close(self):
+        down_for = time.time() - self.opened_at if self.opened_at else 0
+        self.state = CLOSED
+        self.opened_at = None
+        self._failures = []
+        print(f"\nCIRCUIT CLOSED: {self.server} is responding again (down for {down_for:.0f}s), resuming")
+
+    def probe(self):
+        """
+        Cheap health check: an unauthenticated GET of the API root.
+
+        Any HTTP answer below 500 (including 401) means the server is up.
+        """
+        import urllib.request  # pulls in http.client and ssl; only needed while tripped
+
+        try:
+            with urllib.request.urlopen(api_url(self.server), timeout=PROBE_TIMEOUT) as response:
+                return response.status < 500
+        except urllib.error.HTTPError as e:
+            return e.code < 500
+        except Exception:
+            return False
+
+    def wait_until_closed(self):
+        """
+        Block while the breaker is open, probing until the server recovers.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.state == CLOSED:
+            return 0.0
+        start = time.time()
+        interval = self.probe_interval
+        with self._lock:
+            while self.state != CLOSED:
+                print(f"  Waiting {interval:.0f}s before probing {self.server}...")
+                time.sleep(interval)
+                self.state = HALF_OPEN
+                if self.probe():
+                    self._close()
+                else:
+                    print(f"  Probe failed, {self.server} still down")
+                    self.state = OPEN
+                    interval = min(interval * 2, MAX_PROBE_INTERVAL)
+        waited = time.time() - start
+        self.paused += waited
+        return waited
+
+    def stats(self):
+        """Trip count and total seconds paused, for the run summary."""
+        return {"server": self.server, "state": self.state, "trips": self.trips, "paused": round(self.paused, 1)}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(server):
+    """Shared CircuitBreaker for a server (one per process)."""
+    with _breakers_lock:
+        if server not in _breakers:
+            _breakers[server] = CircuitBreaker(server)
+        return _breakers[server]
+
+
+def protect_lims(lims, server):
+    """
+    Route every API call made through a LIMS connection via the server's breaker.
+
+    Calls wait while the breaker is open; connection errors and 5xx responses
+    count as failures.
+    """
+    breaker = get_circuit_breaker(server)
+    request = lims.request
+
+    def guarded_request(*args, **kwargs):
+        breaker.wait_until_closed()
+        try:
+            response = request(*args, **kwargs)
+        except Exception as e:
+            if is_outage_error(e):
+                breaker.record_failure(e)
+            raise
+        if getattr(response, "status_code", 200) >= 500:
+            breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            breaker.record_success()
+        return response
+
+    lims.request = guarded_request
+    return lims
@@ -0,0 +1,125 @@
+"""
+Clarity REST Client
+===================
+Thin client for the Clarity /api/v2 REST API over a pooled requests session.
+Used where s4.clarity's object model is more than needed: permission probes
+that only care whether an operation is allowed, and batched fixture setup
+and cleanup.
+
+Every request goes through the server's shared rate limiter and circuit
+breaker, like LIMS connections from change_role.
+"""
+
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from clarity_servers import api_url
+from rate_limiter import get_rate_limiter
+from circuit_breaker import get_circuit_breaker, is_outage_error
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_TIMEOUT = 60  # seconds per request
+XML_HEADERS = {"Content-Type": "application/xml", "Accept": "application/xml"}
+
+_URI_PATTERN = re.compile(r'<[\w:-]+[^>]*?\suri="([^"]+)"')
+
+
+class ClarityAPI:
+    """Authenticated, connection-pooled client for one server and account."""
+
+    def __init__(self, server, username, password, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        """
+        Args:
+            server: Server name (dev, staging, prod, local)
+            username: Clarity username
+            password: Clarity password
+            pool_size: Connections kept open for concurrent requests
+            timeout: Seconds before a request is abandoned
+        """
+        self.server = server
+        self.username = username
+        self.root = api_url(server)
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        self.session.headers.update(XML_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._limiter = get_rate_limiter(server)
+        self._breaker = get_circuit_breaker(server)
+
+    @classmethod
+    def for_account(cls, server="dev", account="TEST", **kwargs):
+        """Client for a stored account (see store_creds.py)."""
+        from credentials import get_credentials
+
+        username, password = get_credentials(account)
+        return cls(server, username, password, **kwargs)
+
+    def url(self, path):
+        """Absolute URI for a path relative to the API root (absolute URIs pass through)."""
+        if path.startswith("http"):
+            return path
+        return f"{self.root}/{path.lstrip('/')}"
+
+    def request(self, method, path, data=None, params=None):
+        """
+        Send a request and return the response, whatever its status.
+
+        Raises:
+            requests.RequestException: If the server could not be reached
+        """
+        self._breaker.wait_until_closed()
+        self._limiter.acquire()
+        start = time.time()
+        try:
+            response = self.session.request(
+                method, self.url(path), data=data, params=params, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            self._limiter.record(time.time() - start, error=True)
+            if is_outage_error(e):
+                self._breaker.record_failure(e)
+            raise
+        self._limiter.record(time.time() - start, error=response.status_code >= 500)
+        if response.status_code >= 500:
+            self._breaker.record_failure(f"HTTP {response.status_code} {method.upper()} {path}")
+        return response
+
+    def get(self, path, params=None):
+        return self.request("GET", path, params=params)
+
+    def post(self, path, xml):
+        return self.request("POST", path, data=xml.encode("utf-8"))
+
+    def put(self, path, xml):
+        return self.request("PUT", path, data=xml.encode("utf-8"))
+
+    def delete(self, path):
+        return self.request("DELETE", path)
+
+    def close(self):
+        self.session.close()
+
+
+def entity_uri(response):
+    """URI of the entity in a create/get response (Location header or root uri attribute)."""
+    if response.headers.get("Location"):
+        return response.headers["Location"]
+    match = _URI_PATTERN.search(response.text or "")
+    return match.group(1) if match else None
+
+
+def list_uris(response, tag):
+    """URIs of the <tag uri="..."> links in a list response, e.g. list_uris(r, "lab")."""
+    return re.findall(rf'<{tag}\b[^>]*?\suri="([^"]+)"', response.text or "")
+
+
+def xml_escape(value):
+    """Escape text for an XML element or attribute."""
+    return (str(value).replace("&", "&amp;").replace("<", "&lt;")
+            .replace(">", "&gt;").replace('"', "&quot;"))
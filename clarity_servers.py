@@ -0,0 +1,42 @@
+"""
+Clarity Server Configuration
+============================
+Single place that maps server names (dev, staging, prod) to their URLs.
+The tester, change_role and the permission tests all resolve URLs here.
+
+"local" points at a stand-in server on this machine (CLARITY_LOCAL_URL,
+default http://127.0.0.1:8080) for offline runs and load tests.
+"""
+
+import os
+
+CLARITY_BASE_URLS = {
+    "prod": "https://billiontoone-prod.claritylims.com",
+    "staging": "https://clarity-staging.btolims.com",
+    "dev": "https://clarity-dev.btolims.com",
+    "local": os.environ.get("CLARITY_LOCAL_URL", "http://127.0.0.1:8080"),
+}
+
+SERVER_NAMES = list(CLARITY_BASE_URLS.keys())
+LIVE_SERVER_NAMES = [server for server in SERVER_NAMES if server != "local"]
+
+
+def base_url(server):
+    """Web UI root for a server, e.g. https://clarity-dev.btolims.com."""
+    try:
+        return CLARITY_BASE_URLS[server]
+    except KeyError:
+        raise ValueError(f"Unknown server '{server}'. Choose from: {', '.join(SERVER_NAMES)}")
+
+
+def api_url(server):
+    """REST API root for a server, e.g. https://clarity-dev.btolims.com/api/v2."""
+    return f"{base_url(server)}/api/v2"
+
+
+def server_for_url(url):
+    """Server name whose web UI a URL belongs to, or None."""
+    for server, root in CLARITY_BASE_URLS.items():
+        if url.startswith(root):
+            return server
+    return None
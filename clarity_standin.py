@@ -0,0 +1,1016 @@
+#!/usr/bin/env python3
+"""
+Clarity Stand-in
+================
+A local, in-memory stand-in for a Clarity LIMS server, so the runner, the
+API tools and the permission tests can be run and benchmarked without VPN
+or a live server. Point the "local" server at it (clarity_servers.py):
+
+    python clarity_standin.py --port 8080 --latency 50
+    python run_all_roles.py "Emil" "Test" --server local
+
+It has two parts, both backed by the same store and the same role checks:
+
+  /api/v2     XML REST API for what s4.clarity and clarity_api.py use:
+              researchers, roles, labs, projects, samples, artifacts,
+              containers, control types, reagent kits and process types,
+              with list filters, batch create/retrieve and routing
+  /clarity    Minimal HTML pages with the selectors the permissions/ tests
+              rely on: the login form (#username, #sign-in), the dashboard
+              (span.navbar-username, #work-available-panel), Configuration
+              tabs (Lab Work, Consumables > Controls / Reagents, User
+              Management) and Projects & Samples (Filter..., NEW PROJECT,
+              div.project-list-item, the Delete Project dialog)
+
+What a role may do comes from role_test_configs.py: every test a role is
+expected to pass grants the matching permission (permissions_create_control
+-> create_control), so a run against the stand-in passes exactly when the
+runner, role switching and the tests work. A JSON file of
+{role: [permission, ...]} replaces that with --roles.
+
+Workflow, step and sample-sheet pages are not reproduced; tests that need
+them fail against the stand-in.
+"""
+
+import argparse
+import base64
+import json
+import posixpath
+import random
+import secrets
+import threading
+import time
+import xml.etree.ElementTree as ET
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_PASSWORD = "standin"
+SESSION_COOKIE = "JSESSIONID"
+ALL = "*"
+
+# Roles that may do everything; setup steps in the tests grant System Admin (BTO) temporarily
+ADMIN_ROLES = ("Administrator", "System Admin (BTO)")
+
+# (first name, last name, username, role) of the seeded accounts
+ADMIN_USER = ("Role Audit", "Admin", "standin_admin", "Administrator")
+TEST_USER = ("Emil", "Test", "standin_test", "Lab Operator (BTO)")
+
+# resource -> (namespace prefix, namespace, element tag)
+RESOURCES = {
+    "researchers": ("res", "http://genologics.com/ri/researcher", "researcher"),
+    "roles": ("role", "http://genologics.com/ri/role", "role"),
+    "labs": ("lab", "http://genologics.com/ri/lab", "lab"),
+    "projects": ("prj", "http://genologics.com/ri/project", "project"),
+    "samples": ("smp", "http://genologics.com/ri/sample", "sample"),
+    "artifacts": ("art", "http://genologics.com/ri/artifact", "artifact"),
+    "containers": ("con", "http://genologics.com/ri/container", "container"),
+    "containertypes": ("ctp", "http://genologics.com/ri/containertype", "container-type"),
+    "controltypes": ("ctrltp", "http://genologics.com/ri/controltype", "control-type"),
+    "reagentkits": ("kit", "http://genologics.com/ri/reagentkit", "reagent-kit"),
+    "processtypes": ("ptp", "http://genologics.com/ri/processtype", "process-type"),
+    "processes": ("prx", "http://genologics.com/ri/process", "process"),
+}
+NAME_ATTRIBUTE = ("roles", "controltypes", "processtypes")  # name="..." instead of <name>
+RI_NAMESPACE = "http://genologics.com/ri"
+
+# (method, resource) -> permission it needs; anything else only needs API access
+API_PERMISSIONS = {
+    ("GET", "researchers"): "read_user",
+    ("POST", "researchers"): "create_user",
+    ("PUT", "researchers"): "update_user",
+    ("DELETE", "researchers"): "delete_user",
+    ("POST", "roles"): "create_role",
+    ("PUT", "roles"): "update_role",
+    ("DELETE", "roles"): "delete_role",
+    ("POST", "projects"): "create_project",
+    ("PUT", "projects"): "create_project",
+    ("DELETE", "projects"): "delete_project",
+    ("POST", "samples"): "create_sample",
+    ("PUT", "samples"): "update_sample",
+    ("DELETE", "samples"): "delete_sample",
+    ("POST", "controltypes"): "create_control",
+    ("PUT", "controltypes"): "update_control",
+    ("DELETE", "controltypes"): "delete_control",
+    ("POST", "reagentkits"): "create_reagent_kit",
+    ("PUT", "reagentkits"): "update_reagent_kit",
+    ("DELETE", "reagentkits"): "delete_reagent_kit",
+    ("GET", "processtypes"): "read_process",
+    ("POST", "processtypes"): "create_process",
+    ("PUT", "processtypes"): "update_process",
+    ("DELETE", "processtypes"): "delete_process",
+}
+
+for _prefix, _namespace, _ in RESOURCES.values():
+    ET.register_namespace(_prefix, _namespace)
+ET.register_namespace("ri", RI_NAMESPACE)
+
+
+class StandinError(Exception):
+    """An API error with its HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def role_permissions():
+    """
+    Permissions per role, from the expected outcomes in role_test_configs.py.
+
+    Returns:
+        dict: Role name -> set of permissions (test module names without "permissions_")
+    """
+    from role_test_configs import MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES
+
+    grants = {role: {ALL} for role in ADMIN_ROLES}
+    for suites in (MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES):
+        for role, suite in suites.items():
+            granted = grants.setdefault(role, set())
+            for module, expected in suite.items():
+                if callable(module):
+                    continue
+                name = module if isinstance(module, str) else module[0]
+                if expected is True:
+                    granted.add(name.replace("permissions_", "", 1))
+    return grants
+
+
+def _text(element, path):
+    found = element.find(path)
+    return (found.text or "") if found is not None else ""
+
+
+class StandinStore:
+    """Entities as XML elements, keyed by resource and id."""
+
+    def __init__(self, base_url, grants=None, password=DEFAULT_PASSWORD):
+        """
+        Args:
+            base_url: Root the stand-in is reachable at, e.g. http://127.0.0.1:8080
+            grants: Role name -> permissions (default: role_permissions())
+            password: Password of every seeded account
+        """
+        self.api_root = f"{base_url}/api/v2"
+        self.grants = grants if grants is not None else role_permissions()
+        self.password = password
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """Drop everything and seed the store again."""
+        with self._lock:
+            self.entities = {resource: {} for resource in RESOURCES}
+            self.passwords = {}
+            self._ids = count(1)
+            self._seed()
+
+    # Entities
+
+    def uri(self, resource, entity_id):
+        return f"{self.api_root}/{resource}/{entity_id}"
+
+    def add(self, resource, element):
+        """Store a new entity and return its URI."""
+        prefix, namespace, tag = RESOURCES[resource]
+        with self._lock:
+            entity_id = str(next(self._ids))
+            element.tag = f"{{{namespace}}}{tag}"
+            element.set("uri", self.uri(resource, entity_id))
+            self.entities[resource][entity_id] = element
+            if resource == "researchers":
+                username = _text(element, "credentials/username")
+                if username:
+                    self.passwords[username] = _text(element, "credentials/password") or self.password
+                    credentials = element.find("credentials")
+                    for password in credentials.findall("password"):
+                        credentials.remove(password)
+            return element.get("uri")
+
+    def add_xml(self, resource, body):
+        prefix, namespace, tag = RESOURCES[resource]
+        return self.add(resource, ET.fromstring(f'<{prefix}:{tag} xmlns:{prefix}="{namespace}">{body}</{prefix}:{tag}>'))
+
+    def get(self, resource, entity_id):
+        with self._lock:
+            element = self.entities.get(resource, {}).get(entity_id)
+        if element is None:
+            raise StandinError(404, f"{resource}/{entity_id} not found")
+        return element
+
+    def replace(self, resource, entity_id, element):
+        old = self.get(resource, entity_id)
+        element.tag = old.tag
+        element.set("uri", old.get("uri"))
+        with self._lock:
+            self.entities[resource][entity_id] = element
+
+    def delete(self, resource, entity_id):
+        with self._lock:
+            if self.entities.get(resource, {}).pop(entity_id, None) is None:
+                raise StandinError(404, f"{resource}/{entity_id} not found")
+
+    def name(self, resource, element):
+        if resource == "researchers":
+            return f"{_text(element, 'first-name')} {_text(element, 'last-name')}".strip()
+        return element.get("name") or _text(element, "name")
+
+    def set_name(self, resource, element, name):
+        if resource in NAME_ATTRIBUTE:
+            element.set("name", name)
+        else:
+            child = element.find("name")
+            if child is None:
+                child = ET.SubElement(element, "name")
+            child.text = name
+
+    def find(self, resource, **filters):
+        """
+        Entities matching list filters (name, firstname, lastname, username).
+
+        Returns:
+            list: (id, element) pairs
+        """
+        fields = {
+            "name": lambda e: self.name(resource, e),
+            "firstname": lambda e: _text(e, "first-name"),
+            "lastname": lambda e: _text(e, "last-name"),
+            "username": lambda e: _text(e, "credentials/username"),
+        }
+        with self._lock:
+            items = list(self.entities.get(resource, {}).items())
+        for key, values in filters.items():
+            if key in fields:
+                items = [(i, e) for i, e in items if fields[key](e) in values]
+        return items
+
+    # Accounts and permissions
+
+    def authenticate(self, username, password):
+        """True if the account exists, isn't locked and the password matches."""
+        matches = self.find("researchers", username=[username])
+        if not matches or _text(matches[0][1], "credentials/account-locked") == "true":
+            return False
+        return self.passwords.get(username) == password
+
+    def roles_of(self, username):
+        matches = self.find("researchers", username=[username])
+        if not matches:
+            return []
+        names = []
+        for role in matches[0][1].findall("credentials/role"):
+            role_id = (role.get("uri") or "").rstrip("/").rsplit("/", 1)[-1]
+            try:
+                names.append(self.name("roles", self.get("roles", role_id)))
+            except StandinError:
+                continue
+        return names
+
+    def permitted(self, username, permission):
+        """True if any of the user's roles grants the permission (or everything)."""
+        for role in self.roles_of(username):
+            granted = self.grants.get(role, set())
+            if ALL in granted or permission in granted:
+                return True
+        return False
+
+    # Seed data
+
+    def _researcher(self, first_name, last_name, username, role_name, lab_uri):
+        role_uri = self.find("roles", name=[role_name])[0][1].get("uri")
+        return self.add_xml("researchers", (
+            f"<first-name>{first_name}</first-name><last-name>{last_name}</last-name>"
+            f"<email>{username}@example.com</email><lab uri=\"{lab_uri}\"/>"
+            f"<credentials><username>{username}</username><account-locked>false</account-locked>"
+            f"<role uri=\"{role_uri}\" roleName=\"{role_name}\" name=\"{role_name}\"/></credentials>"
+        ))
+
+    def _seed(self):
+        lab_uri = self.add_xml("labs", "<name>Administrative Lab</name>")
+        for role in self.grants:
+            self.add("roles", ET.Element("role", name=role))
+        owner_uri = self._researcher(*ADMIN_USER, lab_uri)
+        self._researcher(*TEST_USER, lab_uri)
+        self.add_xml("containertypes", "<name>Tube</name>")
+        for name in ("ED_TEST", "Role Audit Fixtures"):
+            self.add_xml("projects", f"<name>{name}</name><researcher uri=\"{owner_uri}\"/>")
+        self.add("controltypes", ET.fromstring('<c name="Emil Control Test"><supplier/></c>'))
+        self.add_xml("reagentkits", "<name>Emil Reagent Kit Test</name><supplier/>")
+        self.add("processtypes", ET.fromstring('<p name="Emil Master Step Test"><naming-convention/></p>'))
+
+
+# Pages
+
+PAGE_STYLE = """
+body { font-family: sans-serif; margin: 0; }
+nav { background: #2d3e50; color: #fff; padding: 8px; display: flex; gap: 16px; align-items: center; }
+nav a { color: #fff; }
+nav ul { list-style: none; display: flex; gap: 16px; margin: 0; padding: 0; }
+.dropdown-menu { position: absolute; background: #fff; padding: 8px; }
+.dropdown-menu a { color: #000; }
+main { padding: 16px; }
+.tab-title { display: inline-block; padding: 6px 12px; cursor: pointer; border: 1px solid #ccc; }
+.tab-title.active { background: #ddd; }
+.g-two-sided-row, .project-list-item { padding: 4px; cursor: pointer; }
+.x-item-selected { background: #cde; }
+.x-window { position: fixed; top: 30%; left: 30%; background: #fff; border: 2px solid #333; padding: 16px; }
+.x-boundlist-item { padding: 2px 8px; cursor: pointer; }
+.editor { margin-top: 12px; display: flex; flex-direction: column; gap: 6px; max-width: 320px; }
+.error { color: #b00; }
+"""
+
+# Configuration sections: resource -> how it is shown and which permissions show it
+CONFIG_SECTIONS = {
+    "processtypes": {
+        "tab": "Lab Work", "group": "configuration", "header": "Master Steps",
+        "permissions": ("read_process", "create_process", "update_process", "delete_process"),
+        "fields": [["name", "Enter Name"], ["naming-convention", "Enter Naming Convention"]],
+        "editor_class": "wps-details-form master-step-details",
+        "confirm_title": "Delete Master Step", "confirm_button": "Delete Master Step",
+    },
+    "controltypes": {
+        "tab": "Controls", "group": "consumables", "new_button": "NEW CONTROL",
+        "permissions": ("create_control", "update_control", "delete_control"),
+        "fields": [["name", "Enter Control Sample Name"], ["supplier", "Enter a supplier"]],
+        "editor_class": "control-details",
+        "confirm_title": "Delete Control", "confirm_button": "Delete Item",
+    },
+    "reagentkits": {
+        "tab": "Reagents", "group": "consumables", "new_button": "NEW REAGENT KIT",
+        "permissions": ("create_reagent_kit", "update_reagent_kit", "delete_reagent_kit"),
+        "fields": [["name", "Enter Reagent Kit Name"], ["supplier", "Enter a supplier"]],
+        "editor_class": "reagent-kit-details",
+        "confirm_title": "Delete Reagent Kit", "confirm_button": "Delete Item",
+    },
+    "researchers": {
+        "tab": "User Management", "group": "configuration", "table_class": "user-list",
+        "permissions": ("read_user", "create_user", "update_user", "delete_user"),
+        "fields": [],
+    },
+}
+
+CONFIGURATION_SCRIPT = """
+const SECTIONS = %s;
+
+function button(label, onclick) {
+  const b = document.createElement('button');
+  b.textContent = label;
+  b.addEventListener('click', onclick);
+  return b;
+}
+
+function openTab(title) {
+  const group = title.dataset.group;
+  document.querySelectorAll(`.tab-title[data-group="${group}"]`).forEach(t => t.classList.toggle('active', t === title));
+  document.querySelectorAll(`.tab-pane[data-group="${group}"]`).forEach(p => p.hidden = p.dataset.tab !== title.dataset.tab);
+  const state = JSON.parse(sessionStorage.getItem('standin.tabs') || '{}');
+  state[group] = title.dataset.tab;
+  sessionStorage.setItem('standin.tabs', JSON.stringify(state));
+}
+
+function renderRows(resource) {
+  const section = SECTIONS[resource];
+  const table = document.querySelector(`.section[data-resource="${resource}"] .g-table`);
+  table.querySelectorAll('.g-two-sided-row').forEach(r => r.remove());
+  for (const item of section.items) {
+    const row = document.createElement('div');
+    row.className = 'g-two-sided-row';
+    const value = document.createElement('div');
+    value.className = 'g-col-value';
+    value.textContent = item.name;
+    row.appendChild(value);
+    if (section.fields.length) row.addEventListener('click', () => openEditor(resource, item));
+    table.appendChild(row);
+  }
+}
+
+function openEditor(resource, item) {
+  document.querySelectorAll('.editor, .x-window').forEach(e => e.remove());
+  const section = SECTIONS[resource];
+  const editor = document.createElement('div');
+  editor.className = 'editor ' + section.editor_class;
+  for (const [key, label] of section.fields) {
+    const input = document.createElement('input');
+    input.type = 'text';
+    input.name = key;
+    input.placeholder = label;
+    input.setAttribute('aria-label', label);
+    input.value = item ? (item[key] || '') : '';
+    editor.appendChild(input);
+  }
+  const values = () => Object.fromEntries([...editor.querySelectorAll('input')].map(i => [i.name, i.value]));
+  editor.appendChild(button('Save', () => send(item ? 'PUT' : 'POST', resource, item && item.id, values())));
+  if (item) editor.appendChild(button('Delete', () => confirmDelete(resource, item)));
+  document.querySelector(`.section[data-resource="${resource}"]`).appendChild(editor);
+}
+
+function confirmDelete(resource, item) {
+  const section = SECTIONS[resource];
+  const dialog = document.createElement('div');
+  dialog.className = 'x-window';
+  const title = document.createElement('span');
+  title.textContent = section.confirm_title;
+  dialog.appendChild(title);
+  dialog.appendChild(button(section.confirm_button, () => send('DELETE', resource, item.id)));
+  dialog.appendChild(button('Cancel', () => dialog.remove()));
+  document.body.appendChild(dialog);
+}
+
+async function send(method, resource, id, body) {
+  const response = await fetch(`/clarity/ui/${resource}` + (id ? `/${id}` : ''), {
+    method, headers: {'Content-Type': 'application/json'}, body: body ? JSON.stringify(body) : undefined,
+  });
+  const result = await response.json();
+  document.querySelectorAll('.editor, .x-window').forEach(e => e.remove());
+  document.getElementById('message').textContent = result.error || '';
+  if (result.items) {
+    SECTIONS[resource].items = result.items;
+    renderRows(resource);
+  }
+}
+
+document.querySelectorAll('.tab-title').forEach(t => t.addEventListener('click', () => openTab(t)));
+document.querySelectorAll('.new-button').forEach(b => b.addEventListener('click', () => openEditor(b.dataset.resource, null)));
+Object.keys(SECTIONS).forEach(renderRows);
+const saved = JSON.parse(sessionStorage.getItem('standin.tabs') || '{}');
+document.querySelectorAll('.tab-title').forEach(t => { if (saved[t.dataset.group] === t.dataset.tab) openTab(t); });
+"""
+
+PROJECTS_SCRIPT = """
+let projects = %s;
+const labs = %s;
+const canDelete = %s;
+let selected = null;
+
+function button(label, onclick) {
+  const b = document.createElement('button');
+  b.textContent = label;
+  b.addEventListener('click', onclick);
+  return b;
+}
+
+function boundList(anchor, options, onpick) {
+  document.querySelectorAll('.x-boundlist').forEach(l => l.remove());
+  const list = document.createElement('div');
+  list.className = 'x-boundlist';
+  for (const option of options) {
+    const item = document.createElement('div');
+    item.className = 'x-boundlist-item';
+    item.textContent = option;
+    item.addEventListener('click', () => { onpick(option); list.remove(); });
+    list.appendChild(item);
+  }
+  anchor.after(list);
+}
+
+function renderProjects() {
+  const list = document.getElementById('project-list');
+  const filter = document.getElementById('project-filter').value.toLowerCase();
+  list.innerHTML = '';
+  for (const project of projects.filter(p => p.name.toLowerCase().includes(filter))) {
+    const row = document.createElement('div');
+    row.className = 'project-list-item' + (selected === project.id ? ' x-item-selected' : '');
+    const title = document.createElement('div');
+    title.className = 'project-list-item-headline-title';
+    title.dataset.qtip = project.name;
+    title.textContent = project.name;
+    row.appendChild(title);
+    row.addEventListener('click', () => { selected = project.id; renderProjects(); });
+    list.appendChild(row);
+  }
+  const bar = document.getElementById('project-button-bar');
+  bar.innerHTML = '';
+  if (selected && canDelete) {
+    const del = button('Delete', confirmDelete);
+    del.id = 'project-button-bar-delete-button-btnEl';
+    bar.appendChild(del);
+  }
+}
+
+function confirmDelete() {
+  const dialog = document.createElement('div');
+  dialog.className = 'x-window';
+  const title = document.createElement('span');
+  title.textContent = 'Confirm Delete Project';
+  dialog.appendChild(title);
+  dialog.appendChild(button('Delete Project', () => send('DELETE', selected)));
+  dialog.appendChild(button('Cancel', () => dialog.remove()));
+  document.body.appendChild(dialog);
+}
+
+function newProject() {
+  document.querySelectorAll('.editor').forEach(e => e.remove());
+  const form = document.createElement('div');
+  form.className = 'editor project-form';
+  form.innerHTML = `
+    <input type="text" aria-label="Enter Project Name" placeholder="Enter Project Name">
+    <input type="text" class="account" placeholder="Choose an account" aria-label="Account">
+    <div id="ext-gen1100" class="x-form-trigger">&#9662; client</div>
+    <input type="text" class="client" placeholder="Choose a client" aria-label="Client" disabled>
+    <div id="ext-gen1106" class="x-form-trigger">&#9662; priority</div>
+    <input type="text" class="priority" aria-label="Priority" readonly>`;
+  const account = form.querySelector('.account');
+  account.addEventListener('click', () => boundList(account, labs, v => account.value = v));
+  form.querySelector('#ext-gen1100').addEventListener('click', () => form.querySelector('.client').disabled = false);
+  const priority = form.querySelector('.priority');
+  form.querySelector('#ext-gen1106').addEventListener('click', () => boundList(priority, ['Standard', 'High'], v => priority.value = v));
+  form.appendChild(button('Save', () => send('POST', null, {name: form.querySelector('input').value})));
+  document.getElementById('projects').appendChild(form);
+}
+
+async function send(method, id, body) {
+  const response = await fetch('/clarity/ui/projects' + (id ? `/${id}` : ''), {
+    method, headers: {'Content-Type': 'application/json'}, body: body ? JSON.stringify(body) : undefined,
+  });
+  const result = await response.json();
+  document.querySelectorAll('.editor, .x-window').forEach(e => e.remove());
+  document.getElementById('message').textContent = result.error || '';
+  if (result.items) {
+    projects = result.items;
+    selected = null;
+    renderProjects();
+  }
+}
+
+document.getElementById('project-filter').addEventListener('input', renderProjects);
+const newButton = document.getElementById('new-project');
+if (newButton) newButton.addEventListener('click', newProject);
+renderProjects();
+"""
+
+
+def _escape(value):
+    return (str(value).replace("&", "&amp;").replace("<", "&lt;")
+            .replace(">", "&gt;").replace('"', "&quot;"))
+
+
+def _json_script(value):
+    return json.dumps(value).replace("</", "<\\/")
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Routes /api to the REST API and everything else to the pages."""
+
+    protocol_version = "HTTP/1.1"
+
+    # Plumbing
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _respond(self, status, body=b"", content_type="application/xml", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _redirect(self, location, headers=None):
+        self._respond(302, b"", "text/plain", {"Location": location, **(headers or {})})
+
+    def _body(self):
+        return self._payload
+
+    def _handle(self):
+        # Read the body up front so an early error doesn't leave it on a kept-alive connection
+        length = int(self.headers.get("Content-Length") or 0)
+        self._payload = self.rfile.read(length) if length else b""
+        self.server.record_request()
+        self.server.delay()
+        url = urlsplit(self.path)
+        path = posixpath.normpath(url.path) if url.path not in ("", "/") else "/"
+        params = parse_qs(url.query)
+        try:
+            if path == "/api" or path.startswith("/api/"):
+                self._api(path, params)
+            elif path == "/standin/reset" and self.command == "POST":
+                self.server.store.reset()
+                self.server.sessions.clear()
+                self._respond(200, '{"reset": true}', "application/json")
+            elif path == "/standin/stats":
+                self._respond(200, json.dumps(self.server.stats()), "application/json")
+            else:
+                self._ui(path, params)
+        except StandinError as e:
+            self._api_error(e.status, str(e))
+        except ET.ParseError as e:
+            self._api_error(400, f"Malformed XML: {e}")
+        except ValueError as e:
+            self._api_error(400, f"Malformed request: {e}")
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+    # REST API
+
+    def _api_error(self, status, message):
+        body = (f'<exc:exception xmlns:exc="http://genologics.com/ri/exception">'
+                f"<message>{_escape(message)}</message></exc:exception>")
+        headers = {"WWW-Authenticate": 'Basic realm="GLSSecurity"'} if status == 401 else None
+        self._respond(status, body, headers=headers)
+
+    def _api_user(self):
+        """Username from basic auth (API clients) or a session cookie (the pages)."""
+        auth = self.headers.get("Authorization", "")
+        if auth.startswith("Basic "):
+            try:
+                username, _, password = base64.b64decode(auth[6:]).decode("utf-8").partition(":")
+            except ValueError:
+                return None, True
+            return (username if self.server.store.authenticate(username, password) else None), True
+        return self._session_user(), False
+
+    def _api(self, path, params):
+        store = self.server.store
+        username, basic_auth = self._api_user()
+        if username is None:
+            raise StandinError(401, "Authentication required")
+        if basic_auth and not store.permitted(username, "API_login"):
+            raise StandinError(403, f"{username} has no API access")
+
+        parts = path.split("/")[2:]  # ["v2", resource, ...]
+        if len(parts) < 2:
+            return self._respond(200, self._versions())
+        resource, rest = parts[1], parts[2:]
+        if resource == "route" and rest == ["artifacts"] and self.command == "POST":
+            ET.fromstring(self._body())
+            return self._respond(200, f'<rt:routing xmlns:rt="http://genologics.com/ri/routing"/>')
+        if resource not in RESOURCES:
+            raise StandinError(404, f"Unknown resource '{resource}'")
+        if rest[:1] == ["batch"]:
+            return self._api_batch(username, resource, rest[1:])
+
+        method = "GET" if self.command == "HEAD" else self.command
+        permission = API_PERMISSIONS.get((method, resource))
+        if permission and not store.permitted(username, permission):
+            raise StandinError(403, f"{username} may not {method} {resource}")
+
+        if not rest:
+            if method == "GET":
+                return self._respond(200, self._list(resource, params))
+            if method == "POST":
+                element = self._creatable(resource, ET.fromstring(self._body()))
+                uri = store.add(resource, element)
+                return self._respond(201, ET.tostring(element, encoding="unicode"), headers={"Location": uri})
+            raise StandinError(405, f"{method} not allowed on {resource}")
+
+        entity_id = rest[0]
+        if method == "GET":
+            return self._respond(200, ET.tostring(store.get(resource, entity_id), encoding="unicode"))
+        if method == "PUT":
+            store.replace(resource, entity_id, ET.fromstring(self._body()))
+            return self._respond(200, ET.tostring(store.get(resource, entity_id), encoding="unicode"))
+        if method == "DELETE":
+            store.delete(resource, entity_id)
+            return self._respond(204)
+        raise StandinError(405, f"{method} not allowed on {resource}/{entity_id}")
+
+    def _creatable(self, resource, element):
+        """Reject what Clarity can't create through a plain POST."""
+        if resource == "artifacts":
+            raise StandinError(405, "Artifacts are created by processes")
+        if resource == "processes" and element.find("input-output-map") is None:
+            raise StandinError(400, "A process needs at least one input-output-map")
+        if resource == "samples" and element.find("location") is None:
+            raise StandinError(400, "Sample location is required")
+        return element
+
+    def _api_batch(self, username, resource, rest):
+        store = self.server.store
+        if rest == ["retrieve"] and self.command == "POST":
+            uris = [link.get("uri", "") for link in ET.fromstring(self._body()).iter("link")]
+            details = ET.Element(f"{{{RESOURCES[resource][1]}}}details")
+            for uri in uris:
+                details.append(store.get(resource, uri.split("?")[0].rstrip("/").rsplit("/", 1)[-1]))
+            return self._respond(200, ET.tostring(details, encoding="unicode"))
+        if rest == ["create"] and self.command == "POST":
+            permission = API_PERMISSIONS.get(("POST", resource))
+            if permission and not store.permitted(username, permission):
+                raise StandinError(403, f"{username} may not create {resource}")
+            elements = [self._creatable(resource, e) for e in ET.fromstring(self._body())]
+            links = ET.Element(f"{{{RI_NAMESPACE}}}links")
+            for element in elements:
+                ET.SubElement(links, "link", uri=store.add(resource, element), rel=resource)
+            return self._respond(200, ET.tostring(links, encoding="unicode"))
+        raise StandinError(404, f"Unknown batch operation {'/'.join(rest)}")
+
+    def _versions(self):
+        # s4.clarity reads <version> entries, clarity_api the links; one document serves both
+        root = self.server.store.api_root
+        links = "".join(f'<link uri="{root}/{r}" rel="{r}"/>' for r in RESOURCES)
+        return (f'<ver:versions xmlns:ver="http://genologics.com/ri/version">'
+                f'<version uri="{root}" major="v2" minor="31"/>{links}</ver:versions>')
+
+    def _list(self, resource, params):
+        store = self.server.store
+        prefix, namespace, tag = RESOURCES[resource]
+        root = ET.Element(f"{{{namespace}}}{resource}")
+        for _, element in store.find(resource, **params):
+            item = ET.SubElement(root, tag, uri=element.get("uri"))
+            if resource == "researchers":
+                ET.SubElement(item, "first-name").text = _text(element, "first-name")
+                ET.SubElement(item, "last-name").text = _text(element, "last-name")
+            elif store.name(resource, element):
+                item.set("name", store.name(resource, element))
+        return ET.tostring(root, encoding="unicode")
+
+    # Pages
+
+    def _session_user(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get(SESSION_COOKIE)
+        return self.server.sessions.get(morsel.value) if morsel else None
+
+    def _ui(self, path, params):
+        if path == "/clarity/login/auth":
+            return self._login_page("login_error" in params)
+        if path == "/clarity/j_spring_security_check" and self.command == "POST":
+            return self._login()
+        if path == "/clarity/logout":
+            return self._redirect("/clarity/login/auth", {"Set-Cookie": f"{SESSION_COOKIE}=; Path=/; Max-Age=0"})
+
+        username = self._session_user()
+        if username is None or not self.server.store.find("researchers", username=[username]):
+            return self._redirect("/clarity/login/auth?unauthenticated=1")
+        if path.startswith("/clarity/ui/"):
+            return self._ui_action(username, path.split("/")[3:])
+        if path in ("/", "/clarity"):
+            return self._page(username, "Lab View", self._dashboard())
+        if path == "/clarity/configuration":
+            return self._page(username, "Configuration", *self._configuration(username))
+        if path == "/clarity/samples":
+            return self._page(username, "Projects & Samples", *self._projects(username))
+        if path == "/clarity/dashboard/overview":
+            if not self.server.store.permitted(username, "overview_dashboard"):
+                return self._page(username, "Overview", "<p class='error'>You do not have permission to view this page.</p>", status=403)
+            return self._page(username, "Overview", "<div class='overview-dashboard'><h2>Overview</h2></div>")
+        return self._page(username, "Not Found", "<p class='error'>Page not found.</p>", status=404)
+
+    def _login_page(self, failed):
+        error = ("<p class='error'>Sorry, we were not able to find a user with that username and password.</p>"
+                 if failed else "")
+        body = f"""<main>
+<h1>Clarity LIMS</h1>{error}
+<form action="/clarity/j_spring_security_check" method="post">
+  <input type="text" id="username" name="j_username" aria-label="Username" autocomplete="off">
+  <input type="password" id="password" name="j_password" aria-label="Password">
+  <button type="submit" id="sign-in">Sign In</button>
+</form>
+</main>"""
+        self._respond(200, self._html("Login", body), "text/html")
+
+    def _login(self):
+        form = parse_qs(self._body().decode("utf-8"))
+        username = form.get("j_username", [""])[0]
+        password = form.get("j_password", [""])[0]
+        store = self.server.store
+        if not store.authenticate(username, password) or not store.permitted(username, "clarity_login"):
+            return self._redirect("/clarity/login/auth?login_error=1")
+        token = secrets.token_hex(16)
+        self.server.sessions[token] = username
+        self._redirect("/clarity/", {"Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/; HttpOnly"})
+
+    def _html(self, title, body, script=""):
+        return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{_escape(title)} - Clarity LIMS</title>"
+                f"<style>{PAGE_STYLE}</style></head><body>{body}"
+                f"{f'<script>{script}</script>' if script else ''}</body></html>")
+
+    def _page(self, username, title, body, script="", status=200):
+        store = self.server.store
+        researcher = store.find("researchers", username=[username])[0][1]
+        overview = ('<li><a href="/clarity/dashboard/overview">Overview</a></li>'
+                    if store.permitted(username, "overview_dashboard") else "")
+        nav = f"""<nav class="navbar">
+<ul>
+  <li><a href="/clarity/">Lab View</a></li>
+  <li><a href="/clarity/samples">PROJECTS &amp; Samples</a></li>
+  <li><a href="/clarity/configuration">Configuration</a></li>
+  <li class="dropdown"><a class="dropdown-toggle" href="#" onclick="this.nextElementSibling.hidden = !this.nextElementSibling.hidden; return false;">Dashboards</a>
+    <ul class="dropdown-menu" hidden>{overview}</ul></li>
+</ul>
+<span class="navbar-username">{_escape(store.name("researchers", researcher))}</span>
+</nav>"""
+        self._respond(status, self._html(title, f"{nav}<main><p id='message' class='error'></p>{body}</main>", script),
+                      "text/html")
+
+    def _dashboard(self):
+        return """<div id="work-available-panel"><h2>Work Available</h2><p>No samples are waiting.</p></div>
+<div id="my-work-container"><h2>My Work</h2></div>"""
+
+    def _section_items(self, resource):
+        store = self.server.store
+        items = []
+        for entity_id, element in store.find(resource):
+            item = {"id": entity_id, "name": store.name(resource, element)}
+            for key, _ in CONFIG_SECTIONS.get(resource, {}).get("fields", []):
+                if key != "name":
+                    item[key] = _text(element, key)
+            items.append(item)
+        return items
+
+    def _configuration(self, username):
+        store = self.server.store
+        visible = {
+            resource: section for resource, section in CONFIG_SECTIONS.items()
+            if any(store.permitted(username, p) for p in section["permissions"])
+        }
+        panes = {}
+        for resource, section in visible.items():
+            new_button = (f'<button class="new-button" data-resource="{resource}">{section["new_button"]}</button>'
+                          if section.get("new_button") else "")
+            header = ""
+            if section.get("header"):
+                add = (f'<div class="btn-base new-button" data-resource="{resource}">+</div>'
+                       if store.permitted(username, section["permissions"][1]) else "")
+                header = (f'<div class="g-col-header wps-header-button master-step-column-header">{add}'
+                          f'<span>{section["header"]}</span></div>')
+            panes[resource] = (f'<div class="section" data-resource="{resource}">{new_button}'
+                               f'<div class="g-table {section.get("table_class", "")}">{header}</div></div>')
+
+        def tab(group, name, content):
+            return (f'<div class="tab-title" data-group="{group}" data-tab="{_escape(name)}">{_escape(name)}</div>',
+                    f'<div class="tab-pane" data-group="{group}" data-tab="{_escape(name)}" hidden>{content}</div>')
+
+        consumables = [tab("consumables", CONFIG_SECTIONS[r]["tab"], panes[r])
+                       for r in ("controltypes", "reagentkits") if r in panes]
+        tabs = []
+        if "processtypes" in panes:
+            tabs.append(tab("configuration", "Lab Work", panes["processtypes"]))
+        if consumables:
+            tabs.append(tab("configuration", "Consumables",
+                            "".join(t for t, _ in consumables) + "".join(p for _, p in consumables)))
+        if "researchers" in panes:
+            tabs.append(tab("configuration", "User Management",
+                            '<input type="text" aria-label="Filter..." placeholder="Filter...">' + panes["researchers"]))
+        body = ('<div id="configuration-app-container">' + "".join(t for t, _ in tabs)
+                + "".join(p for _, p in tabs) + "</div>")
+        sections = {r: {**s, "items": self._section_items(r)} for r, s in visible.items()}
+        return body, CONFIGURATION_SCRIPT % _json_script(sections)
+
+    def _projects(self, username):
+        store = self.server.store
+        new_button = ('<button id="new-project">NEW PROJECT</button>'
+                      if store.permitted(username, "create_project") else "")
+        body = f"""<div id="projects">
+<input type="text" id="project-filter" aria-label="Filter..." placeholder="Filter...">
+{new_button}
+<div id="project-button-bar"></div>
+<div id="project-list"></div>
+</div>"""
+        labs = [store.name("labs", e) for _, e in store.find("labs")]
+        script = PROJECTS_SCRIPT % (_json_script(self._section_items("projects")), _json_script(labs),
+                                    _json_script(store.permitted(username, "delete_project")))
+        return body, script
+
+    def _ui_action(self, username, parts):
+        """JSON actions behind the page buttons, with the same permission checks as the API."""
+        store = self.server.store
+        resource = parts[0] if parts else ""
+        if resource not in CONFIG_SECTIONS and resource != "projects":
+            raise StandinError(404, f"Unknown resource '{resource}'")
+        method = self.command
+        permission = API_PERMISSIONS.get((method, resource))
+        result = {}
+        if permission and not store.permitted(username, permission):
+            result["error"] = "You do not have permission to perform this action."
+        else:
+            values = json.loads(self._body() or b"{}")
+            if method == "POST":
+                element = ET.Element("entity")
+                self._apply(resource, element, values)
+                store.add(resource, element)
+            elif method == "PUT":
+                element = store.get(resource, parts[1])
+                self._apply(resource, element, values)
+            elif method == "DELETE":
+                store.delete(resource, parts[1])
+        result["items"] = self._section_items(resource)
+        self._respond(200, json.dumps(result), "application/json")
+
+    def _apply(self, resource, element, values):
+        store = self.server.store
+        for key, value in values.items():
+            if key == "name":
+                store.set_name(resource, element, value)
+            else:
+                child = element.find(key)
+                if child is None:
+                    child = ET.SubElement(element, key)
+                child.text = value
+
+
+class StandinServer(ThreadingHTTPServer):
+    """HTTP server holding the store, sessions and simulated latency."""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, grants=None, password=DEFAULT_PASSWORD, verbose=False):
+        """
+        Args:
+            address: (host, port); port 0 picks a free one
+            latency: Seconds added to every request
+            jitter: Up to this many extra random seconds per request
+            grants: Role name -> permissions (default: from role_test_configs.py)
+            password: Password of the seeded accounts
+            verbose: Log every request
+        """
+        super().__init__(address, StandinHandler)
+        host, port = self.server_address[:2]
+        self.url = f"http://{host}:{port}"
+        self.store = StandinStore(self.url, grants, password)
+        self.sessions = {}
+        self.latency = latency
+        self.jitter = jitter
+        self.verbose = verbose
+        self.requests = 0
+        self._stats_lock = threading.Lock()
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def record_request(self):
+        with self._stats_lock:
+            self.requests += 1
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "sessions": len(self.sessions),
+            "entities": {r: len(e) for r, e in self.store.entities.items()},
+        }
+
+
+def start_standin(host=DEFAULT_HOST, port=0, **kwargs):
+    """
+    Run a stand-in in a background thread, e.g. for benchmarks.
+
+    Returns:
+        StandinServer: The running server; its url attribute is the base URL. Call shutdown() to stop it.
+    """
+    server = StandinServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, name="clarity-standin", daemon=True).start()
+    return server
+
+
+def main():
+    """Serve a stand-in Clarity until interrupted."""
+    parser = argparse.ArgumentParser(
+        description="Local stand-in Clarity LIMS server for offline runs and benchmarks",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python clarity_standin.py
+  python clarity_standin.py --port 8081 --latency 80 --jitter 40
+  python clarity_standin.py --roles my_roles.json    # {"Lab Operator (BTO)": ["clarity_login", ...]}
+
+Then, in another terminal:
+  export ROLE_AUDIT_USERNAME_MASTER=standin_admin ROLE_AUDIT_PASSWORD_MASTER=standin
+  export ROLE_AUDIT_USERNAME_TEST=standin_test ROLE_AUDIT_PASSWORD_TEST=standin
+  python run_all_roles.py "Emil" "Test" --server local
+"""
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--latency", type=float, default=0, help="Milliseconds added to every request (default: 0)")
+    parser.add_argument("--jitter", type=float, default=0, help="Up to this many extra random milliseconds (default: 0)")
+    parser.add_argument("--roles", help="JSON file of role -> permissions (default: from role_test_configs.py)")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help=f"Password of the seeded accounts (default: {DEFAULT_PASSWORD})")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    grants = None
+    if args.roles:
+        with open(args.roles) as f:
+            grants = {role: set(permissions) for role, permissions in json.load(f).items()}
+        for role in ADMIN_ROLES:
+            grants.setdefault(role, {ALL})
+
+    server = StandinServer((args.host, args.port), latency=args.latency / 1000, jitter=args.jitter / 1000,
+                           grants=grants, password=args.password, verbose=args.verbose)
+    print("=" * 80)
+    print(f"CLARITY STAND-IN: {server.url}")
+    print("=" * 80)
+    print(f"Roles: {len(server.store.grants)}, latency: {args.latency:.0f}ms (+{args.jitter:.0f}ms jitter)")
+    print(f"Accounts: MASTER={ADMIN_USER[2]}, TEST={TEST_USER[2]} ({TEST_USER[0]} {TEST_USER[1]}), password '{args.password}'")
+    if server.url != "http://127.0.0.1:8080":
+        print(f"Set CLARITY_LOCAL_URL={server.url} for --server local")
+    print("Press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
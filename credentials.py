@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Credentials
+===========
+One place to look up stored Clarity credentials.
+
+Each (service, key) pair is resolved once per process and kept in memory,
+so connections, logins and parallel workers don't go back to the secret
+store for every call. Backends are tried in order until one has the value:
+
+  env      ROLE_AUDIT_<KEY> environment variables, e.g.
+           ROLE_AUDIT_USERNAME_TEST=jdoe and ROLE_AUDIT_PASSWORD_TEST=...
+  file     Encrypted JSON file (ROLE_AUDIT_CREDENTIALS_FILE, default
+           ~/.role_audit/credentials.enc), unlocked with the Fernet key in
+           ROLE_AUDIT_CREDENTIALS_KEY; needs the cryptography package
+  keyring  The system keyring, as written by store_creds.py
+
+The order can be changed with ROLE_AUDIT_CREDENTIAL_BACKENDS (default
+"env,file,keyring"). Headless Linux workers without a keyring can use env
+or file; `python credentials.py export` copies what this machine resolves
+into an encrypted file for them.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+
+SERVICE_NAME = "role_audit_app"
+DEFAULT_BACKENDS = "env,file,keyring"
+DEFAULT_CREDENTIALS_FILE = os.path.join(os.path.expanduser("~"), ".role_audit", "credentials.enc")
+
+
+class EnvBackend:
+    """ROLE_AUDIT_* environment variables (only for SERVICE_NAME)."""
+
+    name = "env"
+
+    def get(self, service, key):
+        if service != SERVICE_NAME:
+            return None
+        if key.startswith("USERNAME_"):
+            return os.environ.get(f"ROLE_AUDIT_{key}")
+        # Passwords are stored under the username; env vars go by account instead
+        for name, value in os.environ.items():
+            match = re.fullmatch(r"ROLE_AUDIT_USERNAME_(\w+)", name)
+            if match and value == key:
+                return os.environ.get(f"ROLE_AUDIT_PASSWORD_{match.group(1)}")
+        return None
+
+
+class EncryptedFileBackend:
+    """Fernet-encrypted JSON file of {service: {key: value}}."""
+
+    name = "file"
+
+    def __init__(self, path=None, key=None):
+        self.path = path or os.environ.get("ROLE_AUDIT_CREDENTIALS_FILE", DEFAULT_CREDENTIALS_FILE)
+        self.key = key or os.environ.get("ROLE_AUDIT_CREDENTIALS_KEY")
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            self._data = {}
+            if self.key and os.path.exists(self.path):
+                from cryptography.fernet import Fernet
+
+                with open(self.path, "rb") as f:
+                    self._data = json.loads(Fernet(self.key.encode()).decrypt(f.read()))
+        return self._data
+
+    def get(self, service, key):
+        return self._load().get(service, {}).get(key)
+
+    def save(self, data):
+        """Encrypt and write {service: {key: value}}, readable only by the owner."""
+        from cryptography.fernet import Fernet
+
+        if not self.key:
+            raise ValueError("Set ROLE_AUDIT_CREDENTIALS_KEY first (generate one with: python credentials.py new-key)")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.write(Fernet(self.key.encode()).encrypt(json.dumps(data).encode()))
+        os.chmod(self.path, 0o600)
+        self._data = data
+
+
+class KeyringBackend:
+    """The system keyring (macOS Keychain, Secret Service, Windows Credential Locker)."""
+
+    name = "keyring"
+
+    def get(self, service, key):
+        import keyring
+
+        return keyring.get_password(service, key)
+
+
+BACKENDS = {"env": EnvBackend, "file": EncryptedFileBackend, "keyring": KeyringBackend}
+
+
+class CredentialProvider:
+    """Resolves secrets through a chain of backends, once per (service, key)."""
+
+    def __init__(self, backends=None):
+        """
+        Args:
+            backends: Backend names in lookup order (default: ROLE_AUDIT_CREDENTIAL_BACKENDS
+                      or "env,file,keyring")
+        """
+        names = backends or os.environ.get("ROLE_AUDIT_CREDENTIAL_BACKENDS", DEFAULT_BACKENDS).split(",")
+        unknown = [n for n in names if n.strip() not in BACKENDS]
+        if unknown:
+            raise ValueError(f"Unknown credential backend(s): {', '.join(unknown)}")
+        self.backends = [BACKENDS[n.strip()]() for n in names]
+        self._cache = {}  # (service, key) -> (value, backend name)
+        self._lock = threading.Lock()
+        self.lookups = 0
+
+    def get_secret(self, service, key):
+        """
+        A stored value, from the first backend that has it.
+
+        Returns:
+            str: The value, or None if no backend has it
+        """
+        return self._resolve(service, key)[0]
+
+    def source(self, service, key):
+        """Name of the backend a value came from, or None."""
+        return self._resolve(service, key)[1]
+
+    def _resolve(self, service, key):
+        with self._lock:
+            if (service, key) not in self._cache:
+                found = (None, None)
+                for backend in self.backends:
+                    self.lookups += 1
+                    try:
+                        value = backend.get(service, key)
+                    except Exception as e:
+                        # A backend that isn't available here (no keyring daemon,
+                        # no cryptography) shouldn't hide the others
+                        print(f"  Credential backend '{backend.name}' failed: {e}")
+                        continue
+                    if value:
+                        found = (value, backend.name)
+                        break
+                self._cache[(service, key)] = found
+            return self._cache[(service, key)]
+
+    def get_credentials(self, account, service=SERVICE_NAME):
+        """
+        Username and password of a stored account (MASTER, TEST, ...).
+
+        Raises:
+            ValueError: If either is missing
+        """
+        username = self.get_secret(service, f"USERNAME_{account}")
+        password = self.get_secret(service, username) if username else None
+        if not username or not password:
+            raise ValueError(f"Credentials for {account} not found. Please run store_creds.py first.")
+        return username, password
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """Shared CredentialProvider (one per process)."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = CredentialProvider()
+        return _provider
+
+
+def get_credentials(account, service=SERVICE_NAME):
+    """(username, password) of a stored account; see CredentialProvider.get_credentials()."""
+    return get_provider().get_credentials(account, service)
+
+
+def get_secret(service, key):
+    """A single stored value, e.g. get_secret("clarity-dev", username)."""
+    return get_provider().get_secret(service, key)
+
+
+def main():
+    """Show where credentials come from, or export them to an encrypted file."""
+    parser = argparse.ArgumentParser(
+        description="Check or export stored Clarity credentials",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python credentials.py                       # which backend has each account
+  python credentials.py new-key               # print a key for ROLE_AUDIT_CREDENTIALS_KEY
+  python credentials.py export MASTER TEST    # write them to the encrypted file
+"""
+    )
+    parser.add_argument("command", nargs="?", default="check", choices=["check", "new-key", "export"])
+    parser.add_argument("accounts", nargs="*", default=["MASTER", "TEST"], help="Accounts (default: MASTER TEST)")
+    args = parser.parse_args()
+
+    if args.command == "new-key":
+        from cryptography.fernet import Fernet
+
+        print(Fernet.generate_key().decode())
+        return
+
+    provider = get_provider()
+    if args.command == "check":
+        missing = 0
+        for account in args.accounts:
+            try:
+                username, _ = provider.get_credentials(account)
+                print(f"  ✓ {account}: {username} (from {provider.source(SERVICE_NAME, username)})")
+            except ValueError as e:
+                missing += 1
+                print(f"  ✗ {account}: {e}")
+        sys.exit(1 if missing else 0)
+
+    data = {SERVICE_NAME: {}}
+    for account in args.accounts:
+        username, password = provider.get_credentials(account)
+        data[SERVICE_NAME][f"USERNAME_{account}"] = username
+        data[SERVICE_NAME][username] = password
+    backend = EncryptedFileBackend()
+    backend.save(data)
+    print(f"Exported {len(args.accounts)} account(s) to {backend.path}")
+
+
+if __name__ == "__main__":
+    main()
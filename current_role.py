@@ -2,20 +2,17 @@ import s4
 from s4 import clarity
 import os
 import time
-import keyring
+from credentials import get_credentials
 from s4.clarity import researcher, role
+from clarity_servers import SERVER_NAMES, api_url
 
-SERVICE_NAME = "role_audit_app"  
 server = "dev"
 
-CLARITY_SERVERS = {
-    "dev": "https://clarity-dev.btolims.com/api/v2"
-}
+CLARITY_SERVERS = {server: api_url(server) for server in SERVER_NAMES}
 
 # Retrieve stored credentials
 account = "MASTER" 
-username = keyring.get_password(SERVICE_NAME, f"USERNAME_{account}")
-password = keyring.get_password(SERVICE_NAME, username)
+username, password = get_credentials(account)
 
 # Connect to Clarity API
 lims = s4.clarity.LIMS(CLARITY_SERVERS[server], username, password)
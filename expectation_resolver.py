@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Expectation Resolver
+====================
+Works out the expected outcome of each permission test from the role
+definitions on the Clarity server, instead of the hand-maintained True/False
+values in role_test_configs.py.
+
+Each role's permission list is fetched from the API once and cached (in
+memory and in test_results/role_permissions.json). TEST_PERMISSION_MAP says
+which Clarity permission(s) each permissions_* module exercises; a test is
+expected to pass when the role combination holds all of them.
+
+Permission names are compared by their words, ignoring case, order and
+punctuation, so "Project:create", "Create Project" and "CreateProject" match.
+
+Whole matrices are resolved in bulk with permission_matrix.PermissionMatrix
+(NumPy), which is imported only when needed.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from role_matrix import NOT_LOGGED_IN, build_combinations, inspect_test_module
+from clarity_servers import SERVER_NAMES
+
+DEFAULT_CACHE_FILE = "test_results/role_permissions.json"
+DEFAULT_RESULTS_FILE = "test_results/all_role_tests.json"
+DEFAULT_CACHE_TTL = 24 * 3600  # seconds before cached role definitions are fetched again
+
+# permissions_* module -> Clarity permissions the test needs (all of them)
+TEST_PERMISSION_MAP = {
+    "permissions_clarity_login": ["ClarityLogin"],
+    "permissions_API_login": ["APILogin"],
+    "permissions_collaborations_login": ["CollaborationsLogin"],
+    "permissions_operations_login": ["OperationsLogin"],
+    "permissions_create_project": ["ClarityLogin", "Project:create"],
+    "permissions_delete_project": ["ClarityLogin", "Project:delete"],
+    "permissions_create_sample": ["ClarityLogin", "Sample:create"],
+    "permissions_update_sample": ["ClarityLogin", "Sample:update"],
+    "permissions_delete_sample": ["ClarityLogin", "Sample:delete"],
+    "permissions_sample_workflow_assignment": ["ClarityLogin", "SampleWorkflowAssignment"],
+    "permissions_move_to_next_step": ["ClarityLogin", "MoveToNextStep"],
+    "permissions_remove_sample_from_workflow": ["ClarityLogin", "RemoveSampleFromWorkflow"],
+    "permissions_requeue_sample": ["ClarityLogin", "RequeueSample"],
+    "permissions_sample_rework": ["ClarityLogin", "SampleRework"],
+    "permissions_review_escalated_samples": ["ClarityLogin", "ReviewEscalatedSamples"],
+    "permissions_edit_completed_steps": ["ClarityLogin", "EditCompletedSteps"],
+    "permissions_overview_dashboard": ["ClarityLogin", "OverviewDashboard"],
+    "permissions_create_control": ["ClarityLogin", "Control:create"],
+    "permissions_update_control": ["ClarityLogin", "Control:update"],
+    "permissions_delete_control": ["ClarityLogin", "Control:delete"],
+    "permissions_create_reagent_kit": ["ClarityLogin", "ReagentKit:create"],
+    "permissions_update_reagent_kit": ["ClarityLogin", "ReagentKit:update"],
+    "permissions_delete_reagent_kit": ["ClarityLogin", "ReagentKit:delete"],
+    "permissions_create_user": ["ClarityLogin", "User:create"],
+    "permissions_read_user": ["ClarityLogin", "User:read"],
+    "permissions_update_user": ["ClarityLogin", "User:update"],
+    "permissions_delete_user": ["ClarityLogin", "User:delete"],
+    "permissions_create_process": ["ClarityLogin", "Process:create"],
+    "permissions_read_process": ["ClarityLogin", "Process:read"],
+    "permissions_update_process": ["ClarityLogin", "Process:update"],
+    "permissions_delete_process": ["ClarityLogin", "Process:delete"],
+    "permissions_create_role": ["ClarityLogin", "Role:create"],
+    "permissions_update_role": ["ClarityLogin", "Role:update"],
+    "permissions_delete_role": ["ClarityLogin", "Role:delete"],
+    "permissions_create_contact": ["ClarityLogin", "Contact:create"],
+    "permissions_read_contact": ["ClarityLogin", "Contact:read"],
+    "permissions_update_contact": ["ClarityLogin", "Contact:update"],
+    "permissions_delete_contact": ["ClarityLogin", "Contact:delete"],
+    "permissions_update_configuration": ["ClarityLogin", "UpdateConfiguration"],
+    "permissions_esignature_signing": ["ClarityLogin", "ESignatureSigning"],
+    "permissions_search_index": ["ClarityLogin", "SearchIndex"],
+    "permissions_administer_lab_link": ["AdministerLabLink"],
+    # permissions_url_check runs without a session, so no role decides it
+}
+
+
+def normalize_permission(name):
+    """Compare permissions by their words: "Project:create" -> "create project"."""
+    words = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", name)
+    words = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1 \2", words)
+    return " ".join(sorted(re.findall(r"[a-z0-9]+", words.lower())))
+
+
+class ExpectationResolver:
+    """Expected test outcomes computed from the server's role definitions."""
+
+    def __init__(self, lims=None, server="dev", cache_file=DEFAULT_CACHE_FILE, ttl=DEFAULT_CACHE_TTL):
+        """
+        Args:
+            lims: LIMS connection used to fetch roles that are not cached
+                  (optional if the cache already covers every role needed)
+            server: Server the role definitions come from (cache key)
+            cache_file: JSON cache of role -> permission names, per server
+            ttl: Seconds a cached role definition stays valid
+        """
+        self.lims = lims
+        self.server = server
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._roles = {}
+        self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, "r") as f:
+                cached = json.load(f).get(self.server, {})
+        except (OSError, json.JSONDecodeError):
+            return
+        now = time.time()
+        for role_name, entry in cached.items():
+            if now - entry.get("fetched_at", 0) < self.ttl:
+                self._roles[role_name] = entry
+
+    def _save_cache(self):
+        try:
+            with open(self.cache_file, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        data[self.server] = self._roles
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        with open(self.cache_file, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def refresh(self):
+        """Drop cached role definitions so they are fetched again."""
+        self._roles = {}
+
+    def prefetch(self, role_names):
+        """Fetch any role definitions not cached yet, then write the cache once."""
+        missing = [name for name in dict.fromkeys(role_names) if name not in self._roles]
+        if not missing:
+            return
+        if self.lims is None:
+            raise ValueError(f"No LIMS connection to fetch roles: {', '.join(missing)}")
+        for role_name in missing:
+            role_obj = self.lims.roles.get_by_name(role_name)
+            self._roles[role_name] = {
+                "permissions": sorted(p.name for p in role_obj.permissions),
+                "fetched_at": time.time(),
+            }
+            print(f"Fetched permissions for role '{role_name}' ({len(self._roles[role_name]['permissions'])})")
+        self._save_cache()
+
+    def role_permissions(self, role_name):
+        """Permission names granted by one role, as listed by Clarity."""
+        self.prefetch([role_name])
+        return self._roles[role_name]["permissions"]
+
+    def effective_permissions(self, role_names):
+        """Normalized permissions granted by a set of roles together."""
+        self.prefetch(role_names)
+        granted = set()
+        for role_name in role_names:
+            granted.update(normalize_permission(p) for p in self._roles[role_name]["permissions"])
+        return granted
+
+    def expected(self, module_name, role_names):
+        """
+        Expected outcome of one test for a role combination.
+
+        Returns:
+            bool or None: None if the module has no TEST_PERMISSION_MAP entry
+                          or the combination has no roles (not logged in)
+        """
+        required = TEST_PERMISSION_MAP.get(module_name)
+        if required is None or not role_names:
+            return None
+        granted = self.effective_permissions(role_names)
+        return all(normalize_permission(p) in granted for p in required)
+
+    def matrix(self, role_names):
+        """
+        PermissionMatrix over the given roles and every mapped test.
+
+        Returns:
+            PermissionMatrix: Rows in the order of role_names (duplicates removed)
+        """
+        from permission_matrix import PermissionMatrix
+
+        role_names = list(dict.fromkeys(role_names))
+        self.prefetch(role_names)
+        return PermissionMatrix(
+            {name: {normalize_permission(p) for p in self._roles[name]["permissions"]} for name in role_names},
+            {module: {normalize_permission(p) for p in required} for module, required in TEST_PERMISSION_MAP.items()},
+        )
+
+    def resolve_suite(self, role_names, suite):
+        """
+        Replace a suite's expected values with inferred ones where possible.
+
+        Args:
+            role_names: Clarity roles of the combination (None for Not Logged In)
+            suite: Dict of module -> configured expected value
+
+        Returns:
+            dict: Module -> expected value (configured value kept where nothing
+                  can be inferred)
+        """
+        resolved = {}
+        for module_name, configured in suite.items():
+            inferred = self.expected(module_name, role_names) if isinstance(module_name, str) else None
+            resolved[module_name] = configured if inferred is None else inferred
+        return resolved
+
+
+def _expected_matrix(combinations, resolver):
+    """
+    Expected outcomes of every mapped test for every logged-in combination.
+
+    Returns:
+        tuple: (PermissionMatrix, dict of combination name -> row, bool matrix)
+    """
+    logged_in = [c for c in combinations if c["roles"]]
+    matrix = resolver.matrix(role for c in logged_in for role in c["roles"])
+    expected = matrix.expected([c["roles"] for c in logged_in])
+    rows = {c["name"]: row for row, c in enumerate(logged_in)}
+    return matrix, rows, expected
+
+
+def _inferred(matrix, rows, expected, combination, module_name):
+    """Inferred value for one test of one combination, or None."""
+    column = matrix.test_column(module_name) if isinstance(module_name, str) else None
+    if column is None or combination["name"] not in rows:
+        return None
+    return bool(expected[rows[combination["name"]], column])
+
+
+def apply_inferred_expectations(combinations, resolver):
+    """Return combinations with each suite's expectations inferred from role definitions."""
+    matrix, rows, expected = _expected_matrix(combinations, resolver)
+    resolved = []
+    for combination in combinations:
+        suite = {}
+        for module_name, configured in combination["suite"].items():
+            inferred = _inferred(matrix, rows, expected, combination, module_name)
+            suite[module_name] = configured if inferred is None else inferred
+        resolved.append(dict(combination, suite=suite))
+    return resolved
+
+
+def find_drift(combinations, resolver):
+    """
+    Compare configured expectations with the ones implied by the server's roles.
+
+    Returns:
+        list: Dicts with "combination", "module", "configured" and "inferred"
+              for every test where the two disagree
+    """
+    matrix, rows, expected = _expected_matrix(combinations, resolver)
+    drift = []
+    for combination in combinations:
+        for module_name, configured in combination["suite"].items():
+            inferred = _inferred(matrix, rows, expected, combination, module_name)
+            if inferred is not None and inferred != configured:
+                drift.append({
+                    "combination": combination["name"],
+                    "module": module_name,
+                    "configured": configured,
+                    "inferred": inferred,
+                })
+    return drift
+
+
+def check_results(results_data, combinations, resolver):
+    """
+    Compare a run's observed outcomes with the role definitions in bulk.
+
+    Args:
+        results_data: Results JSON saved by RolePermissionTester
+        combinations: Combinations the run was built from
+        resolver: ExpectationResolver for the run's server
+
+    Returns:
+        list: Dicts with "combination", "module", "observed" and "inferred"
+              for every test whose observed outcome contradicts the roles
+    """
+    import numpy as np
+
+    logged_in = [c for c in combinations if c["roles"] and c["name"] in results_data.get("tests", {})]
+    matrix = resolver.matrix(role for c in logged_in for role in c["roles"])
+    column_by_test_name = {}
+    for module_name in matrix.tests:
+        test_name, _ = inspect_test_module(module_name)
+        if test_name:
+            column_by_test_name[test_name] = matrix.test_column(module_name)
+
+    observed = np.zeros((len(logged_in), len(matrix.tests)), dtype=bool)
+    known = np.zeros_like(observed)
+    for row, combination in enumerate(logged_in):
+        for test in results_data["tests"][combination["name"]]:
+            column = column_by_test_name.get(test.get("test_name"))
+            if column is not None and test.get("result") != "error":
+                observed[row, column] = bool(test.get("passed"))
+                known[row, column] = True
+
+    return [
+        {
+            "combination": logged_in[row]["name"],
+            "module": module_name,
+            "observed": not inferred,
+            "inferred": inferred,
+        }
+        for row, module_name, inferred in matrix.compare([c["roles"] for c in logged_in], observed, known)
+    ]
+
+
+def build_plan(resolver, main_suites, addon_suites, all_tests=False):
+    """
+    Build every role combination with inferred expectations.
+
+    Args:
+        resolver: ExpectationResolver for the server
+        main_suites: Dict like MAIN_ROLE_TEST_SUITES
+        addon_suites: Dict like ADD_ON_ROLE_TEST_SUITES
+        all_tests: Plan every mapped test for every logged-in combination,
+                   not just the configured ones
+
+    Returns:
+        list: Combinations as returned by role_matrix.build_combinations()
+    """
+    combinations = build_combinations(main_suites, addon_suites)
+    if all_tests:
+        for combination in combinations:
+            if combination["roles"]:
+                combination["suite"] = {m: True for m in TEST_PERMISSION_MAP}
+    return apply_inferred_expectations(combinations, resolver)
+
+
+def main():
+    """Print an inferred test plan, configuration drift, result check, or role permissions."""
+    parser = argparse.ArgumentParser(
+        description="Infer expected test outcomes from Clarity role definitions",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python expectation_resolver.py plan                # configured tests, inferred expectations
+  python expectation_resolver.py plan --all-tests    # every mapped test for every combination
+  python expectation_resolver.py drift               # where role_test_configs.py disagrees
+  python expectation_resolver.py check               # observed results that contradict the roles
+  python expectation_resolver.py permissions         # permission names per role
+"""
+    )
+    parser.add_argument("command", choices=["plan", "drift", "check", "permissions"])
+    parser.add_argument("-s", "--server", default="dev", choices=SERVER_NAMES, help="Server environment (default: dev)")
+    parser.add_argument("-a", "--account", default="MASTER", help="Account name for credentials (default: MASTER)")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached role definitions")
+    parser.add_argument("--all-tests", action="store_true", help="Plan every mapped test (plan only)")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE,
+                        help=f"Results file to check (check only, default: {DEFAULT_RESULTS_FILE})")
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args()
+
+    from role_test_configs import MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES
+    from change_role import get_lims_connection
+
+    lims, _ = get_lims_connection(account=args.account, server=args.server)
+    resolver = ExpectationResolver(lims, server=args.server)
+    if args.refresh:
+        resolver.refresh()
+
+    if args.command == "permissions":
+        role_names = [r for r in list(MAIN_ROLE_TEST_SUITES) + list(ADD_ON_ROLE_TEST_SUITES) if r != NOT_LOGGED_IN]
+        output = {role_name: resolver.role_permissions(role_name) for role_name in role_names}
+        if args.json:
+            print(json.dumps(output, indent=2))
+        else:
+            for role_name, permissions in output.items():
+                print(f"\n{role_name}:")
+                for permission in permissions:
+                    print(f"  - {permission}")
+        return
+
+    if args.command == "plan":
+        start = time.perf_counter()
+        plan = build_plan(resolver, MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES, all_tests=args.all_tests)
+        elapsed = time.perf_counter() - start
+        if args.json:
+            print(json.dumps(plan, indent=2))
+            return
+        for combination in plan:
+            print(f"\n{combination['name']}")
+            for module_name, expected in combination["suite"].items():
+                print(f"  {'✓' if expected else '✗'} {module_name}")
+        print(f"\nPlanned {len(plan)} combination(s) in {elapsed * 1000:.0f} ms")
+        return
+
+    if args.command == "check":
+        with open(args.results, "r") as f:
+            results_data = json.load(f)
+        combinations = build_combinations(MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES)
+        mismatches = check_results(results_data, combinations, resolver)
+        if args.json:
+            print(json.dumps(mismatches, indent=2))
+        else:
+            for item in mismatches:
+                print(f"  {item['combination']} / {item['module']}: "
+                      f"{'passed' if item['observed'] else 'failed'}, roles imply "
+                      f"{'pass' if item['inferred'] else 'fail'}")
+            print(f"\n{len(mismatches)} observed outcome(s) contradict the role definitions")
+        if mismatches:
+            sys.exit(1)
+        return
+
+    drift = find_drift(build_combinations(MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES), resolver)
+    if args.json:
+        print(json.dumps(drift, indent=2))
+    else:
+        for item in drift:
+            print(f"  {item['combination']} / {item['module']}: "
+                  f"configured {item['configured']}, roles imply {item['inferred']}")
+        print(f"\n{len(drift)} expectation(s) differ from the role definitions")
+    if drift:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Fixture Factory
+===============
+Creates the entities permission tests act on (projects, samples, users,
+controls, reagent kits) with the MASTER account over the REST API, before
+the run, instead of each test building its own victim through the UI.
+
+A test module declares what it needs:
+
+    FIXTURES = ("project",)
+
+    def test_delete_project(page, expected=True, server="dev", fixtures=None):
+        project = (fixtures or {}).get("project")   # {"name", "uri", "id"}
+
+The runner counts the fixtures every combination needs and creates them all
+up front: samples (and their tubes) through Clarity's batch endpoints, the
+other kinds concurrently over one pooled session. Each test run takes fresh
+fixtures from the pool; whatever is left (or was not deleted by the test) is
+deleted with the MASTER account at the end of the run.
+
+Samples cannot be deleted through the API, so sample fixtures live in a
+dedicated project and are reused across runs.
+"""
+
+import argparse
+import ast
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from api_probes import control_type_xml, project_xml, reagent_kit_xml, researcher_xml
+from clarity_api import ClarityAPI, entity_uri, list_uris, xml_escape
+from clarity_servers import SERVER_NAMES
+from role_matrix import PERMISSIONS_DIR
+
+FIXTURE_KINDS = ("project", "sample", "researcher", "control_type", "reagent_kit")
+NAME_PREFIX = "RA Fixture"
+PROJECT_OWNER = ("Emil", "Test")  # researcher that owns fixture projects
+FIXTURE_USER_ROLE = "Lab Operator (BTO)"
+SAMPLE_PROJECT_NAME = "Role Audit Fixtures"
+SAMPLE_CONTAINER_TYPE = "Tube"
+DEFAULT_WORKERS = 8
+
+
+def declared_fixtures(module_name):
+    """
+    FIXTURES declared by a permissions module, read without importing it.
+
+    Returns:
+        tuple: Fixture kinds, e.g. ("project",)
+    """
+    path = os.path.join(PERMISSIONS_DIR, f"{module_name}.py")
+    try:
+        with open(path, "r") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError):
+        return ()
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == "FIXTURES" for t in node.targets
+        ):
+            try:
+                return tuple(ast.literal_eval(node.value))
+            except ValueError:
+                return ()
+    return ()
+
+
+def count_fixtures(combinations, skip=()):
+    """
+    Fixtures needed to run every combination once.
+
+    Every test run consumes its own fixtures (delete tests destroy them).
+
+    Args:
+        combinations: Combinations from role_matrix.build_combinations()
+        skip: Modules that will not run in the browser (e.g. API probes)
+
+    Returns:
+        dict: Kind -> count
+    """
+    counts = {}
+    for combination in combinations:
+        for module_name in combination["suite"]:
+            if isinstance(module_name, str) and module_name not in skip:
+                for kind in declared_fixtures(module_name):
+                    counts[kind] = counts.get(kind, 0) + 1
+    return counts
+
+
+class FixtureFactory:
+    """Creates, hands out and cleans up test fixtures for one server."""
+
+    def __init__(self, server="dev", account="MASTER", workers=DEFAULT_WORKERS):
+        """
+        Args:
+            server: Server environment
+            account: Stored account used to create and delete fixtures
+            workers: Concurrent create/delete requests
+        """
+        self.server = server
+        self.workers = workers
+        self.api = ClarityAPI.for_account(server, account, pool_size=workers)
+        self.run_id = time.strftime("%m%d%H%M%S")
+        self._pool = {kind: [] for kind in FIXTURE_KINDS}
+        self._created = []  # URIs to delete at cleanup
+        self._lock = threading.Lock()
+        self._lookups = {}
+
+    # Lookups needed to build fixtures
+
+    def _lookup(self, key, path, tag, params=None):
+        if key not in self._lookups:
+            uris = list_uris(self.api.get(path, params=params), tag)
+            if not uris:
+                raise RuntimeError(f"Fixture setup failed: nothing found at {path} {params or ''}")
+            self._lookups[key] = uris[0]
+        return self._lookups[key]
+
+    def _owner_uri(self):
+        first_name, last_name = PROJECT_OWNER
+        return self._lookup("owner", "researchers", "researcher", {"firstname": first_name, "lastname": last_name})
+
+    def _name(self, kind, index):
+        return f"{NAME_PREFIX} {kind.replace('_', ' ').title()} {self.run_id}-{index}"
+
+    # Creation
+
+    def _create_one(self, kind, index):
+        """Create one non-sample fixture and return it."""
+        name = self._name(kind, index)
+        if kind == "project":
+            path, xml = "projects", project_xml(name, self._owner_uri())
+        elif kind == "researcher":
+            lab_uri = self._lookup("lab", "labs", "lab")
+            role_uri = self._lookup("role", "roles", "role", {"name": FIXTURE_USER_ROLE})
+            username = f"ra_fixture_{self.run_id}_{index}_{uuid.uuid4().hex[:4]}"
+            path, xml = "researchers", researcher_xml(name, lab_uri, username=username, role_uri=role_uri)
+            name = f"Role Audit {name}"  # full name as shown in User Management
+        elif kind == "control_type":
+            path, xml = "controltypes", control_type_xml(name)
+        elif kind == "reagent_kit":
+            path, xml = "reagentkits", reagent_kit_xml(name)
+        else:
+            raise ValueError(f"Unknown fixture kind '{kind}'")
+
+        response = self.api.post(path, xml)
+        uri = entity_uri(response)
+        if response.status_code not in (200, 201) or not uri:
+            raise RuntimeError(f"Creating {kind} fixture failed: HTTP {response.status_code} {response.text[:200]}")
+        with self._lock:
+            self._created.append(uri)
+        return {"kind": kind, "name": name, "uri": uri, "id": uri.rstrip("/").rsplit("/", 1)[-1]}
+
+    def _create_samples(self, count):
+        """Create sample fixtures with one batch call for tubes and one for samples."""
+        project_uri = self._lookup("sample_project", "projects", "project", {"name": SAMPLE_PROJECT_NAME}) \
+            if self._sample_project_exists() else self._create_sample_project()
+        type_uri = self._lookup("tube", "containertypes", "container-type", {"name": SAMPLE_CONTAINER_TYPE})
+
+        names = [self._name("sample", i) for i in range(1, count + 1)]
+        containers = "".join(
+            '<con:container xmlns:con="http://genologics.com/ri/container">'
+            f"<name>{xml_escape(name)}</name><type uri=\"{xml_escape(type_uri)}\"/></con:container>"
+            for name in names
+        )
+        response = self.api.post("containers/batch/create", f'<ri:details xmlns:ri="http://genologics.com/ri">{containers}</ri:details>')
+        container_uris = list_uris(response, "link")
+        if len(container_uris) != count:
+            raise RuntimeError(f"Creating sample tubes failed: HTTP {response.status_code} {response.text[:200]}")
+
+        samples = "".join(
+            "<smp:samplecreation>"
+            f"<name>{xml_escape(name)}</name>"
+            f'<project uri="{xml_escape(project_uri)}"/>'
+            f'<location><container uri="{xml_escape(container_uri)}"/><value>1:1</value></location>'
+            "</smp:samplecreation>"
+            for name, container_uri in zip(names, container_uris)
+        )
+        response = self.api.post("samples/batch/create", f'<smp:details xmlns:smp="http://genologics.com/ri/sample">{samples}</smp:details>')
+        sample_uris = list_uris(response, "link")
+        if len(sample_uris) != count:
+            raise RuntimeError(f"Creating samples failed: HTTP {response.status_code} {response.text[:200]}")
+        return [
+            {"kind": "sample", "name": name, "uri": uri, "id": uri.rstrip("/").rsplit("/", 1)[-1]}
+            for name, uri in zip(names, sample_uris)
+        ]
+
+    def _sample_project_exists(self):
+        return bool(list_uris(self.api.get("projects", params={"name": SAMPLE_PROJECT_NAME}), "project"))
+
+    def _create_sample_project(self):
+        response = self.api.post("projects", project_xml(SAMPLE_PROJECT_NAME, self._owner_uri()))
+        uri = entity_uri(response)
+        if not uri:
+            raise RuntimeError(f"Creating '{SAMPLE_PROJECT_NAME}' failed: HTTP {response.status_code}")
+        self._lookups["sample_project"] = uri
+        return uri
+
+    def prepare(self, counts):
+        """
+        Create fixtures in bulk.
+
+        Args:
+            counts: Dict of kind -> number needed (see count_fixtures())
+
+        Returns:
+            dict: Kind -> number created
+        """
+        start = time.time()
+        created = {}
+        if counts.get("sample"):
+            samples = self._create_samples(counts["sample"])
+            self._pool["sample"].extend(samples)
+            created["sample"] = len(samples)
+
+        jobs = [(kind, i) for kind, n in counts.items() if kind != "sample" for i in range(1, n + 1)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._create_one, kind, i) for kind, i in jobs]
+            for future in futures:
+                try:
+                    fixture = future.result()
+                except Exception as e:
+                    print(f"  Warning: {e}")
+                    continue
+                self._pool[fixture["kind"]].append(fixture)
+                created[fixture["kind"]] = created.get(fixture["kind"], 0) + 1
+
+        summary = ", ".join(f"{n} {kind}" for kind, n in created.items()) or "nothing"
+        print(f"Fixtures created: {summary} ({time.time() - start:.1f}s)")
+        return created
+
+    def take(self, kind):
+        """Take a fixture from the pool, creating one if the pool is empty."""
+        with self._lock:
+            if self._pool[kind]:
+                return self._pool[kind].pop(0)
+        if kind == "sample":
+            return self._create_samples(1)[0]
+        return self._create_one(kind, f"x{uuid.uuid4().hex[:4]}")
+
+    def fixtures_for(self, kinds):
+        """
+        Fixtures for one test run.
+
+        Returns:
+            dict: Kind -> fixture ({"kind", "name", "uri", "id"}); kinds that
+                  could not be provided are left out, so the test falls back
+                  to its own setup
+        """
+        fixtures = {}
+        for kind in kinds:
+            try:
+                fixtures[kind] = self.take(kind)
+            except Exception as e:
+                print(f"  Warning: No {kind} fixture available: {e}")
+        return fixtures
+
+    def cleanup(self):
+        """
+        Delete every fixture still present (samples excepted).
+
+        Returns:
+            list: URIs that could not be deleted
+        """
+        from teardown import Teardown
+
+        with self._lock:
+            uris, self._created = self._created, []
+            for kind in self._pool:
+                self._pool[kind] = []
+        leftovers = Teardown(self.server, workers=self.workers, api=self.api).delete_entities(uris, target="fixtures")
+        print(f"Fixtures cleaned up: {len(uris) - len(leftovers)}/{len(uris)}")
+        for uri in leftovers:
+            print(f"  Could not delete: {uri}")
+        return leftovers
+
+    def close(self):
+        self.api.close()
+
+
+def main():
+    """Show or create the fixtures a run needs."""
+    parser = argparse.ArgumentParser(description="Plan or create permission test fixtures")
+    parser.add_argument("-s", "--server", default="dev", choices=SERVER_NAMES, help="Server environment (default: dev)")
+    parser.add_argument("--create", action="store_true",
+                        help="Create the fixtures, then delete them again (smoke test)")
+    args = parser.parse_args()
+
+    from role_test_configs import MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES
+    from role_matrix import build_combinations
+
+    counts = count_fixtures(build_combinations(MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES))
+    print("Fixtures needed for a full run:")
+    for kind, count in counts.items():
+        print(f"  {kind}: {count}")
+    if not args.create:
+        return
+
+    factory = FixtureFactory(server=args.server)
+    try:
+        factory.prepare(counts)
+    finally:
+        leftovers = factory.cleanup()
+        factory.close()
+    if leftovers:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+HAR Record and Replay
+=====================
+Records the Clarity traffic of each permission test into its own HAR file
+and replays the UI suite from those files with Playwright's route-from-HAR,
+without the server:
+
+    python run_all_roles.py "Emil" "Test" --record-har      # live run, one HAR per role and test
+    python run_all_roles.py "Emil" "Test" --replay-har      # same run, served from the HARs
+
+Each test runs in a fresh browser context:
+  record  The context starts with the tester's login cookies and writes
+          test_results/har/<server>/<role>/<test>.har when the test ends
+  replay  The context answers every request from that HAR and aborts
+          anything that is not in it, so nothing reaches the network
+
+LIMS API calls (role switches, test setup) go through a cassette next to the
+HARs (lims_cassette.py), recorded and replayed along with them. Deep-link ids
+the tests resolved are kept next to them too (deep_links.json), and replays
+only use those, so page objects never call the API during a replay. Replays run
+headless without slow motion; the summary compares each test's replay time
+with its recorded time, which is the framework's own overhead.
+
+Useful for checking selector changes against a known page state and for
+timing the framework without the server in the loop. Fixtures, workflow
+restores and API probes need the live REST API and are not replayed.
+"""
+
+import json
+import os
+import re
+import time
+
+RECORD = "record"
+REPLAY = "replay"
+DEFAULT_DIR = "test_results/har"
+INDEX_FILE = "index.json"
+CASSETTE_FILE = "lims.cassette"
+DEEP_LINKS_FILE = "deep_links.json"
+BLANK_PAGE = "<!DOCTYPE html><html><body></body></html>"
+
+
+def _slug(name):
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_").lower() or "unnamed"
+
+
+def har_directory(server, directory=None):
+    """Folder for a server's HARs (default: test_results/har/<server>)."""
+    return directory or os.path.join(DEFAULT_DIR, server)
+
+
+class HarSession:
+    """Per-test HAR recording or replay for one run."""
+
+    def __init__(self, directory, mode, base_url):
+        """
+        Args:
+            directory: Folder holding one subfolder of HARs per role
+            mode: "record" or "replay"
+            base_url: Server root the tests navigate under
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown HAR mode '{mode}'")
+        if mode == REPLAY and not os.path.exists(os.path.join(directory, INDEX_FILE)):
+            raise FileNotFoundError(f"No recordings in '{directory}'. Run with --record-har first.")
+        self.directory = directory
+        self.mode = mode
+        self.base_url = base_url
+        self.index = self._load_index()
+        self.log = []  # {"role", "test", "seconds"} per test this run
+        self._open = {}  # id(page) -> (context, key, start)
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    @property
+    def cassette_path(self):
+        """LIMS cassette recorded and replayed with the HARs."""
+        return os.path.join(self.directory, CASSETTE_FILE)
+
+    @property
+    def deep_links_path(self):
+        """Deep-link ids resolved while recording, the only ones a replay uses."""
+        return os.path.join(self.directory, DEEP_LINKS_FILE)
+
+    def _load_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        return {}
+
+    def path(self, role_name, test_name):
+        return os.path.join(self.directory, _slug(role_name), f"{_slug(test_name)}.har")
+
+    def isolate(self, context):
+        """In replay, keep the tester's own page (between tests) off the network."""
+        if self.replaying:
+            context.route("**/*", lambda route: route.fulfill(status=200, content_type="text/html", body=BLANK_PAGE))
+
+    def open_page(self, context, role_name, test_name, logged_in=True):
+        """
+        A page in a fresh context that records to, or replays from, the test's HAR.
+
+        Args:
+            context: The tester's browser context (its login is carried over when recording)
+            role_name: Role combination the test runs under
+            test_name: Test function name
+            logged_in: False records from a logged-out context (the login test)
+
+        Returns:
+            Page: The page to run the test on; pass it to close_page() afterwards
+        """
+        path = self.path(role_name, test_name)
+        if self.replaying:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No recording for {test_name} as {role_name}: {path}")
+            test_context = context.browser.new_context(base_url=self.base_url)
+            test_context.route_from_har(path, not_found="abort")
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            test_context = context.browser.new_context(
+                base_url=self.base_url,
+                storage_state=context.storage_state() if logged_in else None,
+                record_har_path=path,
+                record_har_mode="minimal",
+            )
+        page = test_context.new_page()
+        self._open[id(page)] = (test_context, (role_name, test_name), time.time())
+        return page
+
+    def close_page(self, page):
+        """Close a test's context; when recording, this writes its HAR."""
+        test_context, (role_name, test_name), start = self._open.pop(id(page))
+        seconds = round(time.time() - start, 2)
+        test_context.close()
+        self.log.append({"role": role_name, "test": test_name, "seconds": seconds})
+        if not self.replaying:
+            self.index.setdefault(role_name, {})[test_name] = seconds
+
+    def save_index(self):
+        """Record the recorded tests and their live durations."""
+        if self.replaying:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, INDEX_FILE), "w") as f:
+            json.dump(self.index, f, indent=2)
+
+    def print_summary(self):
+        total = sum(entry["seconds"] for entry in self.log)
+        if not self.replaying:
+            print(f"HAR recordings: {len(self.log)} test(s) saved to {self.directory}")
+            return
+        recorded = [self.index.get(e["role"], {}).get(e["test"]) for e in self.log]
+        live = sum(s for s in recorded if s)
+        speedup = f", {live / total:.1f}x faster" if total and live else ""
+        print(f"HAR replay: {len(self.log)} test(s) in {total:.0f}s (recorded live: {live:.0f}s{speedup})")
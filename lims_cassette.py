@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+LIMS Cassette
+=============
+Record and replay the REST calls a LIMS connection makes, so scripts that
+walk thousands of entities (account_checker.py, role changes) can be re-run
+without the LIMS while their logic is being worked on.
+
+  record  Calls go to the server as usual; every request/response pair is
+          kept and written to the cassette (gzipped JSON lines) at exit
+  replay  Nothing goes over the network: responses come from the cassette,
+          held in memory. A request that was never recorded raises
+          CassetteMiss
+
+Requests are matched on account, method, URI and a hash of the body. A
+request made several times replays its responses in recorded order (the last
+one repeats), so re-reading an entity after a commit sees the new state.
+Replay is thread-safe.
+
+Connections to the same cassette file share one Cassette (open_cassette()),
+so several accounts (MASTER and TEST, say) record into one file, saved once
+at exit, and each replays its own responses under its own username.
+
+Any LIMS connection from change_role.get_lims_connection() uses a cassette
+when ROLE_AUDIT_CASSETTE is set (ROLE_AUDIT_CASSETTE_MODE=record|replay,
+default replay):
+    ROLE_AUDIT_CASSETTE=roles.cassette ROLE_AUDIT_CASSETTE_MODE=record python change_role.py ...
+    python account_checker.py staff.xlsx --record accounts.cassette
+    python account_checker.py staff.xlsx --replay accounts.cassette
+"""
+
+import argparse
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+RECORD = "record"
+REPLAY = "replay"
+MODES = (RECORD, REPLAY)
+DEFAULT_ACCOUNT = "default"  # account name for connections that don't give one
+
+
+class CassetteMiss(LookupError):
+    """A replayed request that is not in the cassette."""
+
+
+class ReplayedError(Exception):
+    """An exception that was raised while recording, raised again on replay."""
+
+    def __init__(self, message, status_code=None, type_name=None):
+        super().__init__(message)
+        self.type_name = type_name
+        self.response = CassetteResponse(status_code, "") if status_code is not None else None
+
+
+class CassetteResponse:
+    """The parts of a requests.Response that LIMS callers read."""
+
+    def __init__(self, status_code, text, headers=None, url=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.url = url
+        self.reason = ""
+
+    @property
+    def content(self):
+        return self.text.encode("utf-8")
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise ReplayedError(f"HTTP {self.status_code} for {self.url}", self.status_code)
+
+
+def _body_hash(body):
+    if body is None or body == "":
+        return None
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+class Cassette:
+    """Request/response pairs for one LIMS, loaded into memory."""
+
+    def __init__(self, path, mode=REPLAY):
+        """
+        Args:
+            path: Cassette file (gzipped JSON lines)
+            mode: "record" or "replay"
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'. Choose from: {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.meta = {"accounts": {}}  # account -> username it recorded as
+        self._interactions = {}  # (account, method, uri, body hash) -> [entry, ...]
+        self._played = Counter()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.recorded = 0
+        if mode == REPLAY:
+            self.load()
+
+    @staticmethod
+    def key(method, uri, body=None, account=DEFAULT_ACCOUNT):
+        return (account, method.upper(), uri, _body_hash(body))
+
+    def load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette '{self.path}' not found. Record it first.")
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            self.meta = json.loads(f.readline())
+            self.meta.setdefault("accounts", {})
+            for line in f:
+                entry = json.loads(line)
+                key = (entry.get("a", DEFAULT_ACCOUNT), entry["m"], entry["u"], entry["b"])
+                self._interactions.setdefault(key, []).append(entry)
+
+    def add_account(self, account, username):
+        """Note which username an account records as."""
+        with self._lock:
+            self.meta["accounts"][account] = username
+
+    def username(self, account=DEFAULT_ACCOUNT):
+        """Username an account recorded as (None if it never recorded)."""
+        return self.meta["accounts"].get(account, self.meta.get("username"))
+
+    def save(self):
+        """Write everything recorded so far."""
+        with self._lock:
+            entries = [entry for entries in self._interactions.values() for entry in entries]
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with gzip.open(self.path, "wt", encoding="utf-8") as f:
+                f.write(json.dumps(self.meta) + "\n")
+                for entry in sorted(entries, key=lambda e: e["n"]):
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def record(self, method, uri, body, response=None, error=None, account=DEFAULT_ACCOUNT):
+        """Keep one interaction: a response, or the exception the request raised."""
+        key = self.key(method, uri, body, account)
+        entry = {"a": key[0], "m": key[1], "u": key[2], "b": key[3]}
+        if error is not None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+            entry.update(e=str(error), et=type(error).__name__, s=status)
+        else:
+            entry.update(s=response.status_code, t=response.text,
+                         ct=response.headers.get("Content-Type", "application/xml"))
+        with self._lock:
+            entry["n"] = self.recorded
+            self.recorded += 1
+            self._interactions.setdefault(key, []).append(entry)
+
+    def play(self, method, uri, body=None, account=DEFAULT_ACCOUNT):
+        """
+        The recorded response for a request, as the given account made it.
+
+        Raises:
+            CassetteMiss: If it was never recorded
+            ReplayedError: If it raised while recording
+        """
+        key = self.key(method, uri, body, account)
+        with self._lock:
+            entries = self._interactions.get(key)
+            if not entries:
+                raise CassetteMiss(f"{key[1]} {uri} as {account} is not in cassette '{self.path}'")
+            entry = entries[min(self._played[key], len(entries) - 1)]
+            self._played[key] += 1
+            self.hits += 1
+        if "e" in entry:
+            raise ReplayedError(entry["e"], entry.get("s"), entry.get("et"))
+        return CassetteResponse(entry["s"], entry["t"], {"Content-Type": entry.get("ct")}, uri)
+
+    def summary(self):
+        """Interaction counts per method and resource."""
+        counts = Counter()
+        for (_, method, uri, _), entries in self._interactions.items():
+            parts = urlsplit(uri).path.split("/api/v2/", 1)
+            resource = parts[1].split("/")[0] if len(parts) == 2 else "(root)"
+            counts[f"{method} {resource}"] += len(entries)
+        return dict(counts.most_common())
+
+
+_cassettes = {}  # absolute path -> Cassette shared by every connection in the process
+_cassettes_lock = threading.Lock()
+
+
+def open_cassette(path, mode=REPLAY):
+    """
+    The process-wide Cassette for a file, created on first use.
+
+    In record mode it is saved once at exit, with every account's calls.
+
+    Raises:
+        ValueError: If the file is already open in the other mode
+    """
+    key = os.path.abspath(path)
+    with _cassettes_lock:
+        cassette = _cassettes.get(key)
+        if cassette is None:
+            cassette = _cassettes[key] = Cassette(path, mode)
+            if mode == RECORD:
+                atexit.register(cassette.save)
+        elif cassette.mode != mode:
+            raise ValueError(f"Cassette '{path}' is already open for {cassette.mode}")
+        return cassette
+
+
+def use_cassette(lims, path, mode=REPLAY, username=None, account=DEFAULT_ACCOUNT):
+    """
+    Record or replay every call made through a LIMS connection.
+
+    Wraps lims.request like throttle_lims and protect_lims. Apply it last, so
+    replayed calls skip the rate limiter and circuit breaker.
+
+    Args:
+        lims: LIMS connection
+        path: Cassette file, shared with other connections that use it
+        mode: "record" or "replay"
+        username: Username the connection records as
+        account: Stored account the connection belongs to; its calls are
+                 recorded and replayed separately from other accounts'
+
+    Returns:
+        Cassette: The cassette in use (also set as lims.cassette)
+    """
+    cassette = open_cassette(path, mode)
+    request = lims.request
+
+    if mode == RECORD:
+        cassette.add_account(account, username)
+
+        def recording_request(method, uri, *args, **kwargs):
+            body = kwargs.get("xml_data", args[0] if args else None)
+            try:
+                response = request(method, uri, *args, **kwargs)
+            except Exception as e:
+                cassette.record(method, uri, body, error=e, account=account)
+                raise
+            cassette.record(method, uri, body, response=response, account=account)
+            return response
+
+        lims.request = recording_request
+    else:
+        def replaying_request(method, uri, *args, **kwargs):
+            return cassette.play(method, uri, kwargs.get("xml_data", args[0] if args else None), account)
+
+        lims.request = replaying_request
+    lims.cassette = cassette
+    return cassette
+
+
+def cassette_username(path, account=DEFAULT_ACCOUNT):
+    """Username an account recorded a cassette as, for replaying without credentials."""
+    return open_cassette(path, REPLAY).username(account)
+
+
+def env_cassette():
+    """
+    Cassette settings from ROLE_AUDIT_CASSETTE and ROLE_AUDIT_CASSETTE_MODE.
+
+    Returns:
+        tuple: (path, mode), or None if no cassette is configured
+    """
+    path = os.environ.get("ROLE_AUDIT_CASSETTE")
+    if not path:
+        return None
+    return path, os.environ.get("ROLE_AUDIT_CASSETTE_MODE", REPLAY)
+
+
+def main():
+    """Show what a cassette contains."""
+    parser = argparse.ArgumentParser(description="Show the interactions recorded in a LIMS cassette")
+    parser.add_argument("path", help="Cassette file")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.path, REPLAY)
+    total = sum(cassette.summary().values())
+    accounts = ", ".join(f"{account} ({username})" for account, username in cassette.meta["accounts"].items())
+    print(f"{args.path}: {total} interaction(s), recorded as {accounts or cassette.meta.get('username') or 'unknown user'}")
+    for name, n in cassette.summary().items():
+        print(f"  {n:>7}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Load Generation Mode
+====================
+Replays a mix of permission tests as N concurrent virtual users to measure
+how Clarity behaves under permission-check load.
+
+Each virtual user has its own browser, logs in with the TEST account, then
+keeps picking tests from the mix (weighted) until the run ends. Users start
+one by one over the ramp-up period. Latency percentiles are recorded for:
+  - every Playwright action the tests perform (goto, click, fill, ...)
+  - every XHR/fetch request Clarity's UI makes, grouped by endpoint
+
+Tests that pass locators to playwright's expect() are not supported, since
+the timing wrapper hides the real Locator type.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from clarity_servers import SERVER_NAMES, base_url
+from role_matrix import percentile
+from role_permission_tester import load_test_function, call_test_function
+
+DEFAULT_MIX = "permissions_clarity_login:1,permissions_overview_dashboard:2,permissions_read_user:2,permissions_read_process:2"
+LOGIN_TEST = "permissions_clarity_login"
+RESULTS_DIR = "test_results/load_tests"
+PERCENTILES = (50, 90, 95, 99)
+
+# Page/Locator methods that wait on the browser or server; plain sleeps
+# (wait_for_timeout) and queries like count() are not timed
+TIMED_ACTIONS = {
+    "goto", "reload", "click", "dblclick", "fill", "type", "press", "check",
+    "select_option", "hover", "drag_and_drop", "wait_for", "wait_for_selector",
+    "wait_for_load_state", "wait_for_url", "is_visible", "inner_text", "text_content",
+}
+LOCATOR_TYPES = {"Locator", "FrameLocator"}
+
+
+class LatencyRecorder:
+    """Thread-safe collection of latency samples and error counts by key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, key, seconds):
+        with self._lock:
+            self.samples.setdefault(key, []).append(seconds)
+
+    def record_error(self, key):
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self):
+        """Per-key count, error count, and latency percentiles in milliseconds."""
+        with self._lock:
+            keys = sorted(set(self.samples) | set(self.errors))
+            summary = {}
+            for key in keys:
+                values = self.samples.get(key, [])
+                entry = {"count": len(values), "errors": self.errors.get(key, 0)}
+                if values:
+                    for pct in PERCENTILES:
+                        entry[f"p{pct}_ms"] = round(percentile(values, pct) * 1000, 1)
+                    entry["max_ms"] = round(max(values) * 1000, 1)
+                summary[key] = entry
+            return summary
+
+
+class _Timed:
+    """Wraps a Page or Locator and records how long each action takes."""
+
+    def __init__(self, target, recorder, label):
+        self._target = target
+        self._recorder = recorder
+        self._label = label
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            # Properties like locator.first return another Locator
+            return self._wrap(attr)
+
+        def timed_call(*args, **kwargs):
+            args = [a._target if isinstance(a, _Timed) else a for a in args]
+            kwargs = {k: v._target if isinstance(v, _Timed) else v for k, v in kwargs.items()}
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception:
+                if name in TIMED_ACTIONS:
+                    self._recorder.record_error(f"{self._label}.{name}")
+                raise
+            if name in TIMED_ACTIONS:
+                self._recorder.record(f"{self._label}.{name}", time.perf_counter() - start)
+            return self._wrap(result)
+
+        return timed_call
+
+    def _wrap(self, value):
+        if type(value).__name__ in LOCATOR_TYPES:
+            return _Timed(value, self._recorder, "locator")
+        return value
+
+
+def normalize_endpoint(method, url):
+    """Group requests by endpoint, e.g. "GET /clarity/api/projects/{id}"."""
+    path = urlsplit(url).path
+    segments = ["{id}" if re.search(r"\d", segment) else segment for segment in path.split("/")]
+    return f"{method} {'/'.join(segments)}"
+
+
+def parse_mix(spec):
+    """
+    Parse a test mix like "permissions_clarity_login:1,permissions_read_user:3".
+
+    Returns:
+        list: (module name, weight) tuples
+    """
+    mix = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        module_name, _, weight = item.partition(":")
+        mix.append((module_name, float(weight) if weight else 1.0))
+    if not mix:
+        raise ValueError("Test mix is empty")
+    return mix
+
+
+class LoadTest:
+    """Runs a test mix as concurrent virtual users and records latencies."""
+
+    def __init__(self, server="dev", users=5, ramp_up=30, duration=300, mix=None,
+                 target_url=None, headless=True, seed=0):
+        """
+        Args:
+            server: Server name passed to tests that call the API
+            users: Number of concurrent virtual users
+            ramp_up: Seconds over which users are started
+            duration: Seconds each user keeps running tests after it starts
+            mix: List of (module name, weight) tuples
+            target_url: Web UI root to load (default: the server's base URL)
+            headless: Run browsers headless
+            seed: Random seed, so a run's test sequence can be reproduced
+        """
+        self.server = server
+        self.users = users
+        self.ramp_up = ramp_up
+        self.duration = duration
+        self.mix = mix or parse_mix(DEFAULT_MIX)
+        self.target_url = target_url or base_url(server)
+        self.headless = headless
+        self.seed = seed
+        self.actions = LatencyRecorder()
+        self.requests = LatencyRecorder()
+        self.tests = LatencyRecorder()
+        self.outcomes = {"passed": 0, "failed": 0, "error": 0}
+        self._outcome_lock = threading.Lock()
+
+    def run(self):
+        """Start all virtual users, wait for them to finish and return the report."""
+        print("=" * 80)
+        print("LOAD TEST")
+        print("=" * 80)
+        print(f"Target: {self.target_url}")
+        print(f"Users: {self.users} (ramp-up {self.ramp_up}s, {self.duration}s each)")
+        print("Mix: " + ", ".join(f"{name}×{weight:g}" for name, weight in self.mix))
+        print("=" * 80)
+
+        started = time.time()
+        threads = []
+        for user_idx in range(self.users):
+            delay = self.ramp_up * user_idx / max(self.users, 1)
+            thread = threading.Thread(target=self._virtual_user, args=(user_idx, delay),
+                                      name=f"vu-{user_idx + 1}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+        report = self.report(time.time() - started)
+        self.print_report(report)
+        return report
+
+    def _virtual_user(self, user_idx, delay):
+        """One virtual user: own browser, login, then weighted random tests."""
+        from playwright.sync_api import sync_playwright
+
+        time.sleep(delay)
+        rng = random.Random(self.seed + user_idx)
+        names = [name for name, _ in self.mix]
+        weights = [weight for _, weight in self.mix]
+        print(f"[vu-{user_idx + 1}] starting")
+
+        with sync_playwright() as playwright:
+            browser = playwright.chromium.launch(headless=self.headless)
+            context = browser.new_context(base_url=self.target_url)
+            page = context.new_page()
+            self._watch_requests(page)
+            timed_page = _Timed(page, self.actions, "page")
+
+            try:
+                self._run_one(timed_page, LOGIN_TEST, user_idx)
+                deadline = time.time() + self.duration
+                while time.time() < deadline:
+                    self._run_one(timed_page, rng.choices(names, weights)[0], user_idx)
+            finally:
+                browser.close()
+        print(f"[vu-{user_idx + 1}] finished")
+
+    def _watch_requests(self, page):
+        """Record latency of every XHR/fetch request the page makes."""
+        def on_finished(request):
+            if request.resource_type not in ("xhr", "fetch"):
+                return
+            timing = request.timing
+            if timing.get("responseEnd", -1) > 0:
+                self.requests.record(normalize_endpoint(request.method, request.url), timing["responseEnd"] / 1000)
+
+        def on_response(response):
+            if response.request.resource_type in ("xhr", "fetch") and response.status >= 400:
+                self.requests.record_error(normalize_endpoint(response.request.method, response.url))
+
+        def on_failed(request):
+            if request.resource_type in ("xhr", "fetch"):
+                self.requests.record_error(normalize_endpoint(request.method, request.url))
+
+        page.on("requestfinished", on_finished)
+        page.on("response", on_response)
+        page.on("requestfailed", on_failed)
+
+    def _run_one(self, page, module_name, user_idx):
+        """Run one test, recording its duration and outcome."""
+        test_function = load_test_function(module_name)
+        if test_function is None:
+            return
+        start = time.perf_counter()
+        try:
+            result = call_test_function(test_function, page, expected=True, server=self.server)
+            outcome = "passed" if result.get("passed") else "failed"
+        except Exception as e:
+            print(f"[vu-{user_idx + 1}] {module_name} error: {e}")
+            self.tests.record_error(module_name)
+            outcome = "error"
+        self.tests.record(module_name, time.perf_counter() - start)
+        with self._outcome_lock:
+            self.outcomes[outcome] += 1
+
+    def report(self, elapsed):
+        """Build the run report."""
+        return {
+            "server": self.server,
+            "target_url": self.target_url,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "users": self.users,
+            "ramp_up": self.ramp_up,
+            "duration": self.duration,
+            "elapsed": round(elapsed, 1),
+            "mix": dict(self.mix),
+            "outcomes": dict(self.outcomes),
+            "tests": self.tests.summary(),
+            "actions": self.actions.summary(),
+            "requests": self.requests.summary(),
+        }
+
+    @staticmethod
+    def print_report(report):
+        """Print latency tables for tests, actions and requests."""
+        print("\n" + "=" * 80)
+        print("LOAD TEST SUMMARY")
+        print("=" * 80)
+        print(f"Elapsed: {report['elapsed']}s")
+        outcomes = report["outcomes"]
+        print(f"Tests run: {sum(outcomes.values())} "
+              f"(passed {outcomes['passed']}, failed {outcomes['failed']}, error {outcomes['error']})")
+
+        for section in ("tests", "actions", "requests"):
+            rows = report[section]
+            if not rows:
+                continue
+            print(f"\n{section.upper()}")
+            print(f"  {'name':<58} {'n':>6} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8}")
+            for name, row in sorted(rows.items(), key=lambda item: -item[1].get("p95_ms", 0)):
+                print(f"  {name[:58]:<58} {row['count']:>6} {row['errors']:>5} "
+                      f"{row.get('p50_ms', 0):>8.0f} {row.get('p95_ms', 0):>8.0f} {row.get('p99_ms', 0):>8.0f}")
+
+
+def save_report(report, filename=None):
+    """Save a load test report as JSON."""
+    if not filename:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.join(RESULTS_DIR, f"load_test_{timestamp}.json")
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nLoad test report saved to: {filename}")
+    return filename
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Replay permission tests as concurrent virtual users",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+Examples:
+  python load_test.py --users 10 --ramp-up 60 --duration 600
+  python load_test.py --server local --users 20 --duration 120
+  python load_test.py --mix permissions_clarity_login:1,permissions_read_user:4
+
+Default mix: {DEFAULT_MIX}
+"""
+    )
+    parser.add_argument("-s", "--server", default="dev", choices=SERVER_NAMES,
+                        help="Server environment (default: dev; 'local' for a stand-in server)")
+    parser.add_argument("-u", "--users", type=int, default=5, help="Concurrent virtual users (default: 5)")
+    parser.add_argument("--ramp-up", type=float, default=30, help="Seconds to start all users (default: 30)")
+    parser.add_argument("--duration", type=float, default=300,
+                        help="Seconds each user runs tests after starting (default: 300)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted tests: module[:weight],...")
+    parser.add_argument("--base-url", help="Override the web UI root, e.g. http://127.0.0.1:9000")
+    parser.add_argument("--headed", action="store_true", help="Show the browsers")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the test sequence")
+    parser.add_argument("-o", "--output", help="Report JSON file (default: test_results/load_tests/...)")
+
+    args = parser.parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    load_test = LoadTest(
+        server=args.server,
+        users=args.users,
+        ramp_up=args.ramp_up,
+        duration=args.duration,
+        mix=mix,
+        target_url=args.base_url,
+        headless=not args.headed,
+        seed=args.seed,
+    )
+    report = load_test.run()
+    save_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Merge Sharded Results
+=====================
+Combines the per-shard results written by `run_all_roles.py --shard i/N`
+(or per-worker results from `--worker`) into a single results file that
+PDFReportGenerator can read.
+
+Partial results live in test_results/runs/<run id>/, so `--run <run id>`
+merges exactly one run. Files from different runs, or shards of different
+splits (e.g. a leftover 2/4 next to 1/3), are rejected instead of merged.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from role_matrix import run_dir
+
+RUN_FILES = "all_role_tests_*.json"
+DEFAULT_OUTPUT = "test_results/all_role_tests.json"
+
+
+def run_files(run_id):
+    """Partial results files of one run (see role_matrix.run_dir())."""
+    return sorted(glob.glob(os.path.join(run_dir(run_id), RUN_FILES)))
+
+
+def check_run(runs):
+    """
+    Make sure results files belong to one run and, if sharded, one split.
+
+    Files without run info (written before runs had ids, or by hand) can be
+    merged with each other but not with files of a run.
+
+    Args:
+        runs: List of (path, results data)
+
+    Raises:
+        ValueError: If the files come from different runs or splits, or a
+                    shard appears twice
+    """
+    ids = {(data.get("run") or {}).get("id") for _, data in runs}
+    if len(ids) > 1:
+        raise ValueError(f"Results files come from different runs: {', '.join(sorted(map(str, ids)))}")
+    shards = {path: data["run"]["shard"] for path, data in runs if "shard" in (data.get("run") or {})}
+    if not shards:
+        return
+    if len(shards) != len(runs):
+        raise ValueError("Shard results can't be merged with worker or unsharded results")
+    counts = {count for _, count in shards.values()}
+    if len(counts) > 1:
+        raise ValueError("Shards of different splits: " + ", ".join(
+            f"{path} ({index}/{count})" for path, (index, count) in sorted(shards.items())))
+    count = counts.pop()
+    indexes = sorted(index for index, _ in shards.values())
+    if len(set(indexes)) != len(indexes):
+        raise ValueError(f"Shard appears more than once: {indexes}")
+    missing = sorted(set(range(1, count + 1)) - set(indexes))
+    if missing:
+        print(f"Warning: Shard(s) {', '.join(f'{i}/{count}' for i in missing)} missing; "
+              "their combinations won't be in the report")
+
+
+def merge_results(input_files, output_file=DEFAULT_OUTPUT):
+    """
+    Merge several results files into one.
+
+    Role combinations are merged by name; if the same combination appears in
+    more than one file, the file with the later timestamp wins. The files
+    must belong to one run (see check_run()).
+
+    Args:
+        input_files: List of results JSON paths
+        output_file: Path of the merged results file
+
+    Returns:
+        dict: The merged results data
+
+    Raises:
+        ValueError: If there is nothing to merge, or the files don't belong
+                    to one run
+    """
+    runs = []
+    for path in input_files:
+        with open(path, "r") as f:
+            runs.append((path, json.load(f)))
+    if not runs:
+        raise ValueError("No results files to merge")
+    check_run(runs)
+
+    runs.sort(key=lambda run: run[1].get("timestamp", ""))
+    servers = sorted({data.get("server", "unknown") for _, data in runs})
+    if len(servers) > 1:
+        print(f"Warning: Merging results from different servers: {', '.join(servers)}")
+
+    merged = {
+        "server": runs[-1][1].get("server", "unknown"),
+        "timestamp": runs[-1][1].get("timestamp", ""),
+        "tests": {},
+    }
+    for path, data in runs:
+        tests = data.get("tests", {})
+        print(f"  {path}: {len(tests)} role combination(s)")
+        merged["tests"].update(tests)
+
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, "w") as f:
+        json.dump(merged, f, indent=2)
+    print(f"\nMerged {len(merged['tests'])} role combination(s) into: {output_file}")
+    return merged
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Merge sharded role test results into one results file",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python merge_results.py --run nightly-42
+  python merge_results.py --run nightly-42 --pdf
+  python merge_results.py host1.json host2.json host3.json -o test_results/all_role_tests.json
+"""
+    )
+    parser.add_argument("inputs", nargs="*",
+                        help="Results files to merge (instead of --run)")
+    parser.add_argument("--run", metavar="RUN_ID",
+                        help="Merge the partial results of this run (test_results/runs/<run id>/)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT,
+                        help=f"Merged results file (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--pdf", action="store_true",
+                        help="Generate the PDF report from the merged results")
+
+    args = parser.parse_args()
+
+    if bool(args.inputs) == bool(args.run):
+        parser.error("give either --run or the results files to merge")
+    input_files = args.inputs or run_files(args.run)
+    if not input_files:
+        print(f"Error: No results found for run '{args.run}' in {run_dir(args.run)}")
+        sys.exit(1)
+
+    print(f"Merging {len(input_files)} results file(s)...")
+    try:
+        merge_results(input_files, args.output)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.pdf:
+        from generate_pdf_report import PDFReportGenerator
+        pdf_file = PDFReportGenerator(json_file=args.output).generate_pdf()
+        print(f"PDF report available at: {pdf_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Permission Matrix
+=================
+Vectorized expected outcomes for many role combinations at once.
+
+Every role is a bit vector over the permission universe (one row of a
+roles x permissions boolean matrix). A combination's effective permissions
+are the OR of its roles' rows, computed for all combinations in one matrix
+product. A test is expected to pass when the effective permissions cover
+every permission it requires, which is another single product against the
+tests x permissions requirement matrix.
+
+Requires NumPy.
+"""
+
+import numpy as np
+
+
+class PermissionMatrix:
+    """Roles and tests as bit vectors over a shared permission universe."""
+
+    def __init__(self, role_permissions, test_requirements):
+        """
+        Args:
+            role_permissions: Dict of role name -> normalized permission names
+            test_requirements: Dict of test module -> normalized permission
+                               names it needs (all of them)
+        """
+        self.roles = list(role_permissions)
+        self.tests = list(test_requirements)
+        self.permissions = sorted(
+            set().union(*role_permissions.values(), *test_requirements.values())
+        )
+        self._role_index = {name: i for i, name in enumerate(self.roles)}
+        self._test_index = {name: i for i, name in enumerate(self.tests)}
+        permission_index = {name: i for i, name in enumerate(self.permissions)}
+
+        self.grants = np.zeros((len(self.roles), len(self.permissions)), dtype=bool)
+        for row, permissions in enumerate(role_permissions.values()):
+            self.grants[row, [permission_index[p] for p in permissions]] = True
+
+        self.requires = np.zeros((len(self.tests), len(self.permissions)), dtype=bool)
+        for row, permissions in enumerate(test_requirements.values()):
+            self.requires[row, [permission_index[p] for p in permissions]] = True
+
+    def membership(self, combinations):
+        """
+        Combinations x roles indicator matrix.
+
+        Args:
+            combinations: List of role name lists
+        """
+        members = np.zeros((len(combinations), len(self.roles)), dtype=np.int32)
+        for row, role_names in enumerate(combinations):
+            members[row, [self._role_index[name] for name in role_names]] = 1
+        return members
+
+    def effective(self, combinations):
+        """Combinations x permissions matrix: the OR of each combination's roles."""
+        return (self.membership(combinations) @ self.grants.astype(np.int32)) > 0
+
+    def expected(self, combinations):
+        """
+        Combinations x tests matrix of expected outcomes.
+
+        A test is expected to pass when every permission it requires is held,
+        i.e. when the count of held required permissions equals the count
+        required.
+        """
+        held = self.effective(combinations).astype(np.int32) @ self.requires.T.astype(np.int32)
+        return held == self.requires.sum(axis=1)
+
+    def test_column(self, module_name):
+        """Column of a test in expected(), or None if the test is not mapped."""
+        return self._test_index.get(module_name)
+
+    def compare(self, combinations, observed, known):
+        """
+        Compare observed outcomes with expected ones for a whole run.
+
+        Args:
+            combinations: List of role name lists (rows)
+            observed: Combinations x tests bool matrix of observed "passed"
+            known: Combinations x tests bool matrix, True where a test ran
+
+        Returns:
+            list: (row, test module, expected) for every mismatch
+        """
+        expected = self.expected(combinations)
+        rows, cols = np.nonzero(known & (observed != expected))
+        return [(int(r), self.tests[c], bool(expected[r, c])) for r, c in zip(rows, cols)]
@@ -0,0 +1,204 @@
+"""
+Deep Links
+==========
+Direct Clarity URLs for the pages tests act on, so a test lands on its
+target with one page.goto() instead of clicking "PROJECTS & Samples",
+typing a project name into the filter and waiting for the row:
+
+    from .deep_links import get_deep_links
+
+    links = get_deep_links(server)
+    page.goto(links.project("ED_TEST"))                     # project page, project selected
+    page.goto(links.step("Emil Master Step Test"))          # queue of a protocol step
+    page.goto(links.work_complete("Emil Master Step Test")) # most recent run of a step
+    page.goto(links.configuration("Controls"))              # Configuration > Consumables > Controls
+
+Project and step names are resolved to LIMS ids through the API (MASTER
+account) the first time and cached per server in
+test_results/deep_links/<server>.json; their ids don't change, so later
+runs make no lookups. Drop an entry with forget() if its entity was
+recreated. The most recent run of a step changes with every run, so
+work_complete(step_name) looks it up on each call and never caches it.
+The URL patterns are in PATHS and CONFIGURATION_ROUTES.
+
+HAR runs (run_all_roles.py --record-har/--replay-har) keep the ids with the
+recordings: ROLE_AUDIT_DEEP_LINKS names the id file, and with
+ROLE_AUDIT_DEEP_LINKS_MODE=replay nothing is looked up, so a replay never
+reaches the API. An id that wasn't recorded raises LookupError.
+"""
+
+import json
+import os
+import re
+import threading
+
+from clarity_api import list_uris
+
+CACHE_DIR = "test_results/deep_links"
+REPLAY = "replay"
+
+# Clarity UI routes; {id} is the LIMS id (or the numeric part of a process id)
+PATHS = {
+    "project": "/clarity/samples?projectLimsid={id}",
+    "queue": "/clarity/queue/{id}",
+    "work_details": "/clarity/work-details/{id}",
+    "work_complete": "/clarity/work-complete/{id}",
+    "configuration": "/clarity/configuration#{id}",
+}
+
+# Configuration tab -> route; nested tabs include their parent
+CONFIGURATION_ROUTES = {
+    "Lab Work": "labwork",
+    "Master Steps": "labwork/mastersteps",
+    "Consumables": "consumables",
+    "Controls": "consumables/controls",
+    "Reagents": "consumables/reagents",
+    "User Management": "usermanagement",
+    "Users": "usermanagement/users",
+    "Roles and Permissions": "usermanagement/roles",
+}
+
+
+def _limsid(uri):
+    """LIMS id at the end of an API URI, e.g. ".../projects/ADM5A1" -> "ADM5A1"."""
+    return uri.split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+
+
+class DeepLinks:
+    """Resolves logical targets to Clarity URLs for one server."""
+
+    def __init__(self, server="dev", account="MASTER", api=None, cache_file=None, offline=False):
+        """
+        Args:
+            server: Server environment
+            account: Stored account used for the lookups
+            api: Existing ClarityAPI client to share instead of opening one
+            cache_file: Id cache (default: test_results/deep_links/<server>.json)
+            offline: Only use cached ids; a miss raises LookupError instead of
+                     calling the API
+        """
+        self.server = server
+        self.account = account
+        self.offline = offline
+        self._api = api
+        self._lock = threading.Lock()
+        self.cache_file = cache_file or os.path.join(CACHE_DIR, f"{server}.json")
+        self._ids = self._load()
+        self.lookups = 0
+
+    @property
+    def api(self):
+        """REST client, opened on the first lookup that isn't cached."""
+        if self._api is None:
+            from clarity_api import ClarityAPI
+            self._api = ClarityAPI.for_account(self.server, self.account)
+        return self._api
+
+    def _load(self):
+        if os.path.exists(self.cache_file):
+            with open(self.cache_file, "r") as f:
+                return json.load(f)
+        return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+        with open(self.cache_file, "w") as f:
+            json.dump(self._ids, f, indent=2, sort_keys=True)
+
+    def _resolve(self, kind, name, lookup):
+        """Cached id for (kind, name), looked up and saved on a miss."""
+        key = f"{kind}:{name}"
+        with self._lock:
+            if key not in self._ids:
+                if self.offline:
+                    raise LookupError(f"No recorded id for {kind} '{name}' in {self.cache_file}")
+                self._ids[key] = lookup(name)
+                self.lookups += 1
+                self._save()
+            return self._ids[key]
+
+    def forget(self, kind, name):
+        """Drop a cached id, e.g. forget("project", "ED_TEST") after recreating it."""
+        if self.offline:
+            return  # recorded ids stay as recorded
+        with self._lock:
+            if self._ids.pop(f"{kind}:{name}", None) is not None:
+                self._save()
+
+    def _get(self, path, params=None):
+        response = self.api.get(path, params=params)
+        if response.status_code != 200:
+            raise RuntimeError(f"Looking up {path} failed: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    def _project_id(self, name):
+        uris = list_uris(self._get("projects", params={"name": name}), "project")
+        if not uris:
+            raise LookupError(f"Project '{name}' not found on {self.server}")
+        return _limsid(uris[0])
+
+    def _step_id(self, name):
+        """Protocol step id of a step name, searched across all protocols."""
+        for uri in list_uris(self._get("configuration/protocols"), "protocol"):
+            for step_uri, step_name in re.findall(r'<step\b[^>]*?\suri="([^"]+)"[^>]*?\sname="([^"]*)"',
+                                                  self._get(uri).text):
+                if step_name == name:
+                    return _limsid(step_uri)
+        raise LookupError(f"Step '{name}' not found in any protocol on {self.server}")
+
+    def _last_process_id(self, step_name):
+        """LIMS id of the most recent process (step run) of a step."""
+        uris = list_uris(self._get("processes", params={"type": step_name}), "process")
+        if not uris:
+            raise LookupError(f"No runs of step '{step_name}' on {self.server}")
+        return max((_limsid(uri) for uri in uris), key=lambda limsid: int(limsid.rsplit("-", 1)[-1]))
+
+    def project(self, name):
+        """Projects & Samples with the project selected."""
+        return PATHS["project"].format(id=self._resolve("project", name, self._project_id))
+
+    def step(self, name):
+        """Queue of a protocol step."""
+        return PATHS["queue"].format(id=self._resolve("step", name, self._step_id))
+
+    def work_details(self, process_id):
+        """Record Details of a step run (process LIMS id, e.g. "24-5418879", or its number)."""
+        return PATHS["work_details"].format(id=str(process_id).rsplit("-", 1)[-1])
+
+    def work_complete(self, step_name=None, process_id=None):
+        """
+        Work-complete page of a step run.
+
+        Args:
+            step_name: Step whose most recent run to open (looked up on every call)
+            process_id: A specific run instead (process LIMS id or its number)
+        """
+        if process_id is None:
+            if step_name is None:
+                raise ValueError("work_complete() needs a step_name or a process_id")
+            if self.offline:
+                raise LookupError(f"The latest run of '{step_name}' is not looked up offline")
+            process_id = self._last_process_id(step_name)
+            self.lookups += 1
+        return PATHS["work_complete"].format(id=str(process_id).rsplit("-", 1)[-1])
+
+    def configuration(self, tab):
+        """Configuration page opened on a tab (see CONFIGURATION_ROUTES)."""
+        if tab not in CONFIGURATION_ROUTES:
+            raise ValueError(f"Unknown configuration tab '{tab}'. Choose from: {', '.join(CONFIGURATION_ROUTES)}")
+        return PATHS["configuration"].format(id=CONFIGURATION_ROUTES[tab])
+
+    def close(self):
+        if self._api is not None:
+            self._api.close()
+
+
+_deep_links = {}
+
+
+def get_deep_links(server):
+    """Shared DeepLinks for a server (one per process), set up for HAR runs from the environment."""
+    if server not in _deep_links:
+        _deep_links[server] = DeepLinks(server, cache_file=os.environ.get("ROLE_AUDIT_DEEP_LINKS"),
+                                        offline=os.environ.get("ROLE_AUDIT_DEEP_LINKS_MODE") == REPLAY)
+    return _deep_links[server]
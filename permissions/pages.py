@@ -0,0 +1,244 @@
+"""
+Page Objects
+============
+Shared interactions with the Clarity screens the permission tests drive, so
+every module finds the project filter, configuration tabs and grids the same
+way and waits for what it needs instead of sleeping a fixed time:
+
+    from .pages import ConfigurationPage, ProjectsPage
+
+    projects = ProjectsPage(page)
+    projects.select_project("ED_TEST")       # project page with ED_TEST selected
+
+    config = ConfigurationPage(page)
+    if not config.open("Controls"):          # lands on Consumables > Controls
+        if not config.open_tab("Consumables") or not config.open_tab("Controls"):
+            raise Exception("Controls tab not found — permission denied or hidden.")
+    config.find_in_grid("Emil Control Test").click()
+
+select_project() and open(tab) go straight to the page with one goto()
+through deep_links.py. When the link can't be resolved or doesn't land
+(e.g. the role can't see the page), select_project() falls back to the
+clicks through the navigation bar and project filter, and open(tab) returns
+False so the test clicks through the tabs itself and still sees what the
+role sees.
+
+Locators are built once per page object. A better wait or a changed
+selector goes here and applies to every test that uses the screen.
+"""
+
+import re
+
+from clarity_servers import server_for_url
+
+PROJECTS_LINK = re.compile("PROJECTS & Samples", re.I)
+SELECTED_ITEM = "div.project-list-item.x-item-selected"
+TAB_TIMEOUT = 3000  # ms a tab gets to appear; a role without access never shows it
+ROW_TIMEOUT = 10000  # ms a filtered project or grid row gets to appear
+LANDING_TIMEOUT = 5000  # ms a deep link gets to show its page before falling back to clicks
+
+
+def _deep_link(page, target):
+    """
+    URL of a deep link for the page's server, or None if it can't be resolved.
+
+    Args:
+        page: Playwright page, already on a Clarity server
+        target: Called with the server's DeepLinks, returns the URL
+    """
+    server = server_for_url(page.url)
+    if server is None:
+        return None
+    from .deep_links import get_deep_links
+    try:
+        return target(get_deep_links(server))
+    except Exception as e:
+        print(f"No deep link ({e}); navigating through the UI")
+        return None
+
+
+def _forget_deep_link(page, kind, name):
+    """Drop a cached id whose deep link didn't land, so the next run looks it up again."""
+    server = server_for_url(page.url)
+    if server is not None:
+        from .deep_links import get_deep_links
+        get_deep_links(server).forget(kind, name)
+
+
+class ProjectsPage:
+    """The Projects & Samples screen: project filter, list and selection."""
+
+    def __init__(self, page):
+        self.page = page
+        self.filter_box = page.get_by_role("textbox", name="Filter...")
+        self.new_project_button = page.locator("button", has_text="NEW PROJECT")
+
+    def open(self, timeout=8000):
+        """Open Projects & Samples from the navigation bar."""
+        self.page.get_by_role("link", name=PROJECTS_LINK).click()
+        self.filter_box.wait_for(state="visible", timeout=timeout)
+
+    def goto(self, timeout=8000):
+        """Load Projects & Samples directly (also refreshes the list)."""
+        self.page.goto("/clarity/samples")
+        self.filter_box.wait_for(state="visible", timeout=timeout)
+
+    def filter(self, name):
+        """Type a project name into the filter, replacing what was there."""
+        self.filter_box.fill("")
+        # Key events without a per-character delay; the list filters on keyup
+        self.filter_box.type(name)
+
+    def project_row(self, name):
+        return self.page.locator(f"div.project-list-item:has(div[data-qtip='{name}'])").first
+
+    def project_title(self, name):
+        return self.page.locator(f"div.project-list-item-headline-title[data-qtip='{name}']").first
+
+    def wait_for_project(self, name, timeout=ROW_TIMEOUT):
+        """
+        Wait for a project's row in the (filtered) list.
+
+        Raises:
+            TimeoutError: If the row does not appear (Playwright's)
+        """
+        row = self.project_row(name)
+        row.wait_for(state="visible", timeout=timeout)
+        return row
+
+    def click_project(self, row, timeout=ROW_TIMEOUT):
+        """Click a project row and wait until it is selected."""
+        row.click()
+        self.selected_items().first.wait_for(state="visible", timeout=timeout)
+
+    def select_project(self, name, timeout=ROW_TIMEOUT):
+        """
+        Open Projects & Samples with a project selected.
+
+        Goes to the project's deep link; if the project isn't selected there,
+        opens the page from the navigation bar, filters for it and clicks it.
+
+        Returns:
+            Locator: The project's row
+
+        Raises:
+            TimeoutError: If the project can't be found (Playwright's)
+        """
+        url = _deep_link(self.page, lambda links: links.project(name))
+        if url:
+            self.page.goto(url)
+            try:
+                self.page.locator(f"{SELECTED_ITEM}:has(div[data-qtip='{name}'])").first.wait_for(
+                    state="visible", timeout=LANDING_TIMEOUT)
+                return self.project_row(name)
+            except Exception:
+                print(f"Deep link did not select '{name}'; selecting it from the list")
+                _forget_deep_link(self.page, "project", name)  # may have been recreated
+        self.open()
+        self.filter(name)
+        row = self.wait_for_project(name, timeout=timeout)
+        self.click_project(row, timeout=timeout)
+        return row
+
+    def selected_items(self):
+        return self.page.locator(SELECTED_ITEM)
+
+
+class ConfigurationPage:
+    """The Configuration screen: its tabs and the grids inside them."""
+
+    URL = "/clarity/configuration"
+
+    def __init__(self, page):
+        self.page = page
+        self.user_list = page.locator("div.g-table.user-list")
+
+    def open(self, tab=None):
+        """
+        Open the Configuration page, on a tab's deep link if one is given.
+
+        Falls back to the plain page when the tab doesn't show up there.
+
+        Returns:
+            bool: True if the page is on the tab; if False, the caller opens
+                  it (and its parent tabs) with open_tab()
+        """
+        url = _deep_link(self.page, lambda links: links.configuration(tab)) if tab else None
+        if url:
+            self.page.goto(url)
+            try:
+                self.tab(tab).wait_for(state="visible", timeout=LANDING_TIMEOUT)
+                return True
+            except Exception:
+                print(f"Deep link did not open the '{tab}' tab; opening Configuration")
+        self.page.goto(self.URL)
+        return False
+
+    def tab(self, name):
+        return self.page.locator("div.tab-title", has_text=re.compile(name, re.I)).first
+
+    def open_tab(self, name, timeout=TAB_TIMEOUT):
+        """
+        Click a tab as soon as it is shown.
+
+        Returns:
+            bool: False if the tab never appeared (hidden for this role)
+        """
+        tab = self.tab(name)
+        try:
+            tab.wait_for(state="visible", timeout=timeout)
+        except Exception:
+            return False
+        tab.click()
+        return True
+
+    def grid_value(self, text):
+        """Grid cell (user, master step, control...) whose text matches."""
+        return self.page.locator("div.g-col-value", has_text=re.compile(text, re.I))
+
+    def grid_row(self, text):
+        return self.page.locator("div.g-two-sided-row", has_text=re.compile(text, re.I))
+
+    def find_in_grid(self, text, row=False, timeout=ROW_TIMEOUT):
+        """
+        Scroll a grid entry into view, giving it up to timeout to appear.
+
+        Returns:
+            Locator: The first matching cell (or whole row with row=True);
+                     is_visible() tells whether it was found
+        """
+        entry = (self.grid_row(text) if row else self.grid_value(text)).first
+        try:
+            entry.scroll_into_view_if_needed(timeout=timeout)
+        except Exception:
+            pass  # not in the grid; the caller checks is_visible()
+        return entry
+
+
+def select_multiselect_option_by_id(page, widget_id, option_text, timeout=8000):
+    """
+    Open multiselect #<widget_id>, wait for its listbox to be visible,
+    then click the li inside that listbox that matches option_text.
+    """
+    listbox_id = f"#{widget_id}__listbox"
+    wrapper = page.locator(f"#{widget_id} .rw-multiselect-wrapper").first
+
+    print(f"Opening multiselect {widget_id}...")
+    wrapper.click()
+    try:
+        page.wait_for_selector(listbox_id, state="visible", timeout=timeout)
+    except Exception as e:
+        print(f"Timeout waiting for listbox {listbox_id} to be visible: {e}")
+        return False
+
+    print(f"Selecting option '{option_text}' inside {listbox_id}...")
+    # Use a scoped locator so we only match items inside this listbox
+    option = page.locator(f"{listbox_id} >> text=\"{option_text}\"").first
+    try:
+        option.click()
+        page.wait_for_timeout(200)  # let UI settle
+        print(f"Selected '{option_text}' in {widget_id}.")
+        return True
+    except Exception as e:
+        print(f"Failed to click option '{option_text}' in {widget_id}: {e}")
+        return False
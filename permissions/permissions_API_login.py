@@ -5,37 +5,29 @@ Self-contained test for checking if a role can login to Clarity API.
 Permission: ClarityAPI
 """
 
-import s4
-from s4 import clarity
-import keyring
+from change_role import get_lims_connection
+from clarity_servers import api_url
 
-def test_API_login(page=None) -> dict:
+ESTIMATED_DURATION = 1  # seconds, used for scheduling until there is run history
+
+def test_API_login(page=None, server="dev") -> dict:
     """
     Checks if user can login to Clarity API
     
     Args:
-        None
+        page: Unused, accepted for RolePermissionTester compatibility
+        server: Server environment (dev, staging, prod)
     
     Returns:
         dict: Test results with pass/fail status
     """
-    server = 'dev'
-
-    CLARITY_SERVERS = {
-        "dev": "https://clarity-dev.btolims.com/api/v2"
-    }
-
-    SERVICE_NAME = "role_audit_app"
-
-    # Retrieve stored credentials
-    account = "TEST"  
-    username = keyring.get_password(SERVICE_NAME, f"USERNAME_{account}")
-    password = keyring.get_password(SERVICE_NAME, username) if username else None
-
-    # Connect to Clarity API
+    # Connect to Clarity API with the TEST account. The connection is shared
+    # across runs, so make an authenticated request every time: the role may
+    # have changed since the last one
     try:
-        lims = s4.clarity.LIMS(CLARITY_SERVERS[server], username, password)
-        print(f'Connected to {server} - API version: {lims.versions[0]["major"]}')
+        lims, username = get_lims_connection(account="TEST", server=server)
+        lims.request("get", api_url(server))
+        print(f'Authenticated to {server} API as {username}')
         passed = True
     except Exception as e:
         print(f'Error connecting to Clarity API: {e}')
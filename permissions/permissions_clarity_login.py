@@ -5,14 +5,13 @@ Self-contained test for checking if a role can login to Clarity.
 Permission: ClarityLogin
 """
 
-from asyncio import Server
 from playwright.sync_api import Page
-import keyring
 import time
 from datetime import datetime
+from .readiness import settle
+from credentials import get_credentials
 
-SERVICE_NAME = "role_audit_app"
-BASE_URL = f"https://clarity-dev.btolims.com"  # Can parameterize if needed
+ESTIMATED_DURATION = 15  # seconds, used for scheduling until there is run history
 
 def test_clarity_login(page: Page) -> dict:
     """
@@ -26,15 +25,10 @@ def test_clarity_login(page: Page) -> dict:
     """
 
     # Get credentials
-    account = "TEST"  
-    username = keyring.get_password(SERVICE_NAME, f"USERNAME_{account}")
-    password = keyring.get_password(SERVICE_NAME, username) if username else None
-
-    if not username or not password:
-        raise ValueError("Credentials not found. Please run store_creds.py first.")
+    username, password = get_credentials("TEST")
 
     # Go to login page and submit credentials
-    page.goto(f"{BASE_URL}/clarity/login/auth?unauthenticated=1")
+    page.goto("/clarity/login/auth?unauthenticated=1")
     # if role_name == "Not Logged In":
     #     username = "  "
     #     password = "  "
@@ -45,7 +39,7 @@ def test_clarity_login(page: Page) -> dict:
 
     # Wait for redirects and dashboard load
     page.wait_for_load_state("domcontentloaded")
-    page.wait_for_timeout(5000)  # Extra time for JS to render
+    settle(page, 5000)  # Extra time for JS to render
 
     # Check for login success by looking for key dashboard elements
     try:
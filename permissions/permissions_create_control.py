@@ -8,8 +8,10 @@ Compatible with RolePermissionTester framework.
 import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ConfigurationPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 25  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 
@@ -20,6 +22,7 @@ def test_create_control(page, expected=True):
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    config = ConfigurationPage(page)
     print("\n===== TEST: Create Control Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -40,26 +43,19 @@ def test_create_control(page, expected=True):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-            page.goto(f"{BASE_URL}/clarity/configuration")
-            page.wait_for_timeout(2000)
+            if not config.open("Controls"):
+                print("Checking for 'Consumables' tab...")
+                if not config.open_tab("Consumables"):
+                    raise Exception("Consumables tab not found — permission denied or hidden.")
 
-            print("Checking for 'Consumables' tab...")
-            consumables_tab = page.locator("div.tab-title", has_text=re.compile("Consumables", re.I))
-            if consumables_tab.count() == 0:
-                raise Exception("Consumables tab not found — permission denied or hidden.")
+                print("Consumables tab opened.")
 
-            print("Consumables tab found — clicking it...")
-            consumables_tab.first.click()
-            page.wait_for_timeout(2000)
+                print("Checking for 'Controls' tab...")
+                if not config.open_tab("Controls"):
+                    raise Exception("Controls tab not found — permission denied or hidden.")
 
-            print("Checking for 'Controls' tab...")
-            controls_tab = page.locator("div.tab-title", has_text=re.compile("Controls", re.I))
-            if controls_tab.count() == 0:
-                raise Exception("Controls tab not found — permission denied or hidden.")
-
-            print("Controls tab found — clicking it...")
-            controls_tab.first.click()
-            page.wait_for_timeout(2000)
+                print("Controls tab opened.")
+            settle(page, 2000)
 
             print("Checking for 'NEW CONTROL' button...")
             new_control_button = page.get_by_role("button", name=re.compile("NEW CONTROL", re.I))
@@ -68,24 +64,24 @@ def test_create_control(page, expected=True):
 
             print("NEW CONTROL button found — clicking it...")
             new_control_button.click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Filling out 'Control Sample Name' field...")
             control_name = "Emil Control Test"
             name_box = page.get_by_role("textbox", name=re.compile("Enter Control Sample Name", re.I))
             name_box.click()
             name_box.type(control_name, delay=100)
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Clicking 'Save' button...")
             save_button = page.get_by_role("button", name=re.compile("Save", re.I))
             save_button.click()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
 
             print("Refreshing page to see if control is present...")
             page.reload()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             print(f"Verifying control '{control_name}' appears in the list...")
             search_result = page.get_by_text(control_name)
@@ -97,8 +93,8 @@ def test_create_control(page, expected=True):
             result["result"] = "pass"
 
             print("Returning to main page...")
-            page.goto(BASE_URL)
-            page.wait_for_timeout(500)
+            page.goto("/")
+            settle(page, 500)
             break  # success, exit retry loop
 
         except Exception as e:
@@ -110,8 +106,8 @@ def test_create_control(page, expected=True):
             if attempt < max_attempts:
                 print("Retrying in 1 second...")
                 try:
-                    page.goto(BASE_URL)
-                    page.wait_for_timeout(500)
+                    page.goto("/")
+                    settle(page, 500)
                 except:
                     pass
                 time.sleep(1)
@@ -8,8 +8,10 @@ Compatible with RolePermissionTester framework.
 import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ConfigurationPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 20  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 
@@ -19,6 +21,7 @@ def test_create_process(page, expected=True):
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    config = ConfigurationPage(page)
     print("\n===== TEST: Create Process Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -45,16 +48,12 @@ def test_create_process(page, expected=True):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-            page.goto(f"{BASE_URL}/clarity/configuration")
-            page.wait_for_timeout(2000)
-
-            # Click User Management
-            print("Checking for Lab Work tab...")
-            lab_work_tab = page.locator("div.tab-title", has_text=re.compile("Lab Work", re.I))
-            if lab_work_tab.count() == 0:
-                raise Exception("Lab Work tab not found — permission denied or hidden.")
-            lab_work_tab.first.click()
-            page.wait_for_timeout(2000)
+            if not config.open("Lab Work"):
+                # Click User Management
+                print("Checking for Lab Work tab...")
+                if not config.open_tab("Lab Work"):
+                    raise Exception("Lab Work tab not found — permission denied or hidden.")
+            settle(page, 2000)
 
             print("Clicking 'Add Master Step' icon button...")
             button = page.locator(".g-col-header.wps-header-button.master-step-column-header > .btn-base")
@@ -62,28 +61,27 @@ def test_create_process(page, expected=True):
             if button.count() > 0:
                 print("Button found, clicking now...")
                 button.first.click()
-                page.wait_for_timeout(2000)
+                settle(page, 2000)
             else:
                 raise Exception("Add Master Step button not found — permission denied or hidden.")
 
             # Fill first & last name
             print("Filling Master Step Name...")
             page.get_by_role("textbox", name=re.compile("Enter Name", re.I)).type(user_details["master_step"], delay=10)
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             # Save User
             print("Clicking 'Save'...")
             page.locator("button").filter(has_text="Save").click()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             # Verify user exists
             print("Refreshing page to see if master step is created...")
             page.reload()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             print(f"Verifying that user '{master_step}' appears in the list...")
-            page.locator("div.g-two-sided-row", has_text=re.compile(master_step, re.I)).scroll_into_view_if_needed()
-            search_result = page.locator("div.g-col-value", has_text=re.compile(master_step, re.I))
+            search_result = config.find_in_grid(master_step)
             if not search_result.is_visible():
                 raise Exception(f"User '{master_step}' not found after creation.")
 
@@ -92,8 +90,8 @@ def test_create_process(page, expected=True):
             result["result"] = "pass"
             result["screenshot"], _ = capture_screenshot(page, "create_process", "pass")
 
-            page.goto(BASE_URL)
-            page.wait_for_timeout(1000)
+            page.goto("/")
+            settle(page, 1000)
             break
 
         except Exception as e:
@@ -105,8 +103,8 @@ def test_create_process(page, expected=True):
 
             if attempt < max_attempts:
                 print("Retrying in 2 seconds...")
-                page.goto(BASE_URL)
-                page.wait_for_timeout(1000)
+                page.goto("/")
+                settle(page, 1000)
                 time.sleep(2)
             else:
                 print("Max retries reached. Failing test.")
@@ -14,9 +14,11 @@ import os
 import re
 import time
 from .test_utils import capture_screenshot, clean_error_message
+from .pages import ProjectsPage
+from .readiness import settle
 from change_role import modify_user_role, get_lims_connection
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 15  # seconds, used for scheduling until there is run history
 CLIENT_NAME = "Emil Test"
 RETRIES = 2  # Number of retries on failure
 SCREENSHOT_DIR = "test_results/screenshots"
@@ -27,12 +29,13 @@ ACCOUNT_NAME = "Administrative Lab"
 os.makedirs(SCREENSHOT_DIR, exist_ok=True)
 
 
-def test_create_project(page, expected=True):
+def test_create_project(page, expected=True, server="dev"):
     """
     Checks if user can create a new project in Clarity LIMS
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    projects = ProjectsPage(page)
     print("\n===== TEST: Create Project Permission =====")
 
     result = {
@@ -57,14 +60,10 @@ def test_create_project(page, expected=True):
         for attempt in range(1, max_attempts + 1):
             try:
                 print(f"\nAttempt {attempt}: Navigating to Projects & Samples...")
-                page.get_by_role("link", name=re.compile("PROJECTS & Samples", re.I)).click()
-                page.wait_for_timeout(1000)
+                projects.open()
 
                 print(f"Typing project name '{PROJECT_NAME}' in filter box...")
-                filter_box = page.get_by_role("textbox", name="Filter...")
-                filter_box.wait_for(state="visible", timeout=5000)
-                page.wait_for_timeout(500)
-                filter_box.type(PROJECT_NAME, delay=10)
+                projects.filter(PROJECT_NAME)
 
                 print("Clicking 'NEW PROJECT' button...")
                 new_project_btn = page.locator("button", has_text="NEW PROJECT")
@@ -96,18 +95,14 @@ def test_create_project(page, expected=True):
                 print("Setting priority to 'Standard' and saving project...")
                 priority_trigger = page.locator("#ext-gen1106")
                 priority_trigger.click()
-                page.wait_for_timeout(200)
+                settle(page, 200)
                 page.get_by_text("Standard").click()
                 page.get_by_role("button", name="Save").click()
 
                 print("Verifying project creation...")
-                page.goto(f"{BASE_URL}/clarity/samples")
-                filter_box = page.get_by_role("textbox", name="Filter...")
-                filter_box.wait_for(state="visible", timeout=5000)
-                page.wait_for_timeout(500)
-                filter_box.type(PROJECT_NAME, delay=10)
-                project_row_locator = page.locator(f"div.project-list-item-headline-title[data-qtip='{PROJECT_NAME}']").first
-                project_row_locator.wait_for(state="visible", timeout=10000)
+                projects.goto()
+                projects.filter(PROJECT_NAME)
+                project_row_locator = projects.wait_for_project(PROJECT_NAME)
 
                 if project_row_locator.count() == 0:
                     raise Exception(f"Project '{PROJECT_NAME}' not found after creation")
@@ -132,7 +127,7 @@ def test_create_project(page, expected=True):
 
             finally:
                 try:
-                    page.goto(BASE_URL)
+                    page.goto("/")
                 except:
                     pass
 
@@ -154,26 +149,20 @@ def test_create_project(page, expected=True):
     if project_created:
         print("\n--- CLEANUP: Adding System Admin (BTO) role to delete created project ---")
         try:
-            lims, username = get_lims_connection()
+            lims, username = get_lims_connection(server=server)
             user = modify_user_role(lims, "Emil", "Test", "System Admin (BTO)", action="add")
             print(f"Current roles for {username} after adding System Admin (BTO) for cleanup:")
             for r in user.roles:
                 print(f"  - {r.name}")
 
             print("Navigating to Projects & Samples for cleanup...")
-            page.get_by_role("link", name=re.compile("PROJECTS & Samples", re.I)).click()
-            page.wait_for_timeout(1000)
+            projects.open()
 
             print(f"Filtering for project '{PROJECT_NAME}'...")
-            filter_box = page.get_by_role("textbox", name="Filter...")
-            filter_box.wait_for(state="visible", timeout=5000)
-            page.wait_for_timeout(500)
-            filter_box.fill("")
-            filter_box.type(PROJECT_NAME, delay=10)
+            projects.filter(PROJECT_NAME)
 
             print("Waiting for project row to appear...")
-            project_row_locator = page.locator(f"div.project-list-item:has(div[data-qtip='{PROJECT_NAME}'])").first
-            project_row_locator.wait_for(state="visible", timeout=10000)
+            project_row_locator = projects.wait_for_project(PROJECT_NAME)
 
             if project_row_locator.count() > 0:
                 print("Project found — opening details for deletion...")
@@ -193,8 +182,8 @@ def test_create_project(page, expected=True):
                 delete_confirm_button.wait_for(state="visible", timeout=3000)
                 delete_confirm_button.click()
 
-                page.wait_for_timeout(1000)
-                project_row_check = page.locator(f"div.project-list-item:has(div[data-qtip='{PROJECT_NAME}'])")
+                settle(page, 1000)
+                project_row_check = projects.project_row(PROJECT_NAME)
                 if project_row_check.count() == 0:
                     print("Created project cleaned up successfully.")
                 else:
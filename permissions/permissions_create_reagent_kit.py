@@ -8,8 +8,10 @@ Compatible with RolePermissionTester framework.
 import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ConfigurationPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 30  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 
@@ -20,6 +22,7 @@ def test_create_reagent_kit(page, expected=True):
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    config = ConfigurationPage(page)
     print("\n===== TEST: Create Reagent Kit Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -40,26 +43,19 @@ def test_create_reagent_kit(page, expected=True):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-            page.goto(f"{BASE_URL}/clarity/configuration")
-            page.wait_for_timeout(2000)
+            if not config.open("Reagents"):
+                print("Checking for 'Consumables' tab...")
+                if not config.open_tab("Consumables"):
+                    raise Exception("Consumables tab not found — permission denied or hidden.")
 
-            print("Checking for 'Consumables' tab...")
-            consumables_tab = page.locator("div.tab-title", has_text=re.compile("Consumables", re.I))
-            if consumables_tab.count() == 0:
-                raise Exception("Consumables tab not found — permission denied or hidden.")
+                print("Consumables tab opened.")
 
-            print("Consumables tab found — clicking it...")
-            consumables_tab.first.click()
-            page.wait_for_timeout(2000)
+                print("Checking for 'Reagents' tab...")
+                if not config.open_tab("Reagents"):
+                    raise Exception("Controls tab not found — permission denied or hidden.")
 
-            print("Checking for 'Reagents' tab...")
-            reagents_tab = page.locator("div.tab-title", has_text=re.compile("Reagents", re.I))
-            if reagents_tab.count() == 0:
-                raise Exception("Controls tab not found — permission denied or hidden.")
-
-            print("Controls tab found — clicking it...")
-            reagents_tab.first.click()
-            page.wait_for_timeout(2000)
+                print("Controls tab opened.")
+            settle(page, 2000)
 
             print("Checking for 'NEW REAGENT KIT' button...")
             new_reagent_kit_button = page.get_by_role("button", name=re.compile("NEW REAGENT KIT", re.I))
@@ -68,26 +64,26 @@ def test_create_reagent_kit(page, expected=True):
 
             print("NEW REAGENT KIT button found — clicking it...")
             new_reagent_kit_button.click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Filling out 'Reagent Kit Name' field...")
             reagent_kit_name = "Emil Reagent Kit Test"
             name_box = page.get_by_role("textbox", name=re.compile("Enter Reagent Kit Name", re.I))
             name_box.click()
             name_box.type(reagent_kit_name, delay=100)
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Clicking 'Save' button...")
             save_button = page.get_by_role("button", name=re.compile("Save", re.I))
             save_button.click()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             print("Refreshing page to see if reagent kit is present...")
             page.reload()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             print(f"Verifying reagent kit '{reagent_kit_name}' appears in the list...")
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
             search_result = page.get_by_text(reagent_kit_name)
 
             if not search_result.is_visible():
@@ -95,15 +91,15 @@ def test_create_reagent_kit(page, expected=True):
 
             # Scroll directly to it
             search_result.scroll_into_view_if_needed()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print(f"'{reagent_kit_name}' successfully created.")
             result["passed"] = True
             result["result"] = "pass"
 
             print("Returning to main page...")
-            page.goto(BASE_URL)
-            page.wait_for_timeout(500)
+            page.goto("/")
+            settle(page, 500)
             break  # success, exit retry loop
 
         except Exception as e:
@@ -115,8 +111,8 @@ def test_create_reagent_kit(page, expected=True):
             if attempt < max_attempts:
                 print("Retrying in 1 second...")
                 try:
-                    page.goto(BASE_URL)
-                    page.wait_for_timeout(500)
+                    page.goto("/")
+                    settle(page, 500)
                 except:
                     pass
                 time.sleep(1)
@@ -5,11 +5,12 @@ Checks if a user with the proper role can create a sample in Clarity LIMS.
 Compatible with RolePermissionTester framework.
 """
 
-import re
 import time
 from .test_utils import capture_screenshot, clean_error_message
+from .pages import ProjectsPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 15  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 
@@ -20,6 +21,7 @@ def test_create_sample(page, expected=True):
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    projects = ProjectsPage(page)
     print("\n===== TEST: Create Sample Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -43,26 +45,8 @@ def test_create_sample(page, expected=True):
 
     for attempt in range(1, max_attempts + 1):
         try:
-            print(f"\nAttempt {attempt}: Navigating to Projects & Samples...")
-            page.get_by_role("link", name=re.compile("PROJECTS & Samples", re.I)).click()
-            page.wait_for_timeout(800)
-
-            print(f"Filtering for project '{PROJECT_NAME}'...")
-            filter_box = page.get_by_role("textbox", name="Filter...")
-            filter_box.wait_for(state="visible", timeout=8000)
-            filter_box.type(PROJECT_NAME, delay=50)
-            page.wait_for_timeout(500)
-
-            print("Waiting for project row to appear...")
-            project_row = page.locator(f"div.project-list-item:has(div[data-qtip='{PROJECT_NAME}'])").first
-            project_row.wait_for(state="visible", timeout=8000)
-
-            if project_row.count() == 0:
-                raise Exception(f"Project '{PROJECT_NAME}' not found")
-
-            print("Project found — clicking on it...")
-            project_row.click()
-            page.wait_for_timeout(800)
+            print(f"\nAttempt {attempt}: Opening project '{PROJECT_NAME}'...")
+            projects.select_project(PROJECT_NAME)
 
             # Check for Modify Samples button
             # Locate the modify samples button
@@ -90,7 +74,7 @@ def test_create_sample(page, expected=True):
                 
                 # Navigate back to base URL only on success
                 try:
-                    page.goto(BASE_URL)
+                    page.goto("/")
                     print("Returned to main page.")
                 except:
                     pass
@@ -111,8 +95,8 @@ def test_create_sample(page, expected=True):
                 print("Retrying in 1 second...")
                 # Navigate back to base URL before retry
                 try:
-                    page.goto(BASE_URL)
-                    page.wait_for_timeout(500)
+                    page.goto("/")
+                    settle(page, 500)
                 except:
                     pass
                 time.sleep(1)
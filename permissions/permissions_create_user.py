@@ -14,18 +14,21 @@ Test Flow:
 import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ConfigurationPage
+from .readiness import settle
 from change_role import modify_user_role, get_lims_connection
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 45  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 
-def test_create_user(page, expected=True):
+def test_create_user(page, expected=True, server="dev"):
     """
     Checks if role can create a user in Clarity LIMS.
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    config = ConfigurationPage(page)
     print("\n===== TEST: Create User Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -63,16 +66,12 @@ def test_create_user(page, expected=True):
         for attempt in range(1, max_attempts + 1):
             try:
                 print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-                page.goto(f"{BASE_URL}/clarity/configuration")
-                page.wait_for_timeout(2000)
-
-                # Click User Management
-                print("Checking for User Management tab...")
-                user_tab = page.locator("div.tab-title", has_text=re.compile("User Management", re.I))
-                if user_tab.count() == 0:
-                    raise Exception("User Management tab not found — permission denied or hidden.")
-                user_tab.first.click()
-                page.wait_for_timeout(2000)
+                if not config.open("User Management"):
+                    # Click User Management
+                    print("Checking for User Management tab...")
+                    if not config.open_tab("User Management"):
+                        raise Exception("User Management tab not found — permission denied or hidden.")
+                settle(page, 2000)
 
                 # Click NEW USER
                 print("Clicking 'NEW USER' button...")
@@ -81,18 +80,18 @@ def test_create_user(page, expected=True):
                     raise Exception("NEW USER button not visible — permission denied.")
                 
                 new_user_button.click()
-                page.wait_for_timeout(1000)
+                settle(page, 1000)
 
                 # Fill first & last name
                 print("Filling first and last name...")
                 page.get_by_role("textbox", name=re.compile("Enter First Name", re.I)).type(user_details["first_name"], delay=10)
                 page.get_by_role("textbox", name=re.compile("Enter Last Name", re.I)).type(user_details["last_name"], delay=10)
-                page.wait_for_timeout(500)
+                settle(page, 500)
 
                 # Fill Title
                 print("Filling Title...")
                 page.get_by_role("textbox", name="Title").type(user_details["title"], delay=10)
-                page.wait_for_timeout(500)
+                settle(page, 500)
 
                 # Select Account
                 print(f"Selecting account '{user_details['account']}'...")
@@ -103,18 +102,18 @@ def test_create_user(page, expected=True):
                 # Fill Email
                 print(f"Filling email '{user_details['email']}'...")
                 page.get_by_role("textbox", name="Email").type(user_details["email"], delay=10)
-                page.wait_for_timeout(500)
+                settle(page, 500)
 
                 # Fill Username
                 print(f"Filling username '{user_details['username']}'...")
                 page.get_by_role("textbox", name="Username").type(user_details["username"], delay=10)
-                page.wait_for_timeout(500)
+                settle(page, 500)
 
                 # Select Role
                 print(f"Selecting role '{user_details['role']}'...")
                 page.locator(".rw-multiselect-wrapper").click()
                 page.get_by_role("option", name=user_details["role"]).click()
-                page.wait_for_timeout(1000)
+                settle(page, 1000)
 
                 # Save User
                 print("Clicking 'Save'...")
@@ -123,16 +122,15 @@ def test_create_user(page, expected=True):
                     raise Exception("Save button not visible — permission denied.")
                 
                 save_button.click()
-                page.wait_for_timeout(2000)
+                settle(page, 2000)
 
                 # Verify user was created
                 print("Refreshing page to verify user creation...")
                 page.reload()
-                page.wait_for_timeout(2000)
+                settle(page, 2000)
 
                 print(f"Verifying that user '{full_name}' appears in the list...")
-                page.locator("div.g-col-value", has_text=re.compile(full_name, re.I)).scroll_into_view_if_needed()
-                search_result = page.locator("div.g-col-value", has_text=re.compile(full_name, re.I))
+                search_result = config.find_in_grid(full_name)
                 
                 if search_result.is_visible():
                     print(f"User '{full_name}' successfully created — permission confirmed.")
@@ -140,8 +138,8 @@ def test_create_user(page, expected=True):
                     result["result"] = "pass"
                     user_created = True
                     result["screenshot"], _ = capture_screenshot(page, "create_user", "pass")
-                    page.goto(BASE_URL)
-                    page.wait_for_timeout(1000)
+                    page.goto("/")
+                    settle(page, 1000)
                     break
                 else:
                     raise Exception(f"User '{full_name}' not found after creation — creation failed.")
@@ -154,8 +152,8 @@ def test_create_user(page, expected=True):
 
                 if attempt < max_attempts:
                     print("Retrying in 2 seconds...")
-                    page.goto(BASE_URL)
-                    page.wait_for_timeout(1000)
+                    page.goto("/")
+                    settle(page, 1000)
                     time.sleep(2)
                 else:
                     print("Max retries reached. Failing test.")
@@ -175,30 +173,26 @@ def test_create_user(page, expected=True):
         if user_created:
             print("\n--- CLEANUP: Adding System Admin (BTO) role to delete created user ---")
             try:
-                lims, username = get_lims_connection()
+                lims, username = get_lims_connection(server=server)
                 user = modify_user_role(lims, "Emil", "Test", "System Admin (BTO)", action="add")
                 print(f"Current roles for {username} after adding System Admin (BTO) for cleanup:")
                 for r in user.roles:
                     print(f"  - {r.name}")
 
                 print(f"Deleting created user '{full_name}' with System Admin privileges...")
-                page.goto(f"{BASE_URL}/clarity/configuration")
-                page.wait_for_timeout(2000)
-
-                user_tab = page.locator("div.tab-title", has_text=re.compile("User Management", re.I))
-                user_tab.first.click()
-                page.wait_for_timeout(2000)
+                if not config.open("User Management"):
+                    config.open_tab("User Management")
+                settle(page, 2000)
 
-                page.locator("div.g-col-value", has_text=re.compile(full_name, re.I)).scroll_into_view_if_needed()
-                search_result = page.locator("div.g-col-value", has_text=re.compile(full_name, re.I))
+                search_result = config.find_in_grid(full_name)
                 
                 if search_result.is_visible():
                     search_result.click()
-                    page.wait_for_timeout(1000)
+                    settle(page, 1000)
                     page.locator("button").filter(has_text="Delete").first.click()
-                    page.wait_for_timeout(500)
+                    settle(page, 500)
                     page.reload()
-                    page.wait_for_timeout(2000)
+                    settle(page, 2000)
                     print(f"Created user '{full_name}' cleaned up successfully.")
                 
                 # Remove System Admin role after cleanup
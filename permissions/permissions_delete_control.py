@@ -8,18 +8,27 @@ Compatible with RolePermissionTester framework.
 import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ConfigurationPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 25  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 control_name = "Emil Control Test"
+FIXTURES = ("control_type",)
 
-def test_delete_control(page, expected=True):
+def test_delete_control(page, expected=True, fixtures=None):
     """
     Checks if role can delete a control in Clarity LIMS.
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
+    With a "control_type" fixture (created through the API), that control is
+    deleted instead of the shared one.
     """
+    config = ConfigurationPage(page)
+    fixture = (fixtures or {}).get("control_type")
+    target_control = fixture["name"] if fixture else control_name
+
     print("\n===== TEST: Delete Control Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -40,70 +49,63 @@ def test_delete_control(page, expected=True):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-            page.goto(f"{BASE_URL}/clarity/configuration")
-            page.wait_for_timeout(2000)
-
-            print("Checking for 'Consumables' tab...")
-            consumables_tab = page.locator("div.tab-title", has_text=re.compile("Consumables", re.I))
-            if consumables_tab.count() == 0:
-                raise Exception("Consumables tab not found — permission denied or hidden.")
+            if not config.open("Controls"):
+                print("Checking for 'Consumables' tab...")
+                if not config.open_tab("Consumables"):
+                    raise Exception("Consumables tab not found — permission denied or hidden.")
 
-            print("Consumables tab found — clicking it...")
-            consumables_tab.first.click()
-            page.wait_for_timeout(2000)
+                print("Consumables tab opened.")
 
-            print("Checking for 'Controls' tab...")
-            controls_tab = page.locator("div.tab-title", has_text=re.compile("Controls", re.I))
-            if controls_tab.count() == 0:
-                raise Exception("Controls tab not found — permission denied or hidden.")
+                print("Checking for 'Controls' tab...")
+                if not config.open_tab("Controls"):
+                    raise Exception("Controls tab not found — permission denied or hidden.")
 
-            print("Controls tab found — clicking it...")
-            controls_tab.first.click()
-            page.wait_for_timeout(2000)
+                print("Controls tab opened.")
+            settle(page, 2000)
 
             print("Checking for 'NEW CONTROL' button...")
             new_control_button = page.get_by_role("button", name=re.compile("NEW CONTROL", re.I))
             if not new_control_button.is_visible():
                 raise Exception("NEW CONTROL button not visible — permission denied or hidden.")
 
-            print(f"Verifying control '{control_name}' appears in the list...")
-            search_result = page.get_by_text(control_name)
+            print(f"Verifying control '{target_control}' appears in the list...")
+            search_result = page.get_by_text(target_control)
             if not search_result.is_visible():
-                raise Exception(f"'{control_name}' not found — creation may have failed or permission denied.")
+                raise Exception(f"'{target_control}' not found — creation may have failed or permission denied.")
 
             search_result.click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Clicking 'Delete' button...")
             delete_button = page.get_by_role("button", name=re.compile("Delete", re.I))
             delete_button.click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Waiting for confirmation dialog...")
             confirm_button = page.get_by_role("button", name=re.compile("Delete Item", re.I))
             confirm_button.wait_for(state="visible", timeout=5000)
             confirm_button.click()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             print("Refreshing page to see if control is deleted...")
             page.reload()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
-            print(f"Verifying control '{control_name}' is deleted...")
-            search_result = page.get_by_text(control_name)
+            print(f"Verifying control '{target_control}' is deleted...")
+            search_result = page.get_by_text(target_control)
             if not search_result.is_visible():
-                print(f"'{control_name}' is deleted — permission confirmed.")
+                print(f"'{target_control}' is deleted — permission confirmed.")
                 result["passed"] = True
                 result["result"] = "pass"
             else:
-                raise Exception(f"'{control_name}' is not deleted — permission denied.")
+                raise Exception(f"'{target_control}' is not deleted — permission denied.")
 
             # Take screenshot before leaving page
             result["screenshot"], _ = capture_screenshot(page, "delete_control", "pass")
 
             print("Returning to main page...")
-            page.goto(BASE_URL)
-            page.wait_for_timeout(1000)
+            page.goto("/")
+            settle(page, 1000)
             break  # success, exit retry loop
 
         except Exception as e:
@@ -117,8 +119,8 @@ def test_delete_control(page, expected=True):
             if attempt < max_attempts:
                 print("Retrying in 2 seconds...")
                 try:
-                    page.goto(BASE_URL)
-                    page.wait_for_timeout(1000)
+                    page.goto("/")
+                    settle(page, 1000)
                 except:
                     pass
                 time.sleep(2)
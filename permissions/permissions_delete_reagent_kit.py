@@ -8,8 +8,10 @@ Compatible with RolePermissionTester framework.
 import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ConfigurationPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 25  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 
@@ -20,6 +22,7 @@ def test_delete_reagent_kit(page, expected=True):
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    config = ConfigurationPage(page)
     print("\n===== TEST: Delete Reagent Kit Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -41,53 +44,46 @@ def test_delete_reagent_kit(page, expected=True):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-            page.goto(f"{BASE_URL}/clarity/configuration")
-            page.wait_for_timeout(2000)
+            if not config.open("Reagents"):
+                print("Checking for 'Consumables' tab...")
+                if not config.open_tab("Consumables"):
+                    raise Exception("Consumables tab not found — permission denied or hidden.")
 
-            print("Checking for 'Consumables' tab...")
-            consumables_tab = page.locator("div.tab-title", has_text=re.compile("Consumables", re.I))
-            if consumables_tab.count() == 0:
-                raise Exception("Consumables tab not found — permission denied or hidden.")
+                print("Consumables tab opened.")
 
-            print("Consumables tab found — clicking it...")
-            consumables_tab.first.click()
-            page.wait_for_timeout(2000)
+                print("Checking for 'Reagents' tab...")
+                if not config.open_tab("Reagents"):
+                    raise Exception("Reagents tab not found — permission denied or hidden.")
 
-            print("Checking for 'Reagents' tab...")
-            reagents_tab = page.locator("div.tab-title", has_text=re.compile("Reagents", re.I))
-            if reagents_tab.count() == 0:
-                raise Exception("Reagents tab not found — permission denied or hidden.")
-
-            print("Reagents tab found — clicking it...")
-            reagents_tab.first.click()
-            page.wait_for_timeout(2000)
+                print("Reagents tab opened.")
+            settle(page, 2000)
 
             print(f"Verifying reagent kit '{reagent_kit_name}' is present...")
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
             search_result = page.get_by_text(reagent_kit_name)
             if not search_result.is_visible():
                 raise Exception(f"'{reagent_kit_name}' not found — delete may have failed or permission denied.")
 
             search_result.click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Clicking 'Delete' button...")
             delete_button = page.get_by_role("button", name=re.compile("Delete", re.I))
             delete_button.click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Waiting for confirmation dialog...")
             confirm_button = page.get_by_role("button", name=re.compile("Delete Item", re.I))
             confirm_button.wait_for(state="visible", timeout=5000)
             confirm_button.click()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             print("Refreshing page to see if reagent kit is deleted...")
             page.reload()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             print(f"Verifying reagent kit '{reagent_kit_name}' is deleted...")
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
             search_result = page.get_by_text(reagent_kit_name)
 
             if not search_result.is_visible():
@@ -100,8 +96,8 @@ def test_delete_reagent_kit(page, expected=True):
             result["screenshot"], _ = capture_screenshot(page, "delete_reagent_kit", "pass")
 
             print("Returning to main page...")
-            page.goto(BASE_URL)
-            page.wait_for_timeout(1000)
+            page.goto("/")
+            settle(page, 1000)
             break  # success, exit retry loop
 
         except Exception as e:
@@ -115,8 +111,8 @@ def test_delete_reagent_kit(page, expected=True):
             if attempt < max_attempts:
                 print("Retrying in 2 seconds...")
                 try:
-                    page.goto(BASE_URL)
-                    page.wait_for_timeout(1000)
+                    page.goto("/")
+                    settle(page, 1000)
                 except:
                     pass
                 time.sleep(2)
@@ -6,8 +6,9 @@ Checks if a user can edit completed steps correctly.
 
 from playwright.sync_api import Page, expect, TimeoutError
 import re
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 5  # seconds, used for scheduling until there is run history
 
 EDIT_CRITERIA = {
     "popup_type": ["modal", "native_dialog"],
@@ -21,13 +22,13 @@ EDIT_CRITERIA = {
 def test_can_edit_completed_steps(page: Page):
     print("\n===== TEST: Can Edit Completed Steps =====")
 
-    home_url = f"{BASE_URL}/clarity/home"
+    home_url = "/clarity/home"
     results = {"passed": False, "reason": None}
 
     try:
         # Wait for lab-stream section to load
         print(f"Navigating to edit step page")
-        page.goto(f"{BASE_URL}/clarity/work-complete/5418879")
+        page.goto("/clarity/work-complete/5418879")
         print("Found edit step page")
 
         # Look for edit button
@@ -115,7 +116,7 @@ def click_and_capture_popup(page: Page, edit_button):
 
     # Click and wait a bit
     edit_button.click()
-    page.wait_for_timeout(1000)
+    settle(page, 1000)
     page.remove_listener("dialog", handle_dialog)
 
     # Native dialog case
@@ -10,9 +10,11 @@ import os
 import time
 import json
 from playwright.sync_api import TimeoutError
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 15  # seconds, used for scheduling until there is run history
 RETRIES = 2
+WORKFLOW_STATE = ("ED_TEST",)  # samples restored to their captured steps first (--restore-workflows)
 SCREENSHOT_DIR = "test_results/screenshots"
 RESULTS_JSON = "permissions_results.json"
 
@@ -75,11 +77,11 @@ def test_permissions_move_to_next_step(page):
             print("Group already expanded.")
 
         # Give it a moment to load the samples
-        page.wait_for_timeout(1500)
+        settle(page, 1500)
 
         # Optional: verify expansion
         samples_section = group.locator(".samples")
-        page.wait_for_timeout(500)
+        settle(page, 500)
         if samples_section.is_visible():
             print("Sample group expanded successfully.")
         else:
@@ -96,7 +98,7 @@ def test_permissions_move_to_next_step(page):
         options_button = page.locator("button:has-text('Options')")
         options_button.wait_for(state="visible", timeout=10000)
         options_button.click()
-        page.wait_for_timeout(1000)
+        settle(page, 1000)
 
         # 5. Check for Move to Next Step button
         print("Checking for 'Move to the next step' option...")
@@ -9,8 +9,9 @@ Compatible with RolePermissionTester framework.
 import os
 import re
 import time
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 10  # seconds, used for scheduling until there is run history
 RETRIES = 0
 SCREENSHOT_DIR = "test_results/screenshots"
 
@@ -56,7 +57,7 @@ def test_overview_dashboard(page, expected=True):
             print("Checking for 'Overview' link in Dashboards dropdown...")
             dashboard_menu = page.locator("li.dropdown a.dropdown-toggle", has_text="Dashboards")
             dashboard_menu.click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             overview_link = page.get_by_role("link", name=re.compile("Overview", re.I))
 
@@ -82,7 +83,7 @@ def test_overview_dashboard(page, expected=True):
                 print("All attempts failed.")
             else:
                 print("Retrying...")
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
     result["execution_time"] = round(time.time() - start_time, 2)
     return result
\ No newline at end of file
@@ -5,11 +5,12 @@ Checks if a user with the proper role can read a process in Clarity LIMS.
 Compatible with RolePermissionTester framework.
 """
 
-import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ConfigurationPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 15  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 
@@ -19,6 +20,8 @@ def test_read_process(page, expected=True):
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    config = ConfigurationPage(page)
+    config = ConfigurationPage(page)
     print("\n===== TEST: Read Process Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -45,16 +48,12 @@ def test_read_process(page, expected=True):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-            page.goto(f"{BASE_URL}/clarity/configuration")
-            page.wait_for_timeout(2000)
-
-            # Click User Management
-            print("Checking for Lab Work tab...")
-            lab_work_tab = page.locator("div.tab-title", has_text=re.compile("Lab Work", re.I))
-            if lab_work_tab.count() == 0:
-                raise Exception("Lab Work tab not found — permission denied or hidden.")
-            lab_work_tab.first.click()
-            page.wait_for_timeout(2000)
+            if not config.open("Lab Work"):
+                # Click User Management
+                print("Checking for Lab Work tab...")
+                if not config.open_tab("Lab Work"):
+                    raise Exception("Lab Work tab not found — permission denied or hidden.")
+            settle(page, 2000)
 
             print("Looking for 'Master Step' column header...")
             header = page.locator("div.g-col-header.master-step-column-header")
@@ -74,8 +73,8 @@ def test_read_process(page, expected=True):
             else:
                 raise Exception("Master Step details form not found — permission denied or hidden.")
 
-            page.goto(BASE_URL)
-            page.wait_for_timeout(1000)
+            page.goto("/")
+            settle(page, 1000)
             break
 
         except Exception as e:
@@ -87,8 +86,8 @@ def test_read_process(page, expected=True):
 
             if attempt < max_attempts:
                 print("Retrying in 2 seconds...")
-                page.goto(BASE_URL)
-                page.wait_for_timeout(1000)
+                page.goto("/")
+                settle(page, 1000)
                 time.sleep(2)
             else:
                 print("Max retries reached. Failing test.")
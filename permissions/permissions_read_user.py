@@ -7,10 +7,11 @@ Compatible with RolePermissionTester framework.
 """
 
 import os
-import re
 import time
+from .pages import ConfigurationPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 15  # seconds, used for scheduling until there is run history
 RETRIES = 2
 SCREENSHOT_DIR = "test_results/screenshots"
 
@@ -25,6 +26,7 @@ def test_permissions_read_user(page, expected=True):
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    config = ConfigurationPage(page)
     print("\n===== TEST: Read User Permission =====")
 
     result = {
@@ -52,23 +54,18 @@ def test_permissions_read_user(page, expected=True):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-            page.goto(f"{BASE_URL}/clarity/configuration")
-            page.wait_for_timeout(2000)
+            if not config.open("User Management"):
+                print("Checking for User Management tab...")
 
-            print("Checking for User Management tab...")
+                # Locate the User Management tab
+                if not config.open_tab("User Management"):
+                    raise Exception("User Management tab not found — permission denied or hidden.")
 
-            # Locate the User Management tab
-            user_tab = page.locator("div.tab-title", has_text=re.compile("User Management", re.I))
-
-            if user_tab.count() == 0:
-                raise Exception("User Management tab not found — permission denied or hidden.")
-
-            print("User Management tab found — clicking it...")
-            user_tab.first.click()
-            page.wait_for_timeout(2000)
+                print("User Management tab opened.")
+            settle(page, 2000)
 
             print("Checking if user list is visible...")
-            user_list = page.locator("div.g-table.user-list")
+            user_list = config.user_list
 
             if user_list.count() > 0:
                 print("User list found — permission confirmed.")
@@ -100,7 +97,7 @@ def test_permissions_read_user(page, expected=True):
 
         finally:
             try:
-                page.goto(BASE_URL)
+                page.goto("/")
                 print("Returned to main page.")
             except:
                 pass
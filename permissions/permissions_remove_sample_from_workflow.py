@@ -7,13 +7,15 @@ Compatible with RolePermissionTester framework.
 """
 
 import os
-import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ProjectsPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 60  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
+WORKFLOW_STATE = ("ED_TEST",)  # samples restored to their captured steps first (--restore-workflows)
 SCREENSHOT_DIR = "test_results/screenshots"
 
 # Ensure screenshot directory exists
@@ -26,6 +28,7 @@ def test_sample_workflow_removal(page, expected=True):
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    projects = ProjectsPage(page)
     print("\n===== TEST: Sample Workflow Removal Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -53,33 +56,14 @@ def test_sample_workflow_removal(page, expected=True):
 
     for attempt in range(1, max_attempts + 1):
         try:
-            print(f"\nAttempt {attempt}: Navigating to Projects & Samples...")
-            page.get_by_role("link", name=re.compile("PROJECTS & Samples", re.I)).click()
-            page.wait_for_timeout(1000)
-
-            print(f"Filtering for project '{PROJECT_NAME}'...")
-            filter_box = page.get_by_role("textbox", name="Filter...")
-            filter_box.wait_for(state="visible", timeout=5000)
-            page.wait_for_timeout(500)
-            filter_box.fill("")
-            filter_box.type(PROJECT_NAME, delay=100)
-            page.wait_for_timeout(1000)
-
-            print("Locating project row...")
-            project_row = page.locator(f"div.project-list-item:has(div[data-qtip='{PROJECT_NAME}'])").first
-            project_row.wait_for(state="visible", timeout=10000)
-            if project_row.count() == 0:
-                raise Exception(f"Project '{PROJECT_NAME}' not found")
-
-            print("Project found — clicking to open project details...")
-            project_row.click()
-            page.wait_for_timeout(1500)
+            print(f"\nAttempt {attempt}: Opening project '{PROJECT_NAME}'...")
+            projects.select_project(PROJECT_NAME)
 
             print("Expanding sample group to show all samples...")
             group_expander = page.locator("div.group-expander-btn").first
             if group_expander.count() > 0:
                 group_expander.click()
-                page.wait_for_timeout(1500)
+                settle(page, 1500)
                 print("Sample group expanded.")
             else:
                 print("No group expander button found — possibly already expanded.")
@@ -151,7 +135,7 @@ def test_sample_workflow_removal(page, expected=True):
 
         finally:
             try:
-                page.goto(BASE_URL)
+                page.goto("/")
                 print("Returned to main Clarity home page.")
             except:
                 print("Failed to return to home page after test attempt.")
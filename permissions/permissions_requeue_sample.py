@@ -8,9 +8,11 @@ Compatible with RolePermissionTester framework.
 import os
 import re
 import time
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 15  # seconds, used for scheduling until there is run history
 RETRIES = 1
+WORKFLOW_STATE = ("ED_TEST",)  # samples restored to their captured steps first (--restore-workflows)
 SCREENSHOT_DIR = "test_results/screenshots"
 
 # Ensure screenshot directory exists
@@ -50,13 +52,13 @@ def test_requeue_sample(page, expected=True):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"\nAttempt {attempt}: Navigating to Sample and Container Search page...")
-            page.goto(f"{BASE_URL}/clarity/search?query=Emil%20Test&offset=0&scope=Process")
-            page.wait_for_timeout(1500)
+            page.goto("/clarity/search?query=Emil%20Test&offset=0&scope=Process")
+            settle(page, 1500)
 
             print("Expanding sample details...")
             # Expand the search result to show project/sample details
             page.locator("div.detail-toggle").first.click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Looking for sample project row...")
             sample_row = page.locator("div.project-name a", has_text=re.compile("1428460L1954-1", re.I))
@@ -98,7 +100,7 @@ def test_requeue_sample(page, expected=True):
 
         finally:
             try:
-                page.goto(BASE_URL)
+                page.goto("/")
                 print("Returned to main page.")
             except:
                 pass
@@ -6,57 +6,29 @@ Compatible with RolePermissionTester framework.
 """
 
 import os
-import re
 import time
 from datetime import datetime
 from .test_utils import capture_screenshot
+from .pages import ProjectsPage, select_multiselect_option_by_id
+from .readiness import settle
 from change_role import get_lims_connection, modify_user_role
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 110  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 0
+WORKFLOW_STATE = ("ED_TEST",)  # samples restored to their captured steps first (--restore-workflows)
 SCREENSHOT_DIR = "test_results/screenshots"
 
 os.makedirs(SCREENSHOT_DIR, exist_ok=True)
 
 
-# --- Helper to select an option from a react-widgets multiselect by widget id ---
-def select_multiselect_option_by_id(page, widget_id, option_text, timeout=8000):
-    """
-    Open multiselect #<widget_id>, wait for its listbox to be visible,
-    then click the li inside that listbox that matches option_text.
-    """
-    listbox_id = f"#{widget_id}__listbox"
-    wrapper = page.locator(f"#{widget_id} .rw-multiselect-wrapper").first
-
-    print(f"Opening multiselect {widget_id}...")
-    wrapper.click()
-    try:
-        page.wait_for_selector(listbox_id, state="visible", timeout=timeout)
-    except Exception as e:
-        print(f"Timeout waiting for listbox {listbox_id} to be visible: {e}")
-        return False
-
-    print(f"Selecting option '{option_text}' inside {listbox_id}...")
-    # Use a scoped locator so we only match items inside this listbox
-    option = page.locator(f"{listbox_id} >> text=\"{option_text}\"").first
-    try:
-        option.click()
-        page.wait_for_timeout(200)  # let UI settle
-        print(f"Selected '{option_text}' in {widget_id}.")
-        return True
-    except Exception as e:
-        print(f"Failed to click option '{option_text}' in {widget_id}: {e}")
-        return False
-
-
-
-def test_sample_rework(page, expected=True):
+def test_sample_rework(page, expected=True, server="dev"):
     """
     Checks if role can rework a sample in Clarity LIMS.
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    projects = ProjectsPage(page)
     print("\n===== TEST: Sample Rework Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -80,32 +52,19 @@ def test_sample_rework(page, expected=True):
 
             # Add System Admin (BTO) role to user to create test environment
             print("Adding System Admin (BTO) role to user to create test environment...")
-            lims, username = get_lims_connection()
+            lims, username = get_lims_connection(server=server)
             user = modify_user_role(lims, "Emil", "Test", "System Admin (BTO)", action="add")
             print(f"Current roles for {username} after adding System Admin (BTO) role:")
             for r in user.roles:
                 print(f"  - {r.name}")
 
             print(f"\n--- Attempt {attempt} ---")
-            print("Navigating to Projects & Samples...")
-            page.get_by_role("link", name=re.compile("PROJECTS & Samples", re.I)).click()
-            page.wait_for_timeout(1000)
-
-            print(f"Filtering for project '{PROJECT_NAME}'...")
-            filter_box = page.get_by_role("textbox", name="Filter...")
-            filter_box.wait_for(state="visible", timeout=5000)
-            filter_box.type(PROJECT_NAME, delay=10)
-            page.wait_for_timeout(1000)
-
-            print("Locating project row...")
-            project_row = page.locator(f"div.project-list-item:has(div[data-qtip='{PROJECT_NAME}'])").first
-            project_row.wait_for(state="visible", timeout=10000)
-            project_row.click()
-            page.wait_for_timeout(1000)
-            print("Project clicked successfully.")
+            print(f"Opening project '{PROJECT_NAME}'...")
+            projects.select_project(PROJECT_NAME)
+            print("Project selected.")
 
             print("Checking for available samples...")
-            sample_rows = page.locator("div.project-list-item.x-item-selected")
+            sample_rows = projects.selected_items()
             if sample_rows.count() == 0:
                 raise Exception("No samples found in project.")
 
@@ -115,18 +74,18 @@ def test_sample_rework(page, expected=True):
 
             print("Clicking 'Select Group'...")
             select_group_btn.click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Opening 'Assign To Workflow' dropdown...")
             assign_btn = page.locator("div.rw-input", has_text="Assign To Workflow")
             assign_btn.click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Selecting workflow 'Aneuploidy v3.6'...")
             workflow_option = page.locator("li.rw-list-option", has_text="Aneuploidy v3.6").first
             workflow_option.wait_for(state="visible", timeout=10000)
             workflow_option.click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Confirming workflow assignment...")
             workflow_name_locator = page.locator("div.workflow-name", has_text="Aneuploidy v3.6")
@@ -141,19 +100,19 @@ def test_sample_rework(page, expected=True):
 
             print("Opening 'Step 1 » Aneuploidy - Plasma Isolation'...")
             page.get_by_text("Step 1 » Aneuploidy - Plasma Isolation").click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Expanding sample group 'Single Well: Tube'...")
             page.locator("#listbody-1014").get_by_text("Single Well: Tube").click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Selecting sample in 'Waiting' status...")
             page.locator("#listbody-1014").get_by_text("Waiting").click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print(f"Selecting sample {SAMPLE_ID}...")
             page.get_by_text(SAMPLE_ID).click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Clicking Options → Move...")
             page.get_by_role("button", name="Options").click()
@@ -164,15 +123,15 @@ def test_sample_rework(page, expected=True):
             print("Navigating to next step: Plasma Verification...")
             page.get_by_role("link", name="Lab View").click()
             page.get_by_text("Step 1 » Aneuploidy - Plasma Verification").click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Expanding sample group 'Single Well: Tube'...")
             page.locator("#listbody-1014").get_by_text("Single Well: Tube").click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Selecting same sample for rework verification...")
             page.get_by_text(SAMPLE_ID).click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Clicking Options → Move...")
             page.get_by_role("button", name="Options").click()
@@ -183,15 +142,15 @@ def test_sample_rework(page, expected=True):
             print("Finalizing: Opening 'Step 2 » Aneuploidy - Plasma'...")
             page.get_by_role("link", name="Lab View").click()
             page.locator("#my-work-container").get_by_text("Step 2 » Aneuploidy - Plasma").click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print("Expanding sample group 'Single Well: Tube'...")
             page.locator("#listbody-1014").get_by_text("Single Well: Tube").click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Selecting same sample for rework verification...")
             page.get_by_text(SAMPLE_ID).click()
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             print("Adding to Ice Bucket...")
             page.locator("#ice-bucket-add-47269198").click()
@@ -255,7 +214,7 @@ def test_sample_rework(page, expected=True):
             # Click 'Record Details »' to finalize
             print("Clicking 'Record Details »' button to confirm rework placement...")
             page.get_by_role("button", name="Record Details »").click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
             print("Sample successfully recorded in workflow.")
 
             print("Filling in metadata fields before finalizing rework...")
@@ -278,7 +237,7 @@ def test_sample_rework(page, expected=True):
             print("Selecting 'NA' from picker #ext-gen1136...")
             try:
                 page.locator("#ext-gen1136").click()
-                page.wait_for_timeout(200)
+                settle(page, 200)
                 # Try to click exact option first
                 page.get_by_role("option", name="NA", exact=True).click()
                 print("Selected 'NA' from #ext-gen1136.")
@@ -326,7 +285,7 @@ def test_sample_rework(page, expected=True):
             print("Selecting workflow and verifying rework...")
             # Click workflow in tree view
             page.locator("#treeview-1076").get_by_text("Aneuploidy - Automated cfDNA").click()
-            page.wait_for_timeout(500)  # small pause for UI
+            settle(page, 500)  # small pause for UI
 
             # Wait for the dropdown to appear
             try:
@@ -338,7 +297,7 @@ def test_sample_rework(page, expected=True):
                 if option.count() == 0:
                     raise Exception("Could not find 'Rework from an earlier step' option in Select2 dropdown.")
                 option.click()
-                page.wait_for_timeout(500)
+                settle(page, 500)
                 print("Selected 'Rework from an earlier step'")
             except Exception as e:
                 ss, _ = capture_screenshot(page, "select2_dropdown_fail", "fail")
@@ -366,7 +325,7 @@ def test_sample_rework(page, expected=True):
 
             print("Rework verification complete — closing dialog.")
             page.get_by_role("button", name="Cancel").click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             break  # exit retry loop
 
@@ -394,33 +353,14 @@ def test_sample_rework(page, expected=True):
                 page.get_by_role("button", name="Abort").click()
                 page.get_by_role("button", name="OK").click()
                 page.get_by_role("button", name="Remove").click()
-                print(f"\nAttempt {attempt}: Navigating to Projects & Samples...")
-                page.get_by_role("link", name=re.compile("PROJECTS & Samples", re.I)).click()
-                page.wait_for_timeout(1000)
-
-                print(f"Filtering for project '{PROJECT_NAME}'...")
-                filter_box = page.get_by_role("textbox", name="Filter...")
-                filter_box.wait_for(state="visible", timeout=5000)
-                page.wait_for_timeout(500)
-                filter_box.fill("")
-                filter_box.type(PROJECT_NAME, delay=100)
-                page.wait_for_timeout(1000)
-
-                print("Locating project row...")
-                project_row = page.locator(f"div.project-list-item:has(div[data-qtip='{PROJECT_NAME}'])").first
-                project_row.wait_for(state="visible", timeout=10000)
-                if project_row.count() == 0:
-                    raise Exception(f"Project '{PROJECT_NAME}' not found")
-
-                print("Project found — clicking to open project details...")
-                project_row.click()
-                page.wait_for_timeout(1500)
+                print(f"\nAttempt {attempt}: Opening project '{PROJECT_NAME}'...")
+                projects.select_project(PROJECT_NAME)
 
                 print("Expanding sample group to show all samples...")
                 group_expander = page.locator("div.group-expander-btn").first
                 if group_expander.count() > 0:
                     group_expander.click()
-                    page.wait_for_timeout(1500)
+                    settle(page, 1500)
                     print("Sample group expanded.")
                 else:
                     print("No group expander button found — possibly already expanded.")
@@ -6,23 +6,106 @@ Compatible with RolePermissionTester framework.
 """
 
 import os
-import re
 import time
 from .test_utils import capture_screenshot, clean_error_message
+from .pages import ProjectsPage
+from .readiness import settle
+from teardown import get_teardown
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 30  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 SCREENSHOT_DIR = "test_results/screenshots"
 
 os.makedirs(SCREENSHOT_DIR, exist_ok=True)
 
-def test_sample_workflow_assignment(page, expected=True):
+
+def remove_samples_from_workflows_ui(page):
+    """Remove every sample in the project from its workflows, one click at a time (API fallback)."""
+    projects = ProjectsPage(page)
+    projects.open()
+
+    print(f"Filtering for project '{PROJECT_NAME}'...")
+    projects.filter(PROJECT_NAME)
+
+    print("Locating project row...")
+    project_row = projects.wait_for_project(PROJECT_NAME)
+    if project_row.count() == 0:
+        print(f"Warning: Project '{PROJECT_NAME}' not found for cleanup")
+    else:
+        print("Project found — clicking to open project details...")
+        projects.click_project(project_row)
+
+        print("Expanding sample group to show all samples...")
+        group_expander = page.locator("div.group-expander-btn").first
+        if group_expander.count() > 0:
+            group_expander.click()
+            settle(page, 1000)
+            print("Sample group expanded.")
+        else:
+            print("No group expander button found — possibly already expanded.")
+
+        # Remove all samples from workflows using live-loop
+        removed_count = 0
+        while True:
+            sample_rows = page.locator("div.sample-row:has(div.workflow-name)")
+            if sample_rows.count() == 0:
+                break
+
+            sample = sample_rows.first
+            sample_id = sample.locator(".sample-udf-icon").get_attribute("data-sample-id")
+            workflow_name = sample.locator(".workflow-name").inner_text()
+            print(f"Removing sample ID {sample_id} from workflow '{workflow_name}'...")
+
+            delete_btn = page.locator(f"div.delete-btn[data-sample-id='{sample_id}']")
+            if delete_btn.count() == 0:
+                print(f"No delete button found for sample ID {sample_id}, skipping.")
+                # Remove this sample from DOM consideration if needed
+                page.evaluate("el => el.remove()", sample)
+                continue
+
+            # Wait for any page overlay to disappear before clicking
+            try:
+                page.locator("div.x-mask-full-page").wait_for(state="hidden", timeout=5000)
+            except:
+                pass  # No overlay present
+
+            # Click delete
+            delete_btn.first.click()
+
+            # Wait until the delete button for this sample is gone (indicating successful removal)
+            delete_btn_check = page.locator(f"div.delete-btn[data-sample-id='{sample_id}']")
+            try:
+                delete_btn_check.wait_for(state="detached", timeout=8000)
+                print(f"Sample {sample_id} successfully removed from workflow.")
+            except:
+                print(f"Warning: delete button for sample {sample_id} did not disappear within timeout")
+
+            removed_count += 1
+            page.wait_for_timeout(300)
+
+        print(f"Removed {removed_count} sample(s) from workflows.")
+
+        # Verification: ensure no samples remain assigned
+        remaining_samples = page.locator("div.sample-row:has(div.workflow-name)").count()
+        if remaining_samples == 0:
+            print("All samples successfully removed from workflows.")
+        else:
+            print(f"Warning: {remaining_samples} sample(s) still assigned to workflows after removal.")
+
+
+    # Navigate back to base URL
+    page.goto("/")
+    print("Returned to main page.")
+
+
+def test_sample_workflow_assignment(page, expected=True, server="dev"):
     """
     Checks if role can assign a sample to a workflow in Clarity LIMS.
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    projects = ProjectsPage(page)
     print("\n===== TEST: Sample Workflow Assignment Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -50,27 +133,11 @@ def test_sample_workflow_assignment(page, expected=True):
 
     for attempt in range(1, max_attempts + 1):
         try:
-            print(f"\nAttempt {attempt}: Navigating to Projects & Samples...")
-            page.get_by_role("link", name=re.compile("PROJECTS & Samples", re.I)).click()
-            page.wait_for_timeout(800)
-
-            print(f"Filtering for project '{PROJECT_NAME}'...")
-            filter_box = page.get_by_role("textbox", name="Filter...")
-            filter_box.wait_for(state="visible", timeout=8000)
-            filter_box.type(PROJECT_NAME, delay=50)
-            page.wait_for_timeout(500)
-
-            project_row = page.locator(f"div.project-list-item:has(div[data-qtip='{PROJECT_NAME}'])").first
-            project_row.wait_for(state="visible", timeout=8000)
-
-            if project_row.count() == 0:
-                raise Exception(f"Project '{PROJECT_NAME}' not found")
-            print("Project found — clicking on it...")
-            project_row.click()
-            page.wait_for_timeout(800)
+            print(f"\nAttempt {attempt}: Opening project '{PROJECT_NAME}'...")
+            projects.select_project(PROJECT_NAME)
 
             # Check if there are samples
-            sample_rows = page.locator("div.project-list-item.x-item-selected")
+            sample_rows = projects.selected_items()
             if sample_rows.count() == 0:
                 raise Exception("No samples found in project")
 
@@ -82,20 +149,20 @@ def test_sample_workflow_assignment(page, expected=True):
             if select_group_btn.count() > 0:
                 print("Clicking 'Select Group'...")
                 select_group_btn.click()
-                page.wait_for_timeout(500)
+                settle(page, 500)
             else:
                 raise Exception("'Select Group' button not found on the page.")
 
             # Click Assign to Workflow
             assign_btn = page.locator("div.rw-input", has_text="Assign To Workflow")
             assign_btn.click()
-            page.wait_for_timeout(300)
+            settle(page, 300)
 
             # Select workflow from dropdown
             workflow_option = page.locator("li.rw-list-option", has_text="Aneuploidy v3.6").first
             workflow_option.wait_for(state="visible", timeout=5000)
             workflow_option.click()
-            page.wait_for_timeout(300)
+            settle(page, 300)
             print(f"Selected workflow: {workflow_option.text_content()}")
 
             # Confirm workflow assigned
@@ -130,88 +197,12 @@ def test_sample_workflow_assignment(page, expected=True):
     # Cleanup: Remove all samples from workflows (runs once after all attempts)
     try:
         print("\n--- CLEANUP: Removing all samples from workflows ---")
-        page.get_by_role("link", name=re.compile("PROJECTS & Samples", re.I)).click()
-        page.wait_for_timeout(800)
-
-        print(f"Filtering for project '{PROJECT_NAME}'...")
-        filter_box = page.get_by_role("textbox", name="Filter...")
-        filter_box.wait_for(state="visible", timeout=5000)
-        page.wait_for_timeout(300)
-        filter_box.fill("")
-        filter_box.type(PROJECT_NAME, delay=50)
-        page.wait_for_timeout(500)
-
-        print("Locating project row...")
-        project_row = page.locator(f"div.project-list-item:has(div[data-qtip='{PROJECT_NAME}'])").first
-        project_row.wait_for(state="visible", timeout=8000)
-        if project_row.count() == 0:
-            print(f"Warning: Project '{PROJECT_NAME}' not found for cleanup")
-        else:
-            print("Project found — clicking to open project details...")
-            project_row.click()
-            page.wait_for_timeout(1000)
-
-            print("Expanding sample group to show all samples...")
-            group_expander = page.locator("div.group-expander-btn").first
-            if group_expander.count() > 0:
-                group_expander.click()
-                page.wait_for_timeout(1000)
-                print("Sample group expanded.")
-            else:
-                print("No group expander button found — possibly already expanded.")
-
-            # Remove all samples from workflows using live-loop
-            removed_count = 0
-            while True:
-                sample_rows = page.locator("div.sample-row:has(div.workflow-name)")
-                if sample_rows.count() == 0:
-                    break
-
-                sample = sample_rows.first
-                sample_id = sample.locator(".sample-udf-icon").get_attribute("data-sample-id")
-                workflow_name = sample.locator(".workflow-name").inner_text()
-                print(f"Removing sample ID {sample_id} from workflow '{workflow_name}'...")
-
-                delete_btn = page.locator(f"div.delete-btn[data-sample-id='{sample_id}']")
-                if delete_btn.count() == 0:
-                    print(f"No delete button found for sample ID {sample_id}, skipping.")
-                    # Remove this sample from DOM consideration if needed
-                    page.evaluate("el => el.remove()", sample)
-                    continue
-
-                # Wait for any page overlay to disappear before clicking
-                try:
-                    page.locator("div.x-mask-full-page").wait_for(state="hidden", timeout=5000)
-                except:
-                    pass  # No overlay present
-
-                # Click delete
-                delete_btn.first.click()
-
-                # Wait until the delete button for this sample is gone (indicating successful removal)
-                delete_btn_check = page.locator(f"div.delete-btn[data-sample-id='{sample_id}']")
-                try:
-                    delete_btn_check.wait_for(state="detached", timeout=8000)
-                    print(f"Sample {sample_id} successfully removed from workflow.")
-                except:
-                    print(f"Warning: delete button for sample {sample_id} did not disappear within timeout")
-
-                removed_count += 1
-                page.wait_for_timeout(300)
-
-            print(f"Removed {removed_count} sample(s) from workflows.")
-
-            # Verification: ensure no samples remain assigned
-            remaining_samples = page.locator("div.sample-row:has(div.workflow-name)").count()
-            if remaining_samples == 0:
-                print("All samples successfully removed from workflows.")
-            else:
-                print(f"Warning: {remaining_samples} sample(s) still assigned to workflows after removal.")
-
-
-        # Navigate back to base URL
-        page.goto(BASE_URL)
-        print("Returned to main page.")
+        try:
+            get_teardown(server).unassign_workflows(PROJECT_NAME)
+            page.goto("/")
+        except Exception as api_error:
+            print(f"API cleanup failed ({api_error}), removing samples through the UI...")
+            remove_samples_from_workflows_ui(page)
     except Exception as cleanup_error:
         print(f"Cleanup encountered an issue: {cleanup_error}")
         result["screenshot"], _ = capture_screenshot(page, "sample_workflow_assignment", "fail")
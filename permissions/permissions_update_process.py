@@ -5,11 +5,12 @@ Checks if a user with the proper role can update a process in Clarity LIMS.
 Compatible with RolePermissionTester framework.
 """
 
-import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ConfigurationPage
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 20  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 
@@ -19,6 +20,7 @@ def test_update_process(page, expected=True):
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    config = ConfigurationPage(page)
     print("\n===== TEST: Update Process Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -45,16 +47,12 @@ def test_update_process(page, expected=True):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-            page.goto(f"{BASE_URL}/clarity/configuration")
-            page.wait_for_timeout(2000)
-
-            # Click User Management
-            print("Checking for Lab Work tab...")
-            lab_work_tab = page.locator("div.tab-title", has_text=re.compile("Lab Work", re.I))
-            if lab_work_tab.count() == 0:
-                raise Exception("Lab Work tab not found — permission denied or hidden.")
-            lab_work_tab.first.click()
-            page.wait_for_timeout(2000)
+            if not config.open("Lab Work"):
+                # Click User Management
+                print("Checking for Lab Work tab...")
+                if not config.open_tab("Lab Work"):
+                    raise Exception("Lab Work tab not found — permission denied or hidden.")
+            settle(page, 2000)
 
             print("Looking for 'Master Step' column header...")
             header = page.locator("div.g-col-header.master-step-column-header")
@@ -68,26 +66,25 @@ def test_update_process(page, expected=True):
             # Add to Naming Convention
             page.get_by_role("textbox", name="Enter Naming Convention").click()
             page.get_by_role("textbox", name="Enter Naming Convention").type("Test", delay=10)
-            page.wait_for_timeout(500)
+            settle(page, 500)
 
             # Save Master Step
             print("Clicking 'Save'...")
             page.locator("button").filter(has_text="Save").click()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             print("Refreshing page to see if master step is updated...")
             page.reload()
-            page.wait_for_timeout(2000)
+            settle(page, 2000)
 
             print(f"Clicking on the master step...")
-            page.locator("div.g-two-sided-row", has_text=re.compile(master_step, re.I)).scroll_into_view_if_needed()
-            search_result = page.locator("div.g-two-sided-row", has_text=re.compile(master_step, re.I))
+            search_result = config.find_in_grid(master_step, row=True)
             if not search_result.is_visible():
                 raise Exception(f"Master Step '{master_step}' not found.")
 
             print(f"Clicking '{master_step}'...")
             search_result.click()
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             print(f"Verifying that Naming Convention is changed...")
             naming_convention = page.get_by_role("textbox", name="Enter Naming Convention")
@@ -101,8 +98,8 @@ def test_update_process(page, expected=True):
 
             result["screenshot"], _ = capture_screenshot(page, "update_process", "pass")
 
-            page.goto(BASE_URL)
-            page.wait_for_timeout(1000)
+            page.goto("/")
+            settle(page, 1000)
             break
 
         except Exception as e:
@@ -114,8 +111,8 @@ def test_update_process(page, expected=True):
 
             if attempt < max_attempts:
                 print("Retrying in 2 seconds...")
-                page.goto(BASE_URL)
-                page.wait_for_timeout(1000)
+                page.goto("/")
+                settle(page, 1000)
                 time.sleep(2)
             else:
                 print("Max retries reached. Failing test.")
@@ -16,18 +16,21 @@ Test Flow:
 import re
 import time
 from .test_utils import capture_screenshot
+from .pages import ConfigurationPage
+from .readiness import settle
 from change_role import modify_user_role, get_lims_connection
 
-BASE_URL = "https://clarity-dev.btolims.com"
+ESTIMATED_DURATION = 60  # seconds, used for scheduling until there is run history
 PROJECT_NAME = "ED_TEST"
 RETRIES = 2
 
-def test_update_user(page, expected=True):
+def test_update_user(page, expected=True, server="dev"):
     """
     Checks if role can update a user in Clarity LIMS.
     Accepts a Playwright 'page' object from the test framework.
     Returns structured JSON result.
     """
+    config = ConfigurationPage(page)
     print("\n===== TEST: Update User Permission =====")
     print(f"Project: {PROJECT_NAME}")
 
@@ -62,7 +65,7 @@ def test_update_user(page, expected=True):
     try:
         # Step 1: Add System Admin (BTO) role to create test user
         print("\n--- SETUP: Adding System Admin (BTO) role to create test user ---")
-        lims, username = get_lims_connection()
+        lims, username = get_lims_connection(server=server)
         user = modify_user_role(lims, "Emil", "Test", "System Admin (BTO)", action="add")
         print(f"Current roles for {username} after adding System Admin (BTO):")
         for r in user.roles:
@@ -70,30 +73,26 @@ def test_update_user(page, expected=True):
 
         # Step 2: Create the test user
         print(f"\n--- SETUP: Creating test user '{full_name}' ---")
-        page.goto(f"{BASE_URL}/clarity/configuration")
-        page.wait_for_timeout(2000)
-
-        # Click User Management
-        print("Navigating to User Management tab...")
-        user_tab = page.locator("div.tab-title", has_text=re.compile("User Management", re.I))
-        if user_tab.count() == 0:
-            raise Exception("User Management tab not found — cannot create test user.")
-        user_tab.first.click()
-        page.wait_for_timeout(2000)
+        if not config.open("User Management"):
+            # Click User Management
+            print("Navigating to User Management tab...")
+            if not config.open_tab("User Management"):
+                raise Exception("User Management tab not found — cannot create test user.")
+        settle(page, 2000)
 
         # Click NEW USER
         print("Clicking 'NEW USER' button...")
         page.locator("button").filter(has_text=re.compile("NEW USER", re.I)).click()
-        page.wait_for_timeout(1000)
+        settle(page, 1000)
 
         # Fill user details (without phone initially)
         print("Filling user details...")
         page.get_by_role("textbox", name=re.compile("Enter First Name", re.I)).type(user_details["first_name"], delay=10)
         page.get_by_role("textbox", name=re.compile("Enter Last Name", re.I)).type(user_details["last_name"], delay=10)
-        page.wait_for_timeout(500)
+        settle(page, 500)
 
         page.get_by_role("textbox", name="Title").type(user_details["title"], delay=10)
-        page.wait_for_timeout(500)
+        settle(page, 500)
 
         # Select Account
         page.locator("#account-drp").click()
@@ -102,25 +101,24 @@ def test_update_user(page, expected=True):
 
         # Fill Email and Username
         page.get_by_role("textbox", name="Email").type(user_details["email"], delay=10)
-        page.wait_for_timeout(500)
+        settle(page, 500)
         page.get_by_role("textbox", name="Username").type(user_details["username"], delay=10)
-        page.wait_for_timeout(500)
+        settle(page, 500)
 
         # Select Role
         page.locator(".rw-multiselect-wrapper").click()
         page.get_by_role("option", name=user_details["role"]).click()
-        page.wait_for_timeout(1000)
+        settle(page, 1000)
 
         # Save User (without phone)
         print("Saving test user (without phone number)...")
         page.locator("button").filter(has_text="Save").click()
-        page.wait_for_timeout(2000)
+        settle(page, 2000)
 
         # Verify user was created
         page.reload()
-        page.wait_for_timeout(2000)
-        page.locator("div.g-col-value", has_text=re.compile(full_name, re.I)).scroll_into_view_if_needed()
-        search_result = page.locator("div.g-col-value", has_text=re.compile(full_name, re.I))
+        settle(page, 2000)
+        search_result = config.find_in_grid(full_name)
         if not search_result.is_visible():
             raise Exception(f"Test user '{full_name}' was not created successfully.")
         
@@ -140,26 +138,21 @@ def test_update_user(page, expected=True):
         for attempt in range(1, max_attempts + 1):
             try:
                 print(f"\nAttempt {attempt}: Navigating to Configuration page...")
-                page.goto(f"{BASE_URL}/clarity/configuration")
-                page.wait_for_timeout(2000)
-
-                # Click User Management
-                print("Checking for User Management tab...")
-                user_tab = page.locator("div.tab-title", has_text=re.compile("User Management", re.I))
-                if user_tab.count() == 0:
-                    raise Exception("User Management tab not found — permission denied or hidden.")
-                user_tab.first.click()
-                page.wait_for_timeout(2000)
+                if not config.open("User Management"):
+                    # Click User Management
+                    print("Checking for User Management tab...")
+                    if not config.open_tab("User Management"):
+                        raise Exception("User Management tab not found — permission denied or hidden.")
+                settle(page, 2000)
 
                 print(f"Locating user '{full_name}' in the list...")
-                page.locator("div.g-col-value", has_text=re.compile(full_name, re.I)).scroll_into_view_if_needed()
-                search_result = page.locator("div.g-col-value", has_text=re.compile(full_name, re.I))
+                search_result = config.find_in_grid(full_name)
                 if not search_result.is_visible():
                     raise Exception(f"User '{full_name}' not found in user list.")
                     
                 print(f"Clicking on user '{full_name}'...")
                 search_result.click()
-                page.wait_for_timeout(1000)
+                settle(page, 1000)
 
                 # Fill Phone
                 print(f"Adding phone number '{user_details['phone']}'...")
@@ -170,7 +163,7 @@ def test_update_user(page, expected=True):
                     raise Exception("Phone field not visible — permission denied.")
                 
                 phone_field.type(user_details["phone"], delay=10)
-                page.wait_for_timeout(500)
+                settle(page, 500)
 
                 # Save User
                 print("Clicking 'Save'...")
@@ -180,22 +173,21 @@ def test_update_user(page, expected=True):
                     raise Exception("Save button not visible — permission denied.")
                 
                 save_button.click()
-                page.wait_for_timeout(2000)
+                settle(page, 2000)
 
                 # Verify user update
                 print("Refreshing page to verify update...")
                 page.reload()
-                page.wait_for_timeout(2000)
+                settle(page, 2000)
 
                 print(f"Verifying that user '{full_name}' still exists...")
-                page.locator("div.g-col-value", has_text=re.compile(full_name, re.I)).scroll_into_view_if_needed()
-                search_result = page.locator("div.g-col-value", has_text=re.compile(full_name, re.I))
+                search_result = config.find_in_grid(full_name)
                 if not search_result.is_visible():
                     raise Exception(f"User '{full_name}' not found after update.")
 
                 print(f"Verifying phone number was updated to '{user_details['phone']}'...")
                 search_result.click()
-                page.wait_for_timeout(1000)
+                settle(page, 1000)
                 phone_text = page.get_by_role("textbox", name="Phone").input_value()
                 
                 if phone_text.strip() == user_details["phone"]:
@@ -203,8 +195,8 @@ def test_update_user(page, expected=True):
                     result["passed"] = True
                     result["result"] = "pass"
                     result["screenshot"], _ = capture_screenshot(page, "update_user", "pass")
-                    page.goto(BASE_URL)
-                    page.wait_for_timeout(1000)
+                    page.goto("/")
+                    settle(page, 1000)
                     break
                 else:
                     raise Exception(f"Phone is '{phone_text}', expected '{user_details['phone']}' — update failed.")
@@ -217,8 +209,8 @@ def test_update_user(page, expected=True):
 
                 if attempt < max_attempts:
                     print("Retrying in 2 seconds...")
-                    page.goto(BASE_URL)
-                    page.wait_for_timeout(1000)
+                    page.goto("/")
+                    settle(page, 1000)
                     time.sleep(2)
                 else:
                     print("Max retries reached. Failing test.")
@@ -238,30 +230,26 @@ def test_update_user(page, expected=True):
         if user_created:
             print("\n--- CLEANUP: Adding System Admin (BTO) role to delete test user ---")
             try:
-                lims, username = get_lims_connection()
+                lims, username = get_lims_connection(server=server)
                 user = modify_user_role(lims, "Emil", "Test", "System Admin (BTO)", action="add")
                 print(f"Current roles for {username} after adding System Admin (BTO) for cleanup:")
                 for r in user.roles:
                     print(f"  - {r.name}")
 
                 print(f"Deleting test user '{full_name}' with System Admin privileges...")
-                page.goto(f"{BASE_URL}/clarity/configuration")
-                page.wait_for_timeout(2000)
-
-                user_tab = page.locator("div.tab-title", has_text=re.compile("User Management", re.I))
-                user_tab.first.click()
-                page.wait_for_timeout(2000)
+                if not config.open("User Management"):
+                    config.open_tab("User Management")
+                settle(page, 2000)
 
-                page.locator("div.g-col-value", has_text=re.compile(full_name, re.I)).scroll_into_view_if_needed()
-                search_result = page.locator("div.g-col-value", has_text=re.compile(full_name, re.I))
+                search_result = config.find_in_grid(full_name)
                 
                 if search_result.is_visible():
                     search_result.click()
-                    page.wait_for_timeout(1000)
+                    settle(page, 1000)
                     page.locator("button").filter(has_text="Delete").first.click()
-                    page.wait_for_timeout(500)
+                    settle(page, 500)
                     page.reload()
-                    page.wait_for_timeout(2000)
+                    settle(page, 2000)
                     print(f"Test user '{full_name}' cleaned up successfully.")
                 
                 # Remove System Admin role after cleanup
@@ -7,24 +7,27 @@ Compatible with RolePermissionTester framework.
 """
 
 import time
+from urllib.parse import urlsplit
 from .test_utils import capture_screenshot
+from .readiness import settle
 
-BASE_URL = "https://clarity-dev.btolims.com"
-UNAUTH_URL = f"{BASE_URL}/clarity/login/auth?unauthenticated=1"
+ESTIMATED_DURATION = 25  # seconds, used for scheduling until there is run history
+# Paths are resolved against the browser context's base_url (the server under test)
+UNAUTH_PATH = "/clarity/login/auth?unauthenticated=1"
 
 # All URLs to test
 URLS_TO_TEST = [
-    f"{BASE_URL}/clarity/",
-    f"{BASE_URL}/clarity/configuration",
-    f"{BASE_URL}/clarity/overview",
-    f"{BASE_URL}/clarity/projects",
-    f"{BASE_URL}/clarity/samples",
-    f"{BASE_URL}/clarity/configuration/consumables/reagents",
-    f"{BASE_URL}/clarity/configuration/lab-work",
-    f"{BASE_URL}/clarity/configuration/custom-fields/global-fields",
-    f"{BASE_URL}/clarity/configuration/user-management/users",
-    f"{BASE_URL}/clarity/configuration/automation/step-automation",
-    f"{BASE_URL}/clarity/profile",
+    "/clarity/",
+    "/clarity/configuration",
+    "/clarity/overview",
+    "/clarity/projects",
+    "/clarity/samples",
+    "/clarity/configuration/consumables/reagents",
+    "/clarity/configuration/lab-work",
+    "/clarity/configuration/custom-fields/global-fields",
+    "/clarity/configuration/user-management/users",
+    "/clarity/configuration/automation/step-automation",
+    "/clarity/profile",
 ]
 
 def test_url_check(page, expected_fail=True):
@@ -44,17 +47,18 @@ def test_url_check(page, expected_fail=True):
 
         try:
             page.goto(url, timeout=20000)
-            page.wait_for_timeout(1000)
+            settle(page, 1000)
 
             current_url = page.url
             print(f"Current URL: {current_url}")
 
-            if current_url.startswith(UNAUTH_URL):
+            current = urlsplit(current_url)
+            if f"{current.path}?{current.query}".startswith(UNAUTH_PATH):
                 print("Redirected to unauthenticated page — as expected.")
                 single_result["passed"] = True
             else:
                 print("Unexpected access — page did not redirect to login.")
-                single_result["error"] = f"Expected redirect to {UNAUTH_URL}, got {current_url}"
+                single_result["error"] = f"Expected redirect to {UNAUTH_PATH}, got {current_url}"
 
             # # Take a screenshot for each URL
             # screenshot_name = f"url_check_{int(time.time())}"
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Readiness
+=========
+settle(page) waits until Clarity has stopped doing anything, instead of
+sleeping a fixed time and hoping ExtJS has finished:
+
+    settle(page, 2000)      # was: page.wait_for_timeout(2000)
+
+It returns as soon as all of these hold, and never later than max_wait (so it
+is never slower than the sleep it replaces):
+  - the document has loaded
+  - no XMLHttpRequest or fetch is in flight, and Ext.Ajax has nothing pending
+  - no ExtJS loading mask (.x-mask) is visible
+  - the DOM and React have been quiet (no mutations, no commits) for QUIET_MS
+
+The signals come from a small script installed in the browser context on the
+first call, so it also covers every page loaded afterwards.
+
+Each call records how long it waited against its max_wait; the tester prints
+the time saved per test, and run_all_roles.py the total, saved as
+test_results/readiness/<results name>.json (outside the all_role_tests*
+globs, so result merging and run history never read it).
+
+Replacing sleeps in test modules is mechanical:
+    python permissions/readiness.py rewrite permissions/permissions_*.py
+Sleeps inside polling loops (`for _ in range(...)`, `while`) and lines marked
+`# fixed wait` are left alone.
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+import time
+
+QUIET_MS = 300  # DOM/React quiet time that counts as settled
+POLL_MS = 50
+DEFAULT_MAX_WAIT = 10000
+REPORT_DIR = "test_results/readiness"
+FIXED_MARKER = "# fixed wait"
+
+INSTRUMENT_JS = """
+(() => {
+  if (window.__roleAuditReady) return;
+  const ra = window.__roleAuditReady = {inflight: 0, last: performance.now()};
+  const touch = () => { ra.last = performance.now(); };
+
+  const send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function(...args) {
+    ra.inflight++; touch();
+    this.addEventListener('loadend', () => { ra.inflight--; touch(); }, {once: true});
+    return send.apply(this, args);
+  };
+  if (window.fetch) {
+    const fetch = window.fetch;
+    window.fetch = function(...args) {
+      ra.inflight++; touch();
+      return fetch.apply(this, args).finally(() => { ra.inflight--; touch(); });
+    };
+  }
+
+  const observe = () => new MutationObserver(touch).observe(document.documentElement,
+    {childList: true, subtree: true, attributes: true, characterData: true});
+  if (document.documentElement) observe(); else document.addEventListener('DOMContentLoaded', observe);
+
+  // React reports each commit to the devtools hook, if one exists when it loads
+  if (!window.__REACT_DEVTOOLS_GLOBAL_HOOK__) {
+    window.__REACT_DEVTOOLS_GLOBAL_HOOK__ = {
+      supportsFiber: true, renderers: new Map(), inject() { return 1; },
+      onCommitFiberRoot: touch, onCommitFiberUnmount() {}, onPostCommitFiberRoot() {}, checkDCE() {},
+    };
+  }
+})()
+"""
+
+SETTLED_JS = """
+(quiet) => {
+  const ra = window.__roleAuditReady;
+  if (!ra || document.readyState !== 'complete' || ra.inflight > 0) return false;
+  try {
+    if (window.Ext && Ext.Ajax && Ext.Ajax.isLoading && Ext.Ajax.isLoading()) return false;
+  } catch (e) {}
+  for (const mask of document.querySelectorAll('.x-mask')) {
+    if (mask.getClientRects().length && getComputedStyle(mask).visibility !== 'hidden') return false;
+  }
+  return performance.now() - ra.last >= quiet;
+}
+"""
+
+_stats = {}  # test name -> {"settles", "waited", "budget"} (seconds)
+_current = None
+
+
+def _install(page):
+    """Instrument the page now and every document its context loads later."""
+    context = page.context
+    if not getattr(context, "_role_audit_readiness", False):
+        context.add_init_script(INSTRUMENT_JS)
+        context._role_audit_readiness = True
+    try:
+        page.evaluate(INSTRUMENT_JS)
+    except Exception:
+        pass  # navigating; the init script covers the new document
+
+
+def _record(budget, waited):
+    entry = _stats.setdefault(_current or "(outside tests)", {"settles": 0, "waited": 0.0, "budget": 0.0})
+    entry["settles"] += 1
+    entry["waited"] += waited
+    entry["budget"] += budget
+
+
+def settle(page, max_wait=DEFAULT_MAX_WAIT, quiet=QUIET_MS):
+    """
+    Wait until the page is settled, or max_wait ms at most.
+
+    Args:
+        page: Playwright page
+        max_wait: Longest wait in ms; for a replaced sleep, its duration
+        quiet: How long the page must be quiet to count as settled (ms)
+
+    Returns:
+        float: Seconds waited
+    """
+    start = time.time()
+    if max_wait <= quiet:
+        page.wait_for_timeout(max_wait)
+    else:
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+        _install(page)
+        deadline = start + max_wait / 1000
+        while True:
+            remaining = (deadline - time.time()) * 1000
+            if remaining <= 0:
+                break
+            try:
+                page.wait_for_function(SETTLED_JS, arg=quiet, polling=POLL_MS, timeout=remaining)
+                break
+            except PlaywrightTimeoutError:
+                break
+            except Exception:
+                # The page navigated mid-check; check the new document
+                page.wait_for_timeout(POLL_MS)
+    waited = time.time() - start
+    _record(max_wait / 1000, waited)
+    return waited
+
+
+def begin_test(name):
+    """Attribute the following settle() calls to a test."""
+    global _current
+    _current = name
+
+
+def end_test():
+    """
+    Stop attributing settle() calls to the current test.
+
+    Returns:
+        dict: {"settles", "waited", "saved"} for the test (seconds), or None
+              if it made no settle() calls
+    """
+    global _current
+    entry, _current = _stats.get(_current), None
+    if not entry:
+        return None
+    return {"settles": entry["settles"], "waited": round(entry["waited"], 1),
+            "saved": round(entry["budget"] - entry["waited"], 1)}
+
+
+def report():
+    """Per-test settle counts, wait and time saved against the fixed sleeps."""
+    tests = {
+        name: {"settles": e["settles"], "waited": round(e["waited"], 1),
+               "fixed": round(e["budget"], 1), "saved": round(e["budget"] - e["waited"], 1)}
+        for name, e in _stats.items()
+    }
+    return dict(sorted(tests.items(), key=lambda item: -item[1]["saved"]))
+
+
+def print_report(limit=10):
+    tests = report()
+    saved = sum(t["saved"] for t in tests.values())
+    fixed = sum(t["fixed"] for t in tests.values())
+    print(f"Readiness waits: {sum(t['settles'] for t in tests.values())} settle(s), "
+          f"saved {saved / 60:.1f} min of {fixed / 60:.1f} min fixed sleeps")
+    for name, t in list(tests.items())[:limit]:
+        print(f"  {t['saved']:>7.1f}s  {name} ({t['settles']} settle(s))")
+
+
+def save_report(name="all_role_tests"):
+    """Save report() as REPORT_DIR/<name>.json, named after the run's results file."""
+    path = os.path.join(REPORT_DIR, f"{name}.json")
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report(), f, indent=2)
+    return path
+
+
+def _polling_sleeps(tree):
+    """Line numbers of sleeps inside `for _ in ...` and `while` loops."""
+    lines = set()
+    for node in ast.walk(tree):
+        polling = isinstance(node, ast.While) or (
+            isinstance(node, ast.For) and isinstance(node.target, ast.Name) and node.target.id == "_")
+        if polling:
+            for child in ast.walk(node):
+                if isinstance(child, ast.Call):
+                    lines.add(child.lineno)
+    return lines
+
+
+def rewrite_source(source):
+    """
+    Replace page.wait_for_timeout(N) with settle(page, N).
+
+    Returns:
+        tuple: (new source, number of sleeps replaced)
+    """
+    tree = ast.parse(source)
+    skip = _polling_sleeps(tree)
+    targets = set()
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == "wait_for_timeout" and isinstance(node.func.value, ast.Name)
+                and node.func.value.id == "page" and len(node.args) == 1
+                and isinstance(node.args[0], ast.Constant) and node.lineno not in skip):
+            targets.add(node.lineno)
+
+    lines = source.splitlines(keepends=True)
+    count = 0
+    for lineno in sorted(targets):
+        line = lines[lineno - 1]
+        if FIXED_MARKER in line:
+            continue
+        new, n = re.subn(r"\bpage\.wait_for_timeout\((\d+)\)", r"settle(page, \1)", line)
+        lines[lineno - 1] = new
+        count += n
+    source = "".join(lines)
+    if count and not re.search(r"^from \.readiness import settle$", source, re.M):
+        imports = list(re.finditer(r"^(?:from [\w.]+ import|import) [^(\n]*\n", source, re.M))
+        at = imports[-1].end() if imports else 0
+        source = source[:at] + "from .readiness import settle\n" + source[at:]
+    return source, count
+
+
+def main():
+    """Rewrite fixed sleeps in test modules."""
+    parser = argparse.ArgumentParser(
+        description="Replace page.wait_for_timeout(N) with settle(page, N) in test modules",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python permissions/readiness.py rewrite permissions/permissions_*.py
+  python permissions/readiness.py rewrite permissions/permissions_sample_rework.py --dry-run
+"""
+    )
+    parser.add_argument("command", choices=["rewrite"])
+    parser.add_argument("files", nargs="+", help="Test modules to rewrite")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the sleeps that would be replaced")
+    args = parser.parse_args()
+
+    total = 0
+    for path in args.files:
+        with open(path, "r") as f:
+            source = f.read()
+        new, count = rewrite_source(source)
+        total += count
+        if count:
+            print(f"{path}: {count} sleep(s)")
+            if not args.dry_run:
+                with open(path, "w") as f:
+                    f.write(new)
+    print(f"{'Would replace' if args.dry_run else 'Replaced'} {total} sleep(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@
 Shared utilities for permission tests
 ======================================
 Common helper functions for all permission test modules.
+
+Tests navigate with paths like page.goto("/clarity/samples"); the browser
+context's base_url (set by RolePermissionTester) decides which server they
+run against. Tests that also call the API accept a `server` keyword.
 """
 
 import os
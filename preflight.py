@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Preflight
+=========
+Checks that a run can start before anything slow happens: dependencies are
+installed (found, not imported), every configured test module exists,
+credentials are stored, and the results folder is writable. Dependencies
+that only some options need (reportlab for the PDF report, numpy for
+--infer-expectations) fail the check when the run uses that option, and are
+only a warning otherwise.
+
+Nothing here touches the network, so it finishes in well under a second:
+    python preflight.py
+    python run_all_roles.py --preflight --no-pdf
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+from clarity_servers import SERVER_NAMES, base_url
+from role_matrix import PERMISSIONS_DIR
+
+# (module, package to install, what needs it, run option that needs it or None for every run)
+DEPENDENCIES = [
+    ("playwright", "playwright", "browser tests", None),
+    ("s4.clarity", "s4-clarity", "role changes", None),
+    ("keyring", "keyring", "credentials from the system keyring", None),
+    ("requests", "requests", "API probes, fixtures, teardown", None),
+    ("reportlab", "reportlab", "PDF reports", "pdf"),
+    ("numpy", "numpy", "--infer-expectations", "infer_expectations"),
+]
+ACCOUNTS = ("MASTER", "TEST")
+RESULTS_DIR = "test_results"
+
+
+def _module_found(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:  # parent package missing, e.g. s4 for s4.clarity
+        return False
+
+
+def check_dependencies(options=()):
+    """
+    Installed dependencies; a missing one that only an unused option needs
+    is a warning (None) rather than a failure.
+
+    Args:
+        options: Run options in use, e.g. {"pdf", "infer_expectations"}
+    """
+    checks = []
+    for module, package, needed_for, option in DEPENDENCIES:
+        found = _module_found(module)
+        detail = f"needed for {needed_for}" if found else f"pip install {package} (needed for {needed_for})"
+        ok = True if found else (None if option and option not in options else False)
+        checks.append((f"{module} installed", ok, detail))
+    return checks
+
+
+def check_test_modules():
+    """Every module referenced by role_test_configs.py exists under permissions/."""
+    from role_test_configs import MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES
+
+    names = set()
+    for suites in (MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES):
+        for suite in suites.values():
+            names.update(m if isinstance(m, str) else m[0] for m in suite if not callable(m))
+    missing = sorted(n for n in names if not os.path.exists(os.path.join(PERMISSIONS_DIR, f"{n}.py")))
+    detail = f"missing: {', '.join(missing)}" if missing else f"{len(names)} modules"
+    return [("test modules", not missing, detail)]
+
+
+def check_credentials(accounts=ACCOUNTS):
+    """Stored username and password per account, from any credentials backend."""
+    from credentials import SERVICE_NAME, get_provider
+
+    provider = get_provider()
+    checks = []
+    for account in accounts:
+        try:
+            username, _ = provider.get_credentials(account)
+            ok, detail = True, f"{username} (from {provider.source(SERVICE_NAME, username)})"
+        except ValueError:
+            ok, detail = False, "not stored, run store_creds.py or set ROLE_AUDIT_USERNAME_/PASSWORD_ variables"
+        checks.append((f"{account} credentials", ok, detail))
+    return checks
+
+
+def check_results_dir():
+    try:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        ok = os.access(RESULTS_DIR, os.W_OK)
+    except OSError:
+        ok = False
+    return [("results folder", ok, os.path.abspath(RESULTS_DIR))]
+
+
+def run_preflight(server="dev", accounts=ACCOUNTS, options=("pdf",)):
+    """
+    Run all checks and print them.
+
+    Args:
+        server: Server environment
+        accounts: Accounts whose credentials must be stored
+        options: Run options in use (see check_dependencies())
+
+    Returns:
+        bool: True if no check failed (warnings don't count)
+    """
+    print(f"Preflight for {server} ({base_url(server)})")
+    checks = (check_dependencies(options) + check_test_modules() + check_credentials(accounts)
+              + check_results_dir())
+    for name, ok, detail in checks:
+        print(f"  {'!' if ok is None else '✓' if ok else '✗'} {name}: {detail}")
+    failed = sum(1 for _, ok, _ in checks if ok is False)
+    warnings = sum(1 for _, ok, _ in checks if ok is None)
+    print(f"{len(checks) - failed - warnings}/{len(checks)} checks passed"
+          f"{f', {warnings} warning(s)' if warnings else ''}")
+    return failed == 0
+
+
+def run_options(no_pdf=False, infer_expectations=False):
+    """Options for check_dependencies() from run_all_roles.py's flags."""
+    return {name for name, used in (("pdf", not no_pdf), ("infer_expectations", infer_expectations)) if used}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that a role test run can start")
+    parser.add_argument("-s", "--server", default="dev", choices=SERVER_NAMES, help="Server environment (default: dev)")
+    parser.add_argument("--no-pdf", action="store_true", help="The run skips the PDF report (reportlab optional)")
+    parser.add_argument("--infer-expectations", action="store_true", help="The run infers expectations (needs numpy)")
+    args = parser.parse_args()
+    options = run_options(args.no_pdf, args.infer_expectations)
+    sys.exit(0 if run_preflight(args.server, options=options) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Shared Rate Limiter
+===================
+Limits the combined load that parallel audits put on each Clarity server.
+State lives in a local SQLite file, so every runner, worker and per-server
+process on this machine shares the same limits.
+
+Per server there are two limits:
+  - API calls: a token bucket refilled at a rate that adapts to the server's
+    health. Slow responses or errors halve the rate; healthy responses raise
+    it step by step back to the configured maximum.
+  - Browser sessions: at most max_sessions browsers logged in at once.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from circuit_breaker import is_outage_error
+
+DEFAULT_LIMITER_FILE = "test_results/rate_limits.db"
+
+# api_rate: maximum API calls per second, burst: bucket size,
+# sessions: concurrent browser sessions
+DEFAULT_LIMITS = {"api_rate": 10.0, "burst": 20, "sessions": 6}
+SERVER_LIMITS = {
+    "prod": {"api_rate": 4.0, "burst": 8, "sessions": 3},
+    "local": {"api_rate": 100.0, "burst": 200, "sessions": 50},
+}
+
+MIN_API_RATE = 0.5  # never throttle below this many calls per second
+SLOW_RESPONSE = 3.0  # seconds; slower responses count as a sign of stress
+ERROR_RATE_LIMIT = 0.2  # back off once this share of recent calls failed
+BACKOFF_FACTOR = 0.5
+RECOVERY_STEP = 0.5  # calls per second added per healthy response
+BACKOFF_COOLDOWN = 5.0  # seconds between back-offs, so one slow burst halves the rate once
+HEALTH_SMOOTHING = 0.2  # weight of the newest sample in the latency/error averages
+SESSION_LEASE = 4 * 3600  # seconds before a session lease from a vanished process is reclaimed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    server TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    rate REAL NOT NULL,
+    max_rate REAL NOT NULL,
+    burst REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    latency REAL NOT NULL DEFAULT 0,
+    error_rate REAL NOT NULL DEFAULT 0,
+    backoff_at REAL NOT NULL DEFAULT 0,
+    calls INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    waited REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    server TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def server_limits(server):
+    """Configured limits for a server."""
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(SERVER_LIMITS.get(server, {}))
+    return limits
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RateLimiter:
+    """Per-server API token bucket and browser session limit shared through SQLite."""
+
+    def __init__(self, server, path=DEFAULT_LIMITER_FILE):
+        """
+        Args:
+            server: Server name (dev, staging, prod, local)
+            path: SQLite file shared by all processes on this machine
+        """
+        self.server = server
+        self.path = path
+        self.limits = server_limits(server)
+        self._last_reported_rate = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO buckets (server, tokens, rate, max_rate, burst, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (server, self.limits["burst"], self.limits["api_rate"], self.limits["api_rate"],
+                 self.limits["burst"], time.time())
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # API calls
+
+    def acquire(self):
+        """
+        Block until the server's bucket has a token for one API call.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            now = time.time()
+            with self._transaction() as conn:
+                row = conn.execute("SELECT * FROM buckets WHERE server = ?", (self.server,)).fetchone()
+                tokens = min(row["burst"], row["tokens"] + (now - row["updated_at"]) * row["rate"])
+                if tokens >= 1:
+                    conn.execute(
+                        "UPDATE buckets SET tokens = ?, updated_at = ?, waited = waited + ? WHERE server = ?",
+                        (tokens - 1, now, waited, self.server)
+                    )
+                    return waited
+                conn.execute(
+                    "UPDATE buckets SET tokens = ?, updated_at = ? WHERE server = ?",
+                    (tokens, now, self.server)
+                )
+                delay = (1 - tokens) / row["rate"]
+            time.sleep(delay)
+            waited += delay
+
+    def record(self, latency, error=False):
+        """
+        Feed one API call's outcome into the adaptive rate.
+
+        Args:
+            latency: Seconds the call took
+            error: True for connection errors and 5xx responses
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT * FROM buckets WHERE server = ?", (self.server,)).fetchone()
+            avg_latency = row["latency"] + HEALTH_SMOOTHING * (latency - row["latency"])
+            error_rate = row["error_rate"] + HEALTH_SMOOTHING * ((1.0 if error else 0.0) - row["error_rate"])
+            rate = row["rate"]
+            backoff_at = row["backoff_at"]
+
+            stressed = error or avg_latency > SLOW_RESPONSE or error_rate > ERROR_RATE_LIMIT
+            if stressed and now - backoff_at >= BACKOFF_COOLDOWN:
+                rate = max(MIN_API_RATE, rate * BACKOFF_FACTOR)
+                backoff_at = now
+            elif not stressed:
+                rate = min(row["max_rate"], rate + RECOVERY_STEP)
+
+            conn.execute(
+                "UPDATE buckets SET rate = ?, latency = ?, error_rate = ?, backoff_at = ?, "
+                "calls = calls + 1, errors = errors + ? WHERE server = ?",
+                (rate, avg_latency, error_rate, backoff_at, int(error), self.server)
+            )
+        self._report_rate_change(rate, avg_latency, error_rate)
+
+    def _report_rate_change(self, rate, latency, error_rate):
+        """Log when the throttle moves noticeably."""
+        previous = self._last_reported_rate
+        if previous is None:
+            self._last_reported_rate = rate
+            return
+        if rate < previous * 0.75 or (rate > previous * 1.5 and rate - previous >= 1):
+            direction = "Backing off" if rate < previous else "Recovering"
+            print(f"  [throttle] {direction} on {self.server}: {previous:.1f} -> {rate:.1f} calls/s "
+                  f"(latency {latency:.2f}s, errors {error_rate:.0%})")
+            self._last_reported_rate = rate
+
+    # Browser sessions
+
+    def acquire_session(self, holder, poll=5.0):
+        """
+        Block until a browser session slot is free and take it.
+
+        Slots held by processes that no longer exist on this host, or whose
+        lease ran out, are reclaimed first.
+
+        Returns:
+            int: Lease id to pass to release_session()
+        """
+        host = socket.gethostname()
+        announced = False
+        while True:
+            now = time.time()
+            with self._transaction() as conn:
+                for lease in conn.execute(
+                    "SELECT id, host, pid, expires_at FROM sessions WHERE server = ?", (self.server,)
+                ).fetchall():
+                    if lease["expires_at"] < now or (lease["host"] == host and not _process_alive(lease["pid"])):
+                        conn.execute("DELETE FROM sessions WHERE id = ?", (lease["id"],))
+                active = conn.execute(
+                    "SELECT COUNT(*) FROM sessions WHERE server = ?", (self.server,)
+                ).fetchone()[0]
+                if active < self.limits["sessions"]:
+                    cursor = conn.execute(
+                        "INSERT INTO sessions (server, holder, host, pid, acquired_at, expires_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (self.server, holder, host, os.getpid(), now, now + SESSION_LEASE)
+                    )
+                    return cursor.lastrowid
+            if not announced:
+                print(f"  [throttle] Waiting for a browser session slot on {self.server} "
+                      f"({active}/{self.limits['sessions']} in use)")
+                announced = True
+            time.sleep(poll)
+
+    def release_session(self, lease_id):
+        """Give back a browser session slot."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (lease_id,))
+
+    # Reporting
+
+    def state(self):
+        """
+        Current throttle state for the server.
+
+        Returns:
+            dict: "rate" and "max_rate" (calls/s), "latency" (s, smoothed),
+                  "error_rate", "calls", "errors", "waited" (total s spent
+                  waiting for tokens), "sessions" and "max_sessions"
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM buckets WHERE server = ?", (self.server,)).fetchone()
+            sessions = conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE server = ?", (self.server,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            "server": self.server,
+            "rate": round(row["rate"], 2),
+            "max_rate": row["max_rate"],
+            "latency": round(row["latency"], 3),
+            "error_rate": round(row["error_rate"], 3),
+            "calls": row["calls"],
+            "errors": row["errors"],
+            "waited": round(row["waited"], 1),
+            "sessions": sessions,
+            "max_sessions": self.limits["sessions"],
+        }
+
+
+_limiters = {}
+
+
+def get_rate_limiter(server):
+    """Shared RateLimiter for a server (one per process)."""
+    if server not in _limiters:
+        _limiters[server] = RateLimiter(server)
+    return _limiters[server]
+
+
+def throttle_lims(lims, server):
+    """
+    Route every API call made through a LIMS connection via the server's limiter.
+
+    Wraps lims.request so each call waits for a token, and its latency and
+    outcome adjust the rate. Only outages count as errors (connection errors
+    and 5xx, see circuit_breaker.is_outage_error); a permission failure is a
+    healthy answer, so denied roles don't slow down every worker.
+    """
+    limiter = get_rate_limiter(server)
+    request = lims.request
+
+    def throttled_request(*args, **kwargs):
+        limiter.acquire()
+        start = time.time()
+        try:
+            response = request(*args, **kwargs)
+        except Exception as e:
+            limiter.record(time.time() - start, error=is_outage_error(e))
+            raise
+        status = getattr(response, "status_code", 200)
+        limiter.record(time.time() - start, error=status >= 500)
+        return response
+
+    lims.request = throttled_request
+    return lims
+
+
+def format_state(state):
+    """One-line throttle state for the run log."""
+    return (f"[throttle] {state['server']}: {state['rate']:.1f}/{state['max_rate']:g} calls/s, "
+            f"latency {state['latency']:.2f}s, errors {state['error_rate']:.0%}, "
+            f"sessions {state['sessions']}/{state['max_sessions']}, waited {state['waited']:.0f}s total")
+
+
+def print_throttle_state(server):
+    """Print the server's current throttle state."""
+    print(format_state(get_rate_limiter(server).state()))
+
+
+def main():
+    """Show the throttle state for each server in a limiter file."""
+    parser = argparse.ArgumentParser(description="Show shared rate limiter state")
+    parser.add_argument("servers", nargs="*", help="Servers to show (default: all in the file)")
+    parser.add_argument("--file", default=DEFAULT_LIMITER_FILE,
+                        help=f"Limiter file (default: {DEFAULT_LIMITER_FILE})")
+    parser.add_argument("--json", action="store_true", help="Print state as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"Error: Limiter file '{args.file}' not found.")
+        sys.exit(1)
+
+    servers = args.servers
+    if not servers:
+        conn = sqlite3.connect(args.file)
+        try:
+            servers = [row[0] for row in conn.execute("SELECT server FROM buckets ORDER BY server")]
+        finally:
+            conn.close()
+
+    states = [RateLimiter(server, path=args.file).state() for server in servers]
+    if args.json:
+        print(json.dumps(states, indent=2))
+    else:
+        for state in states:
+            print(format_state(state))
+
+
+if __name__ == "__main__":
+    main()
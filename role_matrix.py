@@ -0,0 +1,274 @@
+"""
+Role Matrix
+===========
+Expands MAIN_ROLE_TEST_SUITES and ADD_ON_ROLE_TEST_SUITES into the list of
+role combinations that run_all_roles.py tests, estimates how long each one
+takes from stored results, and splits the list into shards that take about
+the same time to run.
+"""
+
+import ast
+import glob
+import json
+import os
+from functools import lru_cache
+
+NOT_LOGGED_IN = "Not Logged In"
+FIRST_MAIN_ROLE = "Lab Operator (BTO)"
+PERMISSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "permissions")
+DEFAULT_RESULTS_GLOB = "test_results/all_role_tests*.json"
+RUNS_DIR = "test_results/runs"  # partial results of sharded and queue runs, one folder per run
+DURATION_PERCENTILE = 90  # plan for slow runs, not typical ones
+DEFAULT_TEST_DURATION = 60.0  # seconds, for tests with no history and no declared estimate
+ROLE_SWITCH_DURATION = 10.0  # seconds to change roles and log in again
+
+
+def build_combinations(main_suites, addon_suites):
+    """
+    Expand the role test suites into an ordered list of combinations.
+
+    "Not Logged In" comes first and is never combined with add-ons. Every
+    other MAIN role is tested alone (BASE) and then with each ADD_ON role.
+
+    Args:
+        main_suites: Dict like MAIN_ROLE_TEST_SUITES
+        addon_suites: Dict like ADD_ON_ROLE_TEST_SUITES
+
+    Returns:
+        list: Dicts with "name" (results key), "roles" (Clarity roles to
+              assign, None for Not Logged In) and "suite" (module -> expected)
+    """
+    combinations = []
+    main_role_names = list(main_suites.keys())
+
+    if NOT_LOGGED_IN in main_role_names:
+        main_role_names.remove(NOT_LOGGED_IN)
+        combinations.append({
+            "name": NOT_LOGGED_IN,
+            "roles": None,
+            "suite": dict(main_suites[NOT_LOGGED_IN]),
+        })
+
+    # Lab Operator (BTO) first, since the user is initialized to it
+    if FIRST_MAIN_ROLE in main_role_names:
+        main_role_names.remove(FIRST_MAIN_ROLE)
+        main_role_names.insert(0, FIRST_MAIN_ROLE)
+
+    for main_role in main_role_names:
+        main_test_suite = main_suites[main_role]
+        combinations.append({
+            "name": f"{main_role} (BASE)",
+            "roles": [main_role],
+            "suite": dict(main_test_suite),
+        })
+        for addon_role, addon_test_suite in addon_suites.items():
+            combined_test_suite = {}
+            combined_test_suite.update(main_test_suite)  # Add MAIN role tests
+            combined_test_suite.update(addon_test_suite)  # Add ADD_ON role tests
+            combinations.append({
+                "name": f"{main_role} + {addon_role}",
+                "roles": [main_role, addon_role],
+                "suite": combined_test_suite,
+            })
+
+    return combinations
+
+
+def format_test_name(raw_test_name):
+    """
+    Turn a test function name into the name used in results.
+
+    Example: "test_can_edit_completed_steps" -> "Edit Completed Steps"
+    """
+    # Convert from snake_case to Title Case
+    formatted_name = raw_test_name.replace("test_", "").replace("_", " ").title()
+    # Special replacements for common terms
+    formatted_name = formatted_name.replace("Clarity Login", "Clarity Login")
+    formatted_name = formatted_name.replace("Can ", "")
+    return formatted_name
+
+
+@lru_cache(maxsize=None)
+def inspect_test_module(module_name):
+    """
+    Read a permissions module's test name and declared duration estimate.
+
+    The source is parsed rather than imported, so modules with import-time
+    side effects or missing dependencies can still be scheduled.
+
+    Returns:
+        tuple: (result test name or None, ESTIMATED_DURATION or None)
+    """
+    path = os.path.join(PERMISSIONS_DIR, f"{module_name}.py")
+    try:
+        with open(path, "r") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError):
+        return None, None
+
+    test_functions = []
+    estimate = None
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name.startswith("test_"):
+            test_functions.append(node.name)
+        elif isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == "ESTIMATED_DURATION" for t in node.targets
+        ):
+            try:
+                estimate = float(ast.literal_eval(node.value))
+            except ValueError:
+                pass
+
+    # RolePermissionTester runs the first test_* function in dir() order
+    test_name = format_test_name(sorted(test_functions)[0]) if test_functions else None
+    return test_name, estimate
+
+
+def load_test_history(results_files=None):
+    """
+    Load historical execution times per test from saved results.
+
+    Args:
+        results_files: List of results JSON paths (default: all files matching
+                       test_results/all_role_tests*.json)
+
+    Returns:
+        dict: Test name (as stored in results) -> list of execution times in seconds
+    """
+    if results_files is None:
+        results_files = sorted(glob.glob(DEFAULT_RESULTS_GLOB))
+
+    history = {}
+    for path in results_files:
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read history from {path}: {e}")
+            continue
+        for tests in data.get("tests", {}).values():
+            for test in tests:
+                if test.get("execution_time") is not None:
+                    history.setdefault(test.get("test_name"), []).append(test["execution_time"])
+    return history
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of a non-empty list of numbers."""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def estimate_test_duration(module_name, test_history, pct=DURATION_PERCENTILE):
+    """
+    Estimate one test's run time in seconds.
+
+    Uses the pct-th percentile of its recorded execution times, then the
+    module's ESTIMATED_DURATION, then DEFAULT_TEST_DURATION.
+    """
+    test_name, declared = inspect_test_module(module_name)
+    if test_name in test_history:
+        return percentile(test_history[test_name], pct)
+    if declared is not None:
+        return declared
+    return DEFAULT_TEST_DURATION
+
+
+def estimate_durations(combinations, test_history, pct=DURATION_PERCENTILE):
+    """
+    Estimate how long each combination takes to run.
+
+    Returns:
+        dict: Combination name -> estimated seconds (sum of its tests plus the
+              role switch and login)
+    """
+    durations = {}
+    for combination in combinations:
+        durations[combination["name"]] = ROLE_SWITCH_DURATION + sum(
+            estimate_test_duration(module_name, test_history, pct)
+            for module_name in combination["suite"]
+            if isinstance(module_name, str)
+        )
+    return durations
+
+
+def order_longest_first(combinations, durations):
+    """Combinations sorted longest estimated run time first (ties keep original order)."""
+    order = {c["name"]: i for i, c in enumerate(combinations)}
+    return sorted(combinations, key=lambda c: (-durations[c["name"]], order[c["name"]]))
+
+
+def parse_shard(spec):
+    """
+    Parse a shard spec of the form "i/N" (1-based).
+
+    Returns:
+        tuple: (shard_index, shard_count)
+
+    Raises:
+        ValueError: If the spec is malformed or out of range
+    """
+    try:
+        index_str, count_str = spec.split("/")
+        shard_index, shard_count = int(index_str), int(count_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected the form i/N (e.g. 1/3)")
+    if shard_count < 1 or not 1 <= shard_index <= shard_count:
+        raise ValueError(f"Invalid shard '{spec}', i must be between 1 and N")
+    return shard_index, shard_count
+
+
+def assign_shards(combinations, shard_count, durations):
+    """
+    Partition combinations into shard_count shards with balanced run time.
+
+    Longest combinations are placed first, each onto the shard with the least
+    total time so far (ties go to the lowest shard). The result only depends
+    on the inputs, so every host computes the same partition.
+
+    Returns:
+        list: One list of combinations per shard, each in the original order
+    """
+    order = {c["name"]: i for i, c in enumerate(combinations)}
+    by_duration = order_longest_first(combinations, durations)
+
+    shards = [[] for _ in range(shard_count)]
+    loads = [0.0] * shard_count
+    for combination in by_duration:
+        target = min(range(shard_count), key=lambda i: (loads[i], i))
+        shards[target].append(combination)
+        loads[target] += durations[combination["name"]]
+
+    return [sorted(shard, key=lambda c: order[c["name"]]) for shard in shards]
+
+
+def select_shard(combinations, shard_index, shard_count, durations):
+    """Return the combinations for shard shard_index (1-based) of shard_count."""
+    return assign_shards(combinations, shard_count, durations)[shard_index - 1]
+
+
+def _safe_name(name):
+    return "".join(ch if ch.isalnum() or ch == "-" else "_" for ch in name)
+
+
+def run_dir(run_id):
+    """Folder holding one run's partial results, e.g. test_results/runs/nightly-42."""
+    return f"{RUNS_DIR}/{_safe_name(run_id)}"
+
+
+def shard_results_file(shard_index, shard_count, run_id):
+    """Results file used by one shard, e.g. test_results/runs/nightly-42/all_role_tests_shard1of3.json."""
+    return f"{run_dir(run_id)}/all_role_tests_shard{shard_index}of{shard_count}.json"
+
+
+def worker_results_file(worker_id, run_id):
+    """Results file used by one queue worker, e.g. test_results/runs/<run>/all_role_tests_worker_host-1_4242.json."""
+    return f"{run_dir(run_id)}/all_role_tests_worker_{_safe_name(worker_id)}.json"
+
+
+def server_results_file(server):
+    """Results file used by one server in a multi-server run, e.g. test_results/servers/all_role_tests_dev.json."""
+    return f"test_results/servers/all_role_tests_{server}.json"
@@ -2,46 +2,223 @@
 Generic Role Permission Tester
 ===============================
 A modular system for testing various permissions for different roles.
+
+Playwright and keyring are imported when a browser is started or the test
+account logs in, so importing the tester (e.g. for --help) stays fast.
 """
 
-from playwright.sync_api import sync_playwright
-import keyring
 import json
 import time
 from datetime import datetime
 import importlib
+import re
 import sys
 import os
-import os
+from role_matrix import format_test_name
+from clarity_servers import base_url
+from rate_limiter import get_rate_limiter
+from circuit_breaker import CLOSED, get_circuit_breaker, is_outage_error
+from credentials import get_credentials
+from permissions import readiness
 
 # Configuration
-SERVICE_NAME = "user_tester_app"
+TEST_ACCOUNT = "TEST"
+LOGIN_TEST = "permissions_clarity_login"  # logs in through the form itself, from a logged-out session
 
 class RolePermissionTester:
     """Generic tester for role permissions."""
     
-    def __init__(self, server="dev", role_name="Unknown Role"):
+    def __init__(self, server="dev", role_name="Unknown Role", results_file=None):
         """
         Initialize the tester.
         
         Args:
-            server: Server environment (dev, test, prod)
+            server: Server environment (dev, staging, prod)
             role_name: Name of the role being tested
+            results_file: JSON file results are saved to (default: test_results/all_role_tests.json)
         """
         self.server = server
         self.role_name = role_name
-        self.base_url = f"https://clarity-{server}.btolims.com"
-        self.results_file = "test_results/all_role_tests.json"
+        self.base_url = base_url(server)
+        self.breaker = get_circuit_breaker(server)
+        self.results_file = results_file or "test_results/all_role_tests.json"
+        # {"id", "shard"/"worker"} saved with partial results, checked by merge_results.py
+        self.run_info = None
         self.current_test_results = []
         self.screenshot_dir = "test_results/screenshots"
         # Ensure screenshot directory exists
         os.makedirs(self.screenshot_dir, exist_ok=True)
+        # Long-lived browser, only set between start_browser() and close_browser()
+        self._playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self._session_lease = None
+        # Optional FixtureFactory handing out API-created fixtures to tests
+        self.fixture_factory = None
+        # Optional WorkflowState restoring sample placements before step-based tests
+        self.workflow_state = None
+        # Optional Teardown restoring the combination's roles after each test
+        self.teardown = None
+        # Optional HarSession recording each test's traffic, or replaying it offline
+        self.har = None
+        self._role_state = None  # (lims, first name, last name, roles) from switch_role()
+    
+    def start_browser(self):
+        """
+        Launch a browser that stays open across suites until close_browser().
+        
+        While the browser is running, run_test_suite() reuses its page instead
+        of starting a new browser, and switch_role() can change roles in place.
+        Waits for a free browser session slot on the server first.
+        """
+        if self.page is not None:
+            return self.page
+        from playwright.sync_api import sync_playwright
+        
+        self._session_lease = get_rate_limiter(self.server).acquire_session(f"tester:{self.role_name}")
+        self._playwright = sync_playwright().start()
+        self.browser, self.context = self._launch_browser(self._playwright)
+        self.page = self.context.new_page()
+        return self.page
+    
+    def _launch_browser(self, playwright):
+        """Launch Chromium and open a context on the server; replays run headless at full speed."""
+        replaying = self.har is not None and self.har.replaying
+        browser = playwright.chromium.launch(headless=replaying, slow_mo=0 if replaying else 200)
+        context = browser.new_context(base_url=self.base_url)
+        self._watch_server_health(context)
+        if self.har is not None:
+            self.har.isolate(context)
+        return browser, context
+    
+    def close_browser(self):
+        """Close the long-lived browser started with start_browser()."""
+        print("\nClosing browser...")
+        try:
+            if self.browser is not None:
+                self.browser.close()
+        finally:
+            if self._playwright is not None:
+                self._playwright.stop()
+            if self._session_lease is not None:
+                get_rate_limiter(self.server).release_session(self._session_lease)
+            self._session_lease = None
+            self._playwright = None
+            self.browser = None
+            self.context = None
+            self.page = None
+    
+    def _watch_server_health(self, context):
+        """Count 5xx page loads in the browser context towards the circuit breaker."""
+        def on_response(response):
+            if response.status >= 500 and response.request.resource_type == "document":
+                self.breaker.record_failure(f"HTTP {response.status} {response.url}")
+        context.on("response", on_response)
+    
+    def switch_role(self, role_name, role_set, lims, user_firstname, user_lastname, login=True):
+        """
+        Switch the running tester to a new role combination.
+        
+        Applies role_set to the user through the API, drops the browser
+        context's cookies and storage, and logs in again without restarting
+        the browser.
+        
+        Args:
+            role_name: Name to record results under (e.g. "Editor + ReWork")
+            role_set: List of Clarity role names the user should have
+            lims: LIMS connection used to change the roles
+            user_firstname: First name of the user under test
+            user_lastname: Last name of the user under test
+            login: False leaves the session logged out, for suites that start
+                   with the login test. HAR recordings always log in, since
+                   each test's context starts from the tester's cookies
+        
+        Returns:
+            bool: True if the session is ready (re-authenticated, or logged
+                  out as asked)
+        """
+        from change_role import set_user_roles
+        
+        print(f"\nSwitching role to: {role_name}")
+        set_user_roles(lims, user_firstname, user_lastname, role_set)
+        
+        self.role_name = role_name
+        self._role_state = (lims, user_firstname, user_lastname, list(role_set))
+        self.current_test_results = []
+        
+        if self.page is None:
+            return False
+        if self.har is not None and self.har.replaying:
+            # Replayed pages carry the recorded session; there is no server to log in to
+            return True
+        self.reset_session()
+        if not login and self.har is None:
+            return True
+        return self._login()
+    
+    def reset_session(self):
+        """Drop cookies and web storage for the current browser context."""
+        self.context.clear_cookies()
+        try:
+            self.page.evaluate("() => { window.localStorage.clear(); window.sessionStorage.clear(); }")
+        except Exception as e:
+            # about:blank and error pages have no storage to clear
+            print(f"  Could not clear web storage: {e}")
+    
+    def _login(self):
+        """Log in the test account, skipping the login form when possible."""
+        username, password = get_credentials(TEST_ACCOUNT)
+        
+        start_time = time.time()
+        if self._fast_login(username, password):
+            print(f"  Re-authenticated via login request ({time.time() - start_time:.1f}s)")
+            return True
+        
+        print("  Login request not accepted, falling back to login form...")
+        self.page.goto(f"{self.base_url}/clarity/login/auth?unauthenticated=1")
+        self.page.fill("#username", username)
+        self.page.fill("#password", password)
+        self.page.click("#sign-in")
+        self.page.wait_for_load_state("domcontentloaded")
+        try:
+            self.page.wait_for_selector("span.navbar-username", timeout=10000)
+        except Exception:
+            print("  Login form did not reach the dashboard")
+            return False
+        print(f"  Re-authenticated via login form ({time.time() - start_time:.1f}s)")
+        return True
+    
+    def _fast_login(self, username, password):
+        """
+        Submit the Clarity login form with the context's request client.
+        
+        The request shares the browser context's cookie jar, so a successful
+        response leaves the page authenticated without rendering the form.
+        """
+        login_url = f"{self.base_url}/clarity/login/auth?unauthenticated=1"
+        try:
+            login_page = self.context.request.get(login_url)
+            form = _parse_login_form(login_page.text())
+            if form is None:
+                return False
+            action, user_field, password_field = form
+            if not action.startswith("http"):
+                action = f"{self.base_url}{action}" if action.startswith("/") else f"{self.base_url}/clarity/{action}"
+            response = self.context.request.post(action, form={user_field: username, password_field: password})
+            return response.ok and "login" not in response.url
+        except Exception as e:
+            print(f"  Login request failed: {e}")
+            return False
     
     
     def run_test(self, page, test_function, test_name=None, expected=True):
         """
         Run a specific test function.
         
+        With a HarSession set, the test runs on its own page that records its
+        traffic to a HAR, or replays it from one.
+        
         Args:
             page: Playwright page object
             test_function: Function that takes a page and returns test results
@@ -51,13 +228,28 @@ class RolePermissionTester:
         Returns:
             dict: Test results
         """
+        if self.har is None:
+            return self._run_test(page, test_function, test_name, expected)
+        
+        try:
+            har_page = self.har.open_page(page.context, self.role_name, test_name or test_function.__name__,
+                                          logged_in=not is_login_test(test_function))
+        except FileNotFoundError as e:
+            print(f"\nSkipping {format_test_name(test_name or test_function.__name__)}: {e}")
+            return None
+        try:
+            if not self.har.replaying:
+                self._watch_server_health(har_page.context)
+            self._return_to_main_page(har_page)
+            return self._run_test(har_page, test_function, test_name, expected)
+        finally:
+            self.har.close_page(har_page)
+    
+    def _run_test(self, page, test_function, test_name=None, expected=True):
+        """Run one test function on page and record its result."""
         # Format test name from function name
         raw_test_name = test_name or test_function.__name__
-        # Convert from snake_case to Title Case
-        formatted_name = raw_test_name.replace("test_", "").replace("_", " ").title()
-        # Special replacements for common terms
-        formatted_name = formatted_name.replace("Clarity Login", "Clarity Login")
-        formatted_name = formatted_name.replace("Can ", "")
+        formatted_name = format_test_name(raw_test_name)
         
         print(f"\nRunning test: {formatted_name}")
         print("-" * 40)
@@ -68,16 +260,22 @@ class RolePermissionTester:
             # Take only the first line of the docstring
             description = description.split('\n')[0].strip()
         
+        fixtures = None
+        kinds = module_declaration(test_function, "FIXTURES")
+        if kinds and self.fixture_factory is not None:
+            fixtures = self.fixture_factory.fixtures_for(kinds)
+        if self.workflow_state is not None:
+            for project in module_declaration(test_function, "WORKFLOW_STATE"):
+                try:
+                    self.workflow_state.restore(project)
+                except Exception as e:
+                    print(f"  Warning: Could not restore workflow state of '{project}': {e}")
+        
+        readiness.begin_test(f"{self.role_name}: {formatted_name}")
         start_time = time.time()
         try:
-            # Try to pass expected parameter to test function
-            # Tests can use this to skip retries when expected=False
-            import inspect
-            sig = inspect.signature(test_function)
-            if 'expected' in sig.parameters:
-                result = test_function(page, expected=expected)
-            else:
-                result = test_function(page)
+            result = call_test_function(test_function, page, expected=expected, server=self.server,
+                                        fixtures=fixtures)
             execution_time = round(time.time() - start_time, 1)
             passed = result.get("passed", False)
             
@@ -108,6 +306,20 @@ class RolePermissionTester:
                 "screenshot": None
             }
             print(f"ERROR in test: {e}")
+        settled = readiness.end_test()
+        if settled:
+            print(f"Readiness: {settled['settles']} settle(s) took {settled['waited']}s, "
+                  f"{settled['saved']}s less than fixed sleeps")
+        
+        if is_outage_error(test_result["error"]):
+            self.breaker.record_failure(test_result["error"])
+        
+        # Drop role grants a test left behind (e.g. System Admin (BTO) for setup)
+        if self.teardown is not None and self._role_state is not None:
+            try:
+                self.teardown.restore_roles(*self._role_state)
+            except Exception as e:
+                print(f"  Warning: Could not restore roles after test: {e}")
         
         # Always capture a screenshot if not already present
         if test_result.get("screenshot") is None:
@@ -132,50 +344,75 @@ class RolePermissionTester:
         print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("=" * 60)
         
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch(headless=False, slow_mo=200)
-            context = browser.new_context()
-            page = context.new_page()
-            
-            try:
-                for i, (test_spec, expected) in enumerate(test_modules_with_expected.items()):
-                    # Navigate back to main page before each test (except the first)
-                    if i > 0:
-                        print("\nNavigating back to main page...")
-                        page.goto(f"{self.base_url}/clarity")
-                        page.wait_for_load_state("networkidle")
-                        page.wait_for_timeout(2000)
-                    
-                    # Determine the test function
-                    if isinstance(test_spec, str):
-                        module = importlib.import_module(f"permissions.{test_spec}")
-                        test_funcs = [
-                            getattr(module, name) for name in dir(module)
-                            if name.startswith("test_") and callable(getattr(module, name))
-                        ]
-                        if test_funcs:
-                            result = self.run_test(page, test_funcs[0], expected=expected)
-                    elif isinstance(test_spec, tuple):
-                        module_name, func_name = test_spec
-                        module = importlib.import_module(f"permissions.{module_name}")
-                        test_func = getattr(module, func_name)
-                        result = self.run_test(page, test_func, expected=expected)
-                    else:
-                        # Direct function reference
-                        result = self.run_test(page, test_spec, expected=expected)
+        if self.page is not None:
+            # Long-lived browser: switch_role() has already set up the session
+            self._run_tests(self.page, test_modules_with_expected)
+            return
+        
+        from playwright.sync_api import sync_playwright
+        
+        limiter = get_rate_limiter(self.server)
+        lease = limiter.acquire_session(f"tester:{self.role_name}")
+        try:
+            with sync_playwright() as playwright:
+                browser, context = self._launch_browser(playwright)
+                page = context.new_page()
                 
-                # Print summary and save
-                self.print_summary()
-                self.save_results()
+                try:
+                    self._run_tests(page, test_modules_with_expected)
+                finally:
+                    print("\nClosing browser...")
+                    browser.close()
+        finally:
+            limiter.release_session(lease)
+    
+    def _run_tests(self, page, test_modules_with_expected):
+        """Run each test in the suite on page, then print and save the results."""
+        try:
+            for i, (test_spec, expected) in enumerate(test_modules_with_expected.items()):
+                # Navigate back to the main page before each test, so none starts
+                # where the previous test (or combination) left off. The login
+                # test navigates itself; HAR runs give each test a fresh page
+                if self.har is None and (i > 0 or (page is self.page and not is_login_test(test_spec))):
+                    self._return_to_main_page(page)
+                
+                # Determine the test function
+                test_func = load_test_function(test_spec)
+                if test_func is not None:
+                    self.breaker.wait_until_closed()
+                    result = self.run_test(page, test_func, expected=expected)
+                    if result is not None and self.breaker.state != CLOSED:
+                        # The server went down during this test; its result is
+                        # not meaningful, so run it again once it is back
+                        self.current_test_results.remove(result)
+                        self.breaker.wait_until_closed()
+                        if self.har is None:
+                            self._return_to_main_page(page)
+                        result = self.run_test(page, test_func, expected=expected)
             
+            # Print summary and save
+            self.print_summary()
+            self.save_results()
+        
+        except Exception as e:
+            print(f"\nCRITICAL ERROR: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    def _return_to_main_page(self, page):
+        """Navigate back to the Clarity main page, waiting out a server outage."""
+        print("\nNavigating back to main page...")
+        for attempt in range(2):
+            try:
+                page.goto(f"{self.base_url}/clarity")
+                break
             except Exception as e:
-                print(f"\nCRITICAL ERROR: {e}")
-                import traceback
-                traceback.print_exc()
-            
-            finally:
-                print("\nClosing browser...")
-                browser.close()
+                if attempt or not is_outage_error(e):
+                    raise
+                self.breaker.record_failure(e)
+                self.breaker.wait_until_closed()
+        page.wait_for_load_state("networkidle")
+        readiness.settle(page, 2000)
     
     def print_summary(self):
         """Print test summary."""
@@ -227,6 +464,8 @@ class RolePermissionTester:
         # Update server and timestamp
         data["server"] = self.server
         data["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if self.run_info:
+            data["run"] = self.run_info
         
         # Add or update tests for this role
         if "tests" not in data:
@@ -264,6 +503,97 @@ class RolePermissionTester:
         }
 
 
+def is_login_test(test):
+    """True if a test spec (module name, (module, function) tuple or function) is the login test."""
+    if isinstance(test, tuple):
+        module_name = test[0]
+    elif isinstance(test, str):
+        module_name = test
+    else:
+        module_name = getattr(test, "__module__", "")
+    return module_name.rsplit(".", 1)[-1] == LOGIN_TEST
+
+
+def load_test_function(test_spec):
+    """
+    Resolve a test spec from a role test suite to its test function.
+    
+    Args:
+        test_spec: Module name under permissions/ (its first test_* function is
+                   used), a (module, function) tuple, or a function
+    
+    Returns:
+        callable: The test function, or None if the module has no tests
+    """
+    if isinstance(test_spec, str):
+        module = importlib.import_module(f"permissions.{test_spec}")
+        test_funcs = [
+            getattr(module, name) for name in dir(module)
+            if name.startswith("test_") and callable(getattr(module, name))
+        ]
+        return test_funcs[0] if test_funcs else None
+    if isinstance(test_spec, tuple):
+        module_name, func_name = test_spec
+        module = importlib.import_module(f"permissions.{module_name}")
+        return getattr(module, func_name)
+    # Direct function reference
+    return test_spec
+
+
+def call_test_function(test_function, page, expected=True, server="dev", fixtures=None):
+    """
+    Call a test function with the keyword arguments it accepts.
+    
+    Tests can use `expected` to skip retries when expected=False. Tests that
+    call the API need `server`; page navigation already resolves relative
+    URLs against the context's base_url. Tests that declare FIXTURES get
+    `fixtures` (kind -> fixture dict, see fixture_factory.py).
+    """
+    import inspect
+    sig = inspect.signature(test_function)
+    kwargs = {}
+    if 'expected' in sig.parameters:
+        kwargs['expected'] = expected
+    if 'server' in sig.parameters:
+        kwargs['server'] = server
+    if 'fixtures' in sig.parameters:
+        kwargs['fixtures'] = fixtures
+    return test_function(page, **kwargs)
+
+
+def module_declaration(test_function, name):
+    """
+    A tuple the test function's module declares, e.g. FIXTURES or WORKFLOW_STATE.
+    
+    Returns:
+        tuple: The declared values, empty if the module doesn't declare it
+    """
+    module = sys.modules.get(getattr(test_function, "__module__", None))
+    return tuple(getattr(module, name, ()))
+
+
+def _parse_login_form(html):
+    """
+    Find the login form in the Clarity login page.
+    
+    Returns:
+        tuple: (form action, username field name, password field name), or None
+    """
+    form_match = re.search(r"<form[^>]*action=[\"']([^\"']+)[\"'][^>]*>(.*?)</form>", html, re.S | re.I)
+    if not form_match:
+        return None
+    action, body = form_match.groups()
+    fields = {}
+    for tag in re.findall(r"<input[^>]*>", body, re.I):
+        id_match = re.search(r"id=[\"']([^\"']+)[\"']", tag)
+        name_match = re.search(r"name=[\"']([^\"']+)[\"']", tag)
+        if id_match and name_match:
+            fields[id_match.group(1)] = name_match.group(1)
+    if "username" not in fields or "password" not in fields:
+        return None
+    return action.replace("&amp;", "&"), fields["username"], fields["password"]
+
+
 # Example usage functions
 def test_editor_role():
     """Test Editor role permissions."""
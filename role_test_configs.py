@@ -175,7 +175,7 @@ ADD_ON_ROLE_TEST_SUITES = {
 
     "ReWork": {
         "permissions_clarity_login": True,
-        "permissiosn_api_login": True,
+        "permissions_API_login": True,
         "permissions_sample_rework": True,
         "permissions_move_to_next_step": True,
         "permissions_create_user": True,
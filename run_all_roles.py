@@ -17,15 +17,162 @@ For each MAIN role (e.g., Lab Operator (BTO)):
 Ensures at least one role is always assigned to the user.
 """
 
+import os
 import sys
+import time
 import argparse
-from role_permission_tester import RolePermissionTester
+import multiprocessing
+from role_permission_tester import RolePermissionTester, is_login_test
 from role_test_configs import MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES
-from change_role import get_lims_connection, modify_user_role
-from generate_pdf_report import PDFReportGenerator
+from role_matrix import (
+    NOT_LOGGED_IN, build_combinations, load_test_history, estimate_durations,
+    parse_shard, select_shard, shard_results_file, worker_results_file, server_results_file
+)
+from clarity_servers import SERVER_NAMES, LIVE_SERVER_NAMES, base_url
+from server_parity import build_parity_view, load_server_results, print_parity_view, save_parity_view
+from rate_limiter import print_throttle_state
+from permissions import readiness
+from circuit_breaker import get_circuit_breaker, is_outage_error
+from teardown import get_teardown
+from expectation_resolver import ExpectationResolver, apply_inferred_expectations
+from work_queue import WorkQueue, DEFAULT_QUEUE_FILE, default_worker_id, print_stats
+from change_role import get_lims_connection, get_lookup_cache, modify_user_role, set_user_roles, connection_stats
 
 
-def run_all_role_tests(user_firstname, user_lastname, server="dev", account="MASTER", generate_pdf=True):
+def run_combination(tester, combination, lims, user_firstname, user_lastname, probes=None):
+    """
+    Switch the tester to one role combination and run its test suite.
+    
+    Args:
+        tester: RolePermissionTester with a started browser
+        combination: Dict from role_matrix.build_combinations()
+        lims: LIMS connection used to change the user's roles
+        user_firstname: First name of the user
+        user_lastname: Last name of the user
+        probes: Optional ApiProbeEngine; tests it has probes for are decided
+                through the API instead of the browser
+    
+    Returns:
+        bool: False if the roles could not be assigned or the test account
+              could not log in, and the suite was skipped
+    """
+    suite = combination["suite"]
+    api_suite = {}
+    if probes is not None and combination["roles"]:
+        api_suite, suite = probes.split_suite(suite)
+    
+    if combination["roles"] is None:
+        # Not Logged In: no role assignment, just drop any existing session
+        tester.role_name = combination["name"]
+        tester.current_test_results = []
+        if tester.page is not None:
+            tester.reset_session()
+    else:
+        breaker = get_circuit_breaker(tester.server)
+        for attempt in range(2):
+            breaker.wait_until_closed()
+            try:
+                # A suite that starts with the login test logs in through the form itself
+                login = not (suite and is_login_test(next(iter(suite))))
+                ready = tester.switch_role(combination["name"], combination["roles"], lims, user_firstname,
+                                           user_lastname, login=login)
+                break
+            except Exception as e:
+                print(f"Error assigning roles {', '.join(combination['roles'])}: {e}")
+                if attempt == 0 and is_outage_error(e):
+                    continue  # retry once the breaker lets calls through again
+                print("Skipping this combination...")
+                return False
+        if not ready:
+            # Unauthenticated, every test would be recorded as a permission failure
+            print(f"Could not log in as {combination['name']}. Skipping this combination...")
+            return False
+    
+    print_throttle_state(tester.server)
+    if api_suite and not probes.can_use_api():
+        # Without API login every probe would read as denied; decide them in the browser
+        print(f"TEST account can't use the API as {combination['name']}; running probed tests in the browser")
+        api_suite, suite = {}, combination["suite"]
+    if api_suite:
+        print(f"\nRunning {len(api_suite)} test(s) as API probes...")
+        tester.current_test_results.extend(probes.run_suite(api_suite))
+    tester.run_test_suite(suite)
+    return True
+
+
+def run_queue_worker(tester, queue, lims, user_firstname, user_lastname, resolver=None, probes=None):
+    """
+    Claim and run combinations from a work queue until it is empty.
+    
+    If resolver is given, each claimed combination's expectations are
+    inferred from the server's role definitions. probes is passed on to
+    run_combination().
+    
+    Returns:
+        tuple: (combinations completed, combinations claimed, last MAIN role assigned)
+    """
+    worker_id = default_worker_id()
+    completed = claimed = 0
+    last_main_role = None
+    print(f"\nWorker {worker_id} claiming from {queue.path}")
+    
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            break
+        claimed += 1
+        combination = job["payload"]
+        if resolver is not None:
+            combination = apply_inferred_expectations([combination], resolver)[0]
+        print("\n" + "=" * 80)
+        print(f"CLAIMED: {combination['name']} (attempt {job['attempts']})")
+        print("=" * 80)
+        
+        try:
+            with queue.keep_alive(job["id"], worker_id):
+                ok = run_combination(tester, combination, lims, user_firstname, user_lastname, probes)
+        except Exception as e:
+            print(f"Error running {combination['name']}: {e}")
+            if not queue.fail(job["id"], worker_id, e):
+                print(f"Warning: Lost claim on {combination['name']}; another worker owns it now")
+            continue
+        
+        if ok:
+            if queue.complete(job["id"], worker_id):
+                completed += 1
+                print(f"\n✓ Completed: {combination['name']}")
+            else:
+                print(f"Warning: Lost claim on {combination['name']}; another worker owns it now")
+            last_main_role = combination["roles"][0] if combination["roles"] else last_main_role
+        elif not queue.fail(job["id"], worker_id, "Could not assign roles or log in"):
+            print(f"Warning: Lost claim on {combination['name']}; another worker owns it now")
+    
+    print(f"\nQueue empty. Worker {worker_id} completed {completed}/{claimed} claimed combination(s)")
+    print_stats(queue.stats())
+    return completed, claimed, last_main_role
+
+
+def enqueue_combinations(queue_file):
+    """
+    Add every role combination to a work queue for run_all_roles.py --worker.
+    
+    Combinations are prioritized longest first (by historical test run
+    times), so slow combinations start early and workers finish together.
+    """
+    combinations = build_combinations(MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES)
+    durations = estimate_durations(combinations, load_test_history())
+    queue = WorkQueue(queue_file)
+    added = sum(
+        queue.enqueue(c["name"], c, priority=durations[c["name"]]) for c in combinations
+    )
+    print(f"Enqueued {added} new combination(s) in {queue_file} "
+          f"({len(combinations) - added} already queued)")
+    print_stats(queue.stats())
+
+
+def run_all_role_tests(user_firstname, user_lastname, server="dev", account="MASTER", generate_pdf=True,
+                       shard=None, queue_file=None, results_file=None, infer_expectations=False,
+                       api_probes=False, fixtures=False, restore_workflows=False, har=None, run_id=None):
     """
     Run tests for all roles in MAIN_ROLE_TEST_SUITES.
     
@@ -35,6 +182,23 @@ def run_all_role_tests(user_firstname, user_lastname, server="dev", account="MAS
         server: Server environment (dev, staging, prod)
         account: Account name for credentials (default: MASTER)
         generate_pdf: Whether to auto-generate PDF report after completion (default: True)
+        shard: Optional "i/N" to run only shard i of N (results go to a per-shard file)
+        queue_file: Optional work queue to claim combinations from instead of
+                    running the full list (results go to a per-worker file)
+        results_file: Optional results file for a full run (default: test_results/all_role_tests.json)
+        infer_expectations: Compute expected outcomes from the server's role
+                            definitions instead of role_test_configs.py
+        api_probes: Decide CRUD tests through the REST API (api_probes.py)
+                    instead of the browser where a probe exists
+        fixtures: Create the projects, users, controls etc. tests act on in
+                  bulk through the REST API before the run (fixture_factory.py)
+        restore_workflows: Route samples back to their captured workflow steps
+                           before each step-based test (workflow_state.py)
+        har: Optional HarSession recording each test's traffic, or replaying
+             the run from earlier recordings (har_replay.py)
+        run_id: Id shared by all shards of a run; their results go to
+                test_results/runs/<run_id>/ (required with shard; workers
+                default to the queue's run id)
     """
     print("=" * 80)
     print("COMPREHENSIVE ROLE TESTING SUITE")
@@ -47,13 +211,18 @@ def run_all_role_tests(user_firstname, user_lastname, server="dev", account="MAS
     # Get LIMS connection
     lims, username = get_lims_connection(account=account, server=server)
     
+    # Resolve every role and the user up front; later switches hit the cache
+    lookups = get_lookup_cache(lims)
+    lookups.prefetch_roles()
+    lookups.prefetch_researchers([(user_firstname, user_lastname)])
+    
     # Initialize user to Lab Operator (BTO) role only
     print("\n" + "=" * 80)
     print("INITIALIZING USER ROLE")
     print("=" * 80)
     
     # Get user and current roles
-    user = lims.researchers.query(firstname=[user_firstname], lastname=user_lastname)[0]
+    user = lookups.researcher(user_firstname, user_lastname)
     current_roles = [role.name for role in user.roles]
     
     print(f"\nCurrent roles for {user.username}:")
@@ -71,7 +240,7 @@ def run_all_role_tests(user_firstname, user_lastname, server="dev", account="MAS
             print("\n[1/2] Adding 'Lab Operator (BTO)' role")
             modify_user_role(lims, user_firstname, user_lastname, "Lab Operator (BTO)", action="add")
             # Refresh user to get updated roles
-            user = lims.researchers.query(firstname=[user_firstname], lastname=user_lastname)[0]
+            user = lookups.researcher(user_firstname, user_lastname)
             current_roles = [role.name for role in user.roles]
         else:
             print("\n[1/2] User already has 'Lab Operator (BTO)' role")
@@ -88,154 +257,144 @@ def run_all_role_tests(user_firstname, user_lastname, server="dev", account="MAS
             print("  No other roles to remove")
         
         # Verify final state
-        user = lims.researchers.query(firstname=[user_firstname], lastname=user_lastname)[0]
+        user = lookups.researcher(user_firstname, user_lastname)
         final_roles = [role.name for role in user.roles]
         print(f"\n✓ User now has only: {', '.join(final_roles)}")
     
     print("=" * 80)
     
-    # Get list of MAIN roles to test
-    main_role_names = list(MAIN_ROLE_TEST_SUITES.keys())
-    addon_role_names = list(ADD_ON_ROLE_TEST_SUITES.keys())
+    # Expand roles into combinations and pick this host's shard
+    combinations = build_combinations(MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES)
+    partial_run = bool(queue_file or shard)
+    resolver = None
+    if infer_expectations:
+        resolver = ExpectationResolver(lims, server=server)
+        combinations = apply_inferred_expectations(combinations, resolver)
+        print("\nExpected outcomes inferred from role definitions on the server")
+    run_info = None
+    if queue_file:
+        run_id = run_id or WorkQueue(queue_file).run_id()
+        results_file = worker_results_file(default_worker_id(), run_id)
+        run_info = {"id": run_id, "worker": default_worker_id()}
+    elif shard:
+        if not run_id:
+            raise ValueError("A sharded run needs a run id shared by all its shards")
+        shard_index, shard_count = parse_shard(shard)
+        durations = estimate_durations(combinations, load_test_history())
+        combinations = select_shard(combinations, shard_index, shard_count, durations)
+        results_file = shard_results_file(shard_index, shard_count, run_id)
+        run_info = {"id": run_id, "shard": [shard_index, shard_count]}
+        print(f"\nShard {shard_index}/{shard_count}: {len(combinations)} combination(s), "
+              f"~{sum(durations[c['name']] for c in combinations) / 60:.1f} min estimated")
+        for combination in combinations:
+            print(f"  - {combination['name']}")
     
-    # Handle "Not Logged In" specially - test once without add-ons
-    # This role doesn't require role assignment and won't be tested with add-ons
-    if "Not Logged In" in main_role_names:
-        print("\n" + "=" * 80)
-        print(f"TESTING SPECIAL ROLE: Not Logged In (no add-ons)")
-        print("=" * 80)
-        test_suite = MAIN_ROLE_TEST_SUITES["Not Logged In"]
-        tester = RolePermissionTester(server=server, role_name="Not Logged In")
-        tester.run_test_suite(test_suite)
-        print(f"\n✓ Completed: Not Logged In")
-        
-        # Remove from main list - won't be tested with add-on combinations
-        main_role_names.remove("Not Logged In")
+    # One tester and browser for the whole run; each combination switches
+    # roles in place instead of starting a new browser
+    tester = RolePermissionTester(server=server, role_name=NOT_LOGGED_IN, results_file=results_file)
+    tester.run_info = run_info
+    tester.har = har
+    tester.start_browser()
+    tester.teardown = get_teardown(server)
+    probes = None
+    if api_probes:
+        from api_probes import ApiProbeEngine
+        probes = ApiProbeEngine(server=server)
+    factory = None
+    if fixtures:
+        from api_probes import PROBES
+        from fixture_factory import FixtureFactory, count_fixtures
+        factory = FixtureFactory(server=server, account=account)
+        tester.fixture_factory = factory
+    workflows = None
+    if restore_workflows:
+        from workflow_state import WorkflowState
+        workflows = WorkflowState(server=server, account=account)
+        tester.workflow_state = workflows
+    completed = total = 0
     
-    # Ensure "Lab Operator (BTO)" is first in the test list (since we initialized to it)
-    if "Lab Operator (BTO)" in main_role_names:
-        main_role_names.remove("Lab Operator (BTO)")
-        main_role_names.insert(0, "Lab Operator (BTO)")
-    
-    # Process each MAIN role with all ADD_ON role combinations
-    total_main_roles = len(main_role_names)
-    
-    for main_idx, main_role in enumerate(main_role_names, start=1):
-        print("\n" + "=" * 80)
-        print(f"MAIN ROLE {main_idx}/{total_main_roles}: {main_role}")
-        print(f"Will test: Base + {len(addon_role_names)} add-on combinations")
-        print("=" * 80)
-        
-        # Step 1: Assign the MAIN role (remove previous MAIN role if exists)
-        if main_idx == 1 and main_role == "Lab Operator (BTO)":
-            print(f"\nMAIN role '{main_role}' already assigned (initialization)")
+    try:
+        if factory is not None and not queue_file:
+            # Queue workers don't know their combinations yet; they create on demand
+            factory.prepare(count_fixtures(combinations, skip=PROBES if probes is not None else ()))
+        previous_main_role = None
+        if queue_file:
+            completed, total, previous_main_role = run_queue_worker(
+                tester, WorkQueue(queue_file), lims, user_firstname, user_lastname, resolver, probes
+            )
         else:
-            # Add new MAIN role
-            print(f"\nAssigning MAIN role: {main_role}")
-            try:
-                modify_user_role(lims, user_firstname, user_lastname, main_role, action="add")
-            except Exception as e:
-                print(f"Error adding MAIN role {main_role}: {e}")
-                print("Skipping this MAIN role...")
-                continue
-            
-            # Remove previous MAIN role (if this isn't the first one)
-            if main_idx > 1:
-                previous_main_role = main_role_names[main_idx - 2]
-                print(f"Removing previous MAIN role: {previous_main_role}")
-                try:
-                    modify_user_role(lims, user_firstname, user_lastname, previous_main_role, action="remove")
-                except Exception as e:
-                    print(f"Warning: Could not remove previous MAIN role {previous_main_role}: {e}")
-        
-        # Step 2: Test the MAIN role by itself (no add-ons)
-        print("\n" + "-" * 80)
-        print(f"Testing: {main_role} (BASE - no add-ons)")
-        print("-" * 80)
-        
-        main_test_suite = MAIN_ROLE_TEST_SUITES[main_role]
-        tester = RolePermissionTester(server=server, role_name=f"{main_role} (BASE)")
-        tester.run_test_suite(main_test_suite)
-        
-        print(f"\n✓ Completed: {main_role} (BASE)")
-        
-        # Step 3: Test MAIN role with each ADD_ON role
-        previous_addon = None
+            total = len(combinations)
+            for idx, combination in enumerate(combinations, start=1):
+                main_role = combination["roles"][0] if combination["roles"] else None
+                if previous_main_role and main_role != previous_main_role:
+                    print(f"\nAutomatically continuing to next MAIN role: {main_role}")
+                    print("(Press Ctrl+C to stop if needed)")
+                    time.sleep(2)  # Brief pause to allow Ctrl+C if user wants to stop
+                previous_main_role = main_role
+                
+                print("\n" + "=" * 80)
+                print(f"COMBINATION {idx}/{total}: {combination['name']}")
+                print("=" * 80)
+                if run_combination(tester, combination, lims, user_firstname, user_lastname, probes):
+                    completed += 1
+                    print(f"\n✓ Completed: {combination['name']}")
         
-        for addon_idx, addon_role in enumerate(addon_role_names, start=1):
-            print("\n" + "-" * 80)
-            print(f"Testing: {main_role} + {addon_role} ({addon_idx}/{len(addon_role_names)})")
-            print("-" * 80)
-            
-            # Add the ADD_ON role
-            print(f"\n[1/3] Adding ADD_ON role: {addon_role}")
+        # Clean up: leave the user with the last MAIN role only
+        if previous_main_role:
+            print(f"\nCleaning up ADD_ON roles, keeping: {previous_main_role}")
             try:
-                modify_user_role(lims, user_firstname, user_lastname, addon_role, action="add")
+                set_user_roles(lims, user_firstname, user_lastname, [previous_main_role])
             except Exception as e:
-                print(f"Error adding ADD_ON role {addon_role}: {e}")
-                print("Skipping this add-on combination...")
-                continue
-            
-            # Remove previous ADD_ON role (if exists)
-            if previous_addon:
-                print(f"[2/3] Removing previous ADD_ON role: {previous_addon}")
-                try:
-                    modify_user_role(lims, user_firstname, user_lastname, previous_addon, action="remove")
-                except Exception as e:
-                    print(f"Warning: Could not remove previous ADD_ON role {previous_addon}: {e}")
-            else:
-                print("[2/3] No previous ADD_ON role to remove")
-            
-            # Combine test suites: MAIN + ADD_ON permissions
-            print(f"[3/3] Running combined permission tests")
-            combined_test_suite = {}
-            combined_test_suite.update(main_test_suite)  # Add MAIN role tests
-            combined_test_suite.update(ADD_ON_ROLE_TEST_SUITES[addon_role])  # Add ADD_ON role tests
-            
-            # Run combined tests
-            combined_role_name = f"{main_role} + {addon_role}"
-            tester = RolePermissionTester(server=server, role_name=combined_role_name)
-            tester.run_test_suite(combined_test_suite)
-            
-            print(f"\n✓ Completed: {main_role} + {addon_role}")
-            
-            # Update previous addon for next iteration
-            previous_addon = addon_role
-        
-        # Clean up: Remove the last ADD_ON role after testing all combinations
-        if previous_addon:
-            print(f"\nCleaning up ADD_ON role: {previous_addon}")
-            try:
-                modify_user_role(lims, user_firstname, user_lastname, previous_addon, action="remove")
-            except Exception as e:
-                print(f"Warning: Could not remove ADD_ON role {previous_addon}: {e}")
-        
-        print("\n" + "=" * 80)
-        print(f"COMPLETED MAIN ROLE: {main_role}")
-        print(f"Tested {1 + len(addon_role_names)} combinations (BASE + {len(addon_role_names)} add-ons)")
-        print("=" * 80)
-        
-        # Automatically continue to next MAIN role
-        if main_idx < total_main_roles:
-            next_main_role = main_role_names[main_idx]
-            print(f"\nAutomatically continuing to next MAIN role: {next_main_role}")
-            print("(Press Ctrl+C to stop if needed)")
-            import time
-            time.sleep(2)  # Brief pause to allow Ctrl+C if user wants to stop
+                print(f"Warning: Could not remove ADD_ON roles: {e}")
+    
+    finally:
+        tester.close_browser()
+        if probes is not None:
+            probes.close()
+        if factory is not None:
+            factory.cleanup()
+            factory.close()
+        if workflows is not None:
+            workflows.close()
+        tester.teardown.close()
+        if har is not None:
+            har.save_index()
     
     print("\n" + "=" * 80)
     print("COMPREHENSIVE ROLE TESTING COMPLETE")
     print("=" * 80)
-    print(f"Total MAIN roles tested: {main_idx}")
+    print(f"Total combinations tested: {completed}/{total}")
+    connections = connection_stats()
+    print(f"LIMS connections: {connections['created']} created, {connections['reused']} reused")
+    lookup_stats = lookups.stats()
+    print(f"Role/user lookups: {lookup_stats['hits']} cached, {lookup_stats['misses']} fetched")
+    breaker_stats = get_circuit_breaker(server).stats()
+    if breaker_stats["trips"]:
+        print(f"Server outages: {breaker_stats['trips']} (paused {breaker_stats['paused'] / 60:.1f} min)")
+    tester.teardown.print_summary()
+    if readiness.report():
+        readiness.print_report()
+        readiness_name = os.path.splitext(os.path.basename(tester.results_file))[0]
+        print(f"Readiness report: {readiness.save_report(readiness_name)}")
+    if har is not None:
+        har.print_summary()
+    if workflows is not None:
+        workflow_stats = workflows.stats()
+        print(f"Workflow restores: {workflow_stats['restores']} ({workflow_stats['routed']} sample(s) routed, "
+              f"{workflow_stats['seconds']}s)")
+    if partial_run:
+        print(f"Partial results saved to: {results_file}")
+        print(f"Combine partial results with: python merge_results.py --run {run_info['id']} --pdf")
     print("=" * 80)
     
-    # Generate PDF report if requested
-    if generate_pdf:
+    # Generate PDF report if requested (shards and workers are reported after merging)
+    if generate_pdf and not partial_run:
         print("\n" + "=" * 80)
         print("GENERATING PDF REPORT")
         print("=" * 80)
         try:
-            pdf_generator = PDFReportGenerator()
+            from generate_pdf_report import PDFReportGenerator  # reportlab is only needed here
+            pdf_generator = PDFReportGenerator(json_file=tester.results_file)
             pdf_file = pdf_generator.generate_pdf()
             print(f"\n✓ PDF report available at: {pdf_file}")
         except Exception as e:
@@ -244,6 +403,74 @@ def run_all_role_tests(user_firstname, user_lastname, server="dev", account="MAS
         print("=" * 80)
 
 
+def _run_server_process(user_firstname, user_lastname, server, account, log_file, infer_expectations=False,
+                        api_probes=False, fixtures=False, restore_workflows=False):
+    """Child process body for run_multi_server(): one full matrix run, logged to a file."""
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    with open(log_file, "w", buffering=1) as log:
+        sys.stdout = sys.stderr = log
+        run_all_role_tests(
+            user_firstname=user_firstname,
+            user_lastname=user_lastname,
+            server=server,
+            account=account,
+            generate_pdf=False,
+            results_file=server_results_file(server),
+            infer_expectations=infer_expectations,
+            api_probes=api_probes,
+            fixtures=fixtures,
+            restore_workflows=restore_workflows
+        )
+
+
+def run_multi_server(user_firstname, user_lastname, servers, account="MASTER", infer_expectations=False,
+                     api_probes=False, fixtures=False, restore_workflows=False):
+    """
+    Run the full matrix against several servers concurrently.
+    
+    Each server runs in its own process with its own browser and results
+    file. When all have finished, the results are lined up into a
+    cross-server parity view.
+    
+    Args:
+        user_firstname: First name of the user (must exist on every server)
+        user_lastname: Last name of the user
+        servers: List of server names, e.g. ["dev", "staging", "prod"]
+        account: Account name for credentials (default: MASTER)
+        infer_expectations: Infer each server's expected outcomes from its own
+                            role definitions
+        api_probes: Decide CRUD tests through the REST API where possible
+        fixtures: Create test fixtures through the REST API before each run
+        restore_workflows: Restore captured workflow placements before step-based tests
+    """
+    print("=" * 80)
+    print(f"MULTI-SERVER ROLE TESTING: {', '.join(servers)}")
+    print("=" * 80)
+    
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+    for server in servers:
+        log_file = f"test_results/servers/run_{server}.log"
+        process = context.Process(
+            target=_run_server_process,
+            args=(user_firstname, user_lastname, server, account, log_file, infer_expectations, api_probes,
+                  fixtures, restore_workflows),
+            name=f"role-audit-{server}"
+        )
+        process.start()
+        processes[server] = process
+        print(f"Started {server} (pid {process.pid}), log: {log_file}")
+    
+    for server, process in processes.items():
+        process.join()
+        status = "✓ finished" if process.exitcode == 0 else f"⚠ exited with code {process.exitcode}"
+        print(f"{server}: {status}")
+    
+    view = build_parity_view(load_server_results(servers))
+    print_parity_view(view)
+    save_parity_view(view)
+
+
 def main():
     """Main entry point."""
     parser = argparse.ArgumentParser(
@@ -254,6 +481,18 @@ Examples:
   python run_all_roles.py "Emil" "Test"
   python run_all_roles.py "Emil" "Test" --server dev
   python run_all_roles.py "John" "Doe" --server staging --account MASTER
+  python run_all_roles.py "Emil" "Test" --shard 1/3 --run-id nightly-42   # on host 1 of 3
+  python merge_results.py --run nightly-42 --pdf                        # after all shards finish
+  python run_all_roles.py --enqueue                    # fill the work queue once
+  python run_all_roles.py "Emil" "Test" --worker       # start as many workers as needed
+  python run_all_roles.py "Emil" "Test" --servers dev,staging,prod
+  python run_all_roles.py "Emil" "Test" --infer-expectations
+  python run_all_roles.py "Emil" "Test" --api-probes
+  python run_all_roles.py "Emil" "Test" --fixtures
+  python run_all_roles.py "Emil" "Test" --restore-workflows
+  python run_all_roles.py --preflight                  # check the setup without starting a run
+  python run_all_roles.py "Emil" "Test" --record-har   # save each test's traffic
+  python run_all_roles.py "Emil" "Test" --replay-har   # re-run from it, offline
   
 This script will:
   1. Initialize user to Lab Operator (BTO) role only
@@ -275,32 +514,154 @@ Example testing flow for Lab Operator (BTO):
 """
     )
     
-    parser.add_argument("firstname",
+    parser.add_argument("firstname", nargs="?",
                        help="First name of the user to test")
-    parser.add_argument("lastname",
+    parser.add_argument("lastname", nargs="?",
                        help="Last name of the user to test")
     parser.add_argument("-s", "--server",
                        default="dev",
-                       choices=["dev", "staging", "prod"],
+                       choices=SERVER_NAMES,
                        help="Server environment (default: dev)")
+    parser.add_argument("--servers",
+                       metavar="LIST",
+                       help="Comma-separated servers to test concurrently, or 'all' "
+                            "(e.g. dev,staging,prod). Produces a cross-server parity view.")
     parser.add_argument("-a", "--account",
                        default="MASTER",
                        help="Account name for credentials (default: MASTER)")
     parser.add_argument("--no-pdf",
                        action="store_true",
                        help="Skip PDF report generation (default: generate PDF)")
+    parser.add_argument("--shard",
+                       metavar="i/N",
+                       help="Run only shard i of N, balanced by historical run time. "
+                            "Each host should test its own user.")
+    parser.add_argument("--run-id",
+                       help="Id shared by every shard of a run (required with --shard); partial results "
+                            "go to test_results/runs/<run id>/. Workers default to the queue's run id.")
+    
+    parser.add_argument("--enqueue",
+                       nargs="?", const=DEFAULT_QUEUE_FILE, metavar="QUEUE",
+                       help=f"Add all combinations to a work queue and exit (default: {DEFAULT_QUEUE_FILE})")
+    parser.add_argument("--worker",
+                       nargs="?", const=DEFAULT_QUEUE_FILE, metavar="QUEUE",
+                       help="Claim and run combinations from a work queue until it is empty. "
+                            "Each worker should test its own user.")
+    parser.add_argument("--infer-expectations",
+                       action="store_true",
+                       help="Compute expected outcomes from the server's role definitions "
+                            "instead of the True/False values in role_test_configs.py")
+    parser.add_argument("--api-probes",
+                       action="store_true",
+                       help="Decide CRUD tests (controls, reagent kits, processes, users, roles) "
+                            "through the REST API instead of the browser")
+    parser.add_argument("--fixtures",
+                       action="store_true",
+                       help="Create the projects, users, controls etc. that tests act on in bulk "
+                            "through the REST API before the run, and delete them afterwards")
+    parser.add_argument("--preflight",
+                       action="store_true",
+                       help="Check dependencies, test modules, credentials and the results folder, then exit")
+    parser.add_argument("--restore-workflows",
+                       action="store_true",
+                       help="Before each step-based test, route samples back to the workflow steps "
+                            "captured with 'python workflow_state.py capture'")
+    har_mode = parser.add_mutually_exclusive_group()
+    har_mode.add_argument("--record-har",
+                       nargs="?", const="", metavar="DIR",
+                       help="Record each test's browser traffic to a HAR file, and the LIMS calls to a "
+                            "cassette, for replay (default: test_results/har/<server>)")
+    har_mode.add_argument("--replay-har",
+                       nargs="?", const="", metavar="DIR",
+                       help="Run the suite from recordings made with --record-har, without the server "
+                            "(default: test_results/har/<server>)")
     
     args = parser.parse_args()
+    if args.preflight:
+        from preflight import run_options, run_preflight
+        options = run_options(args.no_pdf, args.infer_expectations)
+        sys.exit(0 if run_preflight(args.server, accounts=(args.account, "TEST"), options=options) else 1)
+    if args.enqueue:
+        enqueue_combinations(args.enqueue)
+        return
+    if not args.firstname or not args.lastname:
+        parser.error("firstname and lastname are required")
+    if args.shard and args.worker:
+        parser.error("--shard and --worker cannot be combined")
+    if (args.record_har is not None or args.replay_har is not None) and (
+            args.servers or args.shard or args.worker or args.fixtures or args.restore_workflows or args.api_probes):
+        parser.error("--record-har/--replay-har cannot be combined with --servers, --shard, --worker, "
+                     "--fixtures, --restore-workflows or --api-probes")
+    if args.servers:
+        servers = LIVE_SERVER_NAMES if args.servers == "all" else [s.strip() for s in args.servers.split(",")]
+        unknown = [s for s in servers if s not in SERVER_NAMES]
+        if unknown:
+            parser.error(f"Unknown server(s): {', '.join(unknown)}")
+        if args.shard or args.worker:
+            parser.error("--servers cannot be combined with --shard or --worker")
+        run_multi_server(args.firstname, args.lastname, servers, account=args.account,
+                         infer_expectations=args.infer_expectations, api_probes=args.api_probes,
+                         fixtures=args.fixtures, restore_workflows=args.restore_workflows)
+        return
+    if args.shard:
+        try:
+            parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if not args.run_id:
+            parser.error("--shard needs --run-id, the same on every host, so merge_results.py "
+                         "can tell this run's shards from older ones")
+    elif args.run_id and not args.worker:
+        parser.error("--run-id only applies to --shard and --worker")
+    har = None
+    results_file = None
+    if args.record_har is not None or args.replay_har is not None:
+        har, results_file = _har_session(args)
     
     run_all_role_tests(
         user_firstname=args.firstname,
         user_lastname=args.lastname,
         server=args.server,
         account=args.account,
-        generate_pdf=not args.no_pdf
+        generate_pdf=not args.no_pdf,
+        shard=args.shard,
+        queue_file=args.worker,
+        infer_expectations=args.infer_expectations,
+        api_probes=args.api_probes,
+        fixtures=args.fixtures,
+        restore_workflows=args.restore_workflows,
+        results_file=results_file,
+        har=har,
+        run_id=args.run_id
     )
 
 
+def _har_session(args):
+    """
+    HarSession for --record-har/--replay-har, with its LIMS cassette and deep-link ids switched on.
+    
+    Returns:
+        tuple: (HarSession, results file); replays save their results next to
+               the recordings instead of over the live results
+    """
+    from har_replay import RECORD, REPLAY, HarSession, har_directory
+    
+    replaying = args.replay_har is not None
+    directory = har_directory(args.server, args.replay_har if replaying else args.record_har)
+    try:
+        har = HarSession(directory, REPLAY if replaying else RECORD, base_url(args.server))
+    except FileNotFoundError as e:
+        sys.exit(f"Error: {e}")
+    # get_lims_connection() picks the cassette up for role switches and cleanup
+    os.environ["ROLE_AUDIT_CASSETTE"] = har.cassette_path
+    os.environ["ROLE_AUDIT_CASSETTE_MODE"] = har.mode
+    # The page objects' deep links use the ids recorded with the HARs, and only those in replay
+    os.environ["ROLE_AUDIT_DEEP_LINKS"] = har.deep_links_path
+    os.environ["ROLE_AUDIT_DEEP_LINKS_MODE"] = har.mode
+    print(f"{'Replaying' if replaying else 'Recording'} HARs: {directory}")
+    return har, os.path.join(directory, "replay_results.json") if replaying else None
+
+
 if __name__ == "__main__":
     main()
 
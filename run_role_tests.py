@@ -9,6 +9,7 @@ import sys
 import argparse
 from role_permission_tester import RolePermissionTester
 from role_test_configs import MAIN_ROLE_TEST_SUITES, ADD_ON_ROLE_TEST_SUITES
+from clarity_servers import SERVER_NAMES
 
 def main():
     """Main entry point for role testing."""
@@ -28,7 +29,7 @@ Special options:
 Examples:
   python run_role_tests.py "Lab Operator"
   python run_role_tests.py "Lab Operator" --server dev
-  python run_role_tests.py "System Admin" -s test
+  python run_role_tests.py "System Admin" -s staging
 """.format("\n".join(f"  - {role}" for role in MAIN_ROLE_TEST_SUITES.keys()))
     )
     
@@ -36,7 +37,7 @@ Examples:
                        help="Role name to test (use quotes for names with spaces)")
     parser.add_argument("-s", "--server", 
                        default="dev",
-                       choices=["dev", "test", "prod", "stage"],
+                       choices=SERVER_NAMES,
                        help="Server environment (default: dev)")
     
     args = parser.parse_args()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Cross-Server Parity View
+========================
+Compares role test results from several Clarity servers (dev, staging, prod)
+and lists every role combination and test whose outcome differs between them.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from clarity_servers import LIVE_SERVER_NAMES
+from role_matrix import server_results_file
+
+DEFAULT_PARITY_FILE = "test_results/servers/server_parity.json"
+
+
+def build_parity_view(results_by_server):
+    """
+    Line up results from several servers by combination and test.
+
+    Args:
+        results_by_server: Dict of server name -> results data (the JSON saved
+                           by RolePermissionTester)
+
+    Returns:
+        dict: "servers", "timestamp", "combinations" (combination -> test ->
+              server -> outcome) and "mismatches" (tests whose outcome differs
+              or that did not run on every server)
+    """
+    servers = list(results_by_server.keys())
+    combinations = {}
+    for server, data in results_by_server.items():
+        for combination, tests in data.get("tests", {}).items():
+            for test in tests:
+                outcome = {
+                    "passed": test.get("passed"),
+                    "result": test.get("result"),
+                    "expected": test.get("expected"),
+                }
+                combinations.setdefault(combination, {}).setdefault(test.get("test_name"), {})[server] = outcome
+
+    mismatches = []
+    for combination, tests in combinations.items():
+        for test_name, outcomes in tests.items():
+            observed = {server: outcomes[server]["passed"] for server in servers if server in outcomes}
+            missing = [server for server in servers if server not in outcomes]
+            if missing or len(set(observed.values())) > 1:
+                mismatches.append({
+                    "combination": combination,
+                    "test_name": test_name,
+                    "passed": observed,
+                    "missing": missing,
+                })
+
+    return {
+        "servers": servers,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "combinations": combinations,
+        "mismatches": mismatches,
+    }
+
+
+def print_parity_view(view):
+    """Print a summary of the parity view."""
+    servers = view["servers"]
+    total = sum(len(tests) for tests in view["combinations"].values())
+    print("\n" + "=" * 80)
+    print(f"CROSS-SERVER PARITY: {', '.join(servers)}")
+    print("=" * 80)
+    print(f"Combination/test pairs compared: {total}")
+    print(f"Differences: {len(view['mismatches'])}")
+
+    for mismatch in view["mismatches"]:
+        cells = []
+        for server in servers:
+            if server in mismatch["missing"]:
+                cells.append(f"{server}=not run")
+            else:
+                cells.append(f"{server}={'✓' if mismatch['passed'][server] else '✗'}")
+        print(f"  {mismatch['combination']} / {mismatch['test_name']}: {'  '.join(cells)}")
+
+    if not view["mismatches"]:
+        print("\n✓ All servers agree")
+
+
+def save_parity_view(view, filename=DEFAULT_PARITY_FILE):
+    """Save the parity view as JSON."""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(view, f, indent=2)
+    print(f"\nParity view saved to: {filename}")
+    return filename
+
+
+def load_server_results(servers):
+    """
+    Load each server's results from its per-server results file.
+
+    Servers without a results file are skipped with a warning.
+    """
+    results_by_server = {}
+    for server in servers:
+        path = server_results_file(server)
+        try:
+            with open(path, "r") as f:
+                results_by_server[server] = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: No results for {server} ({path}): {e}")
+    return results_by_server
+
+
+def main():
+    """Build the parity view from existing per-server results."""
+    parser = argparse.ArgumentParser(description="Compare role test results across Clarity servers")
+    parser.add_argument("servers", nargs="*", default=LIVE_SERVER_NAMES,
+                        help=f"Servers to compare (default: {' '.join(LIVE_SERVER_NAMES)})")
+    parser.add_argument("-o", "--output", default=DEFAULT_PARITY_FILE,
+                        help=f"Parity view JSON file (default: {DEFAULT_PARITY_FILE})")
+    args = parser.parse_args()
+
+    results_by_server = load_server_results(args.servers)
+    if len(results_by_server) < 2:
+        print("Error: Need results from at least two servers to compare.")
+        sys.exit(1)
+
+    view = build_parity_view(results_by_server)
+    print_parity_view(view)
+    save_parity_view(view, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Teardown
+========
+Cleans up after permission tests through the API, in batches, instead of
+clicking through the UI one sample or entity at a time:
+
+  - unassign_workflows(project)   every sample of a project leaves its
+                                  workflows in one routing call
+  - delete_entities(uris)         created projects, users, controls etc.
+                                  are deleted concurrently
+  - delete_named(path, tag, ...)  same, looked up by name first
+  - restore_roles(...)            temporary role grants (e.g. System Admin
+                                  (BTO) for setup) are dropped in one commit
+
+Every action is logged with what it cleaned and how long it took; the run
+summary prints the totals.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 8
+DELETED = (200, 204, 404)
+
+
+class Teardown:
+    """Batched API cleanup for one server."""
+
+    def __init__(self, server="dev", account="MASTER", workers=DEFAULT_WORKERS, api=None):
+        """
+        Args:
+            server: Server environment
+            account: Stored account used for cleanup
+            workers: Concurrent delete requests
+            api: Existing ClarityAPI client to share instead of opening one
+        """
+        self.server = server
+        self.account = account
+        self.workers = workers
+        self._api = api
+        self._workflows = None
+        self._lock = threading.Lock()
+        self.log = []
+
+    @property
+    def api(self):
+        """REST client, opened on first use (role restores don't need one)."""
+        if self._api is None:
+            from clarity_api import ClarityAPI
+            self._api = ClarityAPI.for_account(self.server, self.account, pool_size=self.workers)
+        return self._api
+
+    def _record(self, action, target, count, start, errors=()):
+        entry = {
+            "action": action,
+            "target": target,
+            "count": count,
+            "seconds": round(time.time() - start, 2),
+            "errors": list(errors),
+        }
+        with self._lock:
+            self.log.append(entry)
+        if count or errors:
+            print(f"  Teardown: {action} {count} ({target}) in {entry['seconds']}s"
+                  f"{f', {len(errors)} failed' if errors else ''}")
+        return entry
+
+    def unassign_workflows(self, project):
+        """
+        Remove every sample of a project from the workflows it is queued in.
+
+        Returns:
+            int: Number of samples unassigned
+        """
+        from workflow_state import WorkflowState
+
+        start = time.time()
+        if self._workflows is None:
+            self._workflows = WorkflowState(self.server, api=self.api)
+        placements = self._workflows.placements(project)
+        # Analytes in progress in a step can't be routed; only queued ones are unassigned
+        changes = {}
+        for uri, entry in placements.items():
+            queued = [s for s in entry["stages"] if s["status"] == "QUEUED"]
+            if queued:
+                changes[uri] = (queued, [])
+        if changes:
+            try:
+                self._workflows.route(changes)
+            except RuntimeError as e:
+                raise RuntimeError(f"Unassigning '{project}' failed: {e}")
+        self._record("unassigned sample(s) from workflows", project, len(changes), start)
+        return len(changes)
+
+    def delete_entities(self, uris, target="created entities"):
+        """
+        Delete entities concurrently; already deleted ones (404) count as done.
+
+        Returns:
+            list: URIs that could not be deleted
+        """
+        start = time.time()
+        uris = list(uris)
+
+        def delete(uri):
+            try:
+                return uri, self.api.delete(uri).status_code in DELETED
+            except Exception:
+                return uri, False
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            outcomes = list(pool.map(delete, uris))
+        leftovers = [uri for uri, ok in outcomes if not ok]
+        self._record("deleted", target, len(uris) - len(leftovers), start, leftovers)
+        return leftovers
+
+    def delete_named(self, path, tag, **params):
+        """
+        Delete the entities a list query finds, e.g. delete_named("projects", "project", name="X").
+
+        Returns:
+            int: Number deleted
+        """
+        from clarity_api import list_uris
+
+        uris = list_uris(self.api.get(path, params=params), tag)
+        target = f"{path} {', '.join(f'{k}={v}' for k, v in params.items())}"
+        leftovers = self.delete_entities(uris, target=target)
+        if leftovers:
+            raise RuntimeError(f"Could not delete: {', '.join(leftovers)}")
+        return len(uris)
+
+    def restore_roles(self, lims, user_firstname, user_lastname, role_names):
+        """
+        Give the user exactly role_names again, dropping temporary grants.
+
+        Reads the user from the lookup cache, so when nothing changed there is
+        no request at all.
+
+        Returns:
+            list: Role names that were removed or added back
+        """
+        from change_role import get_lookup_cache, set_user_roles
+
+        start = time.time()
+        user = get_lookup_cache(lims).researcher(user_firstname, user_lastname)
+        current = {r.name for r in user.roles}
+        changed = sorted(current.symmetric_difference(role_names))
+        if changed:
+            set_user_roles(lims, user_firstname, user_lastname, role_names)
+        self._record("restored role(s)", f"{user_firstname} {user_lastname}: {', '.join(changed)}",
+                     len(changed), start)
+        return changed
+
+    def summary(self):
+        """
+        Totals per action.
+
+        Returns:
+            dict: Action -> {"count", "seconds", "errors"}
+        """
+        totals = {}
+        with self._lock:
+            for entry in self.log:
+                total = totals.setdefault(entry["action"], {"count": 0, "seconds": 0.0, "errors": 0})
+                total["count"] += entry["count"]
+                total["seconds"] = round(total["seconds"] + entry["seconds"], 2)
+                total["errors"] += len(entry["errors"])
+        return totals
+
+    def print_summary(self):
+        for action, total in self.summary().items():
+            if total["count"] or total["errors"]:
+                failed = f" ({total['errors']} failed)" if total["errors"] else ""
+                print(f"Teardown {action}: {total['count']} in {total['seconds']}s{failed}")
+
+    def close(self):
+        if self._api is not None:
+            self._api.close()
+            self._api = None
+
+
+_teardowns = {}
+
+
+def get_teardown(server):
+    """Shared Teardown for a server (one per process)."""
+    if server not in _teardowns:
+        _teardowns[server] = Teardown(server)
+    return _teardowns[server]
@@ -0,0 +1,82 @@
+"""
+Tests for lims_cassette: several accounts recording into one cassette.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lims_cassette
+from lims_cassette import RECORD, REPLAY, CassetteMiss, CassetteResponse, ReplayedError, cassette_username, use_cassette
+
+URI = "https://clarity.example/api/v2/researchers/42"
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = CassetteResponse(status_code, "")
+
+
+class FakeLims:
+    """A LIMS connection answering each URI from a dict (or raising)."""
+
+    def __init__(self, answers=None):
+        self.answers = answers or {}
+
+    def request(self, method, uri, xml_data=None):
+        answer = self.answers[uri]
+        if isinstance(answer, Exception):
+            raise answer
+        return CassetteResponse(200, answer, {"Content-Type": "application/xml"}, uri)
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    """Each test starts like a new process."""
+    lims_cassette._cassettes.clear()
+    yield
+    lims_cassette._cassettes.clear()
+
+
+def test_accounts_record_into_one_cassette_and_replay_their_own_calls(tmp_path):
+    path = str(tmp_path / "lims.cassette")
+    master = FakeLims({URI: "<researcher>master view</researcher>"})
+    test = FakeLims({URI: HTTPError(403)})
+    use_cassette(master, path, RECORD, username="master_user", account="MASTER")
+    cassette = use_cassette(test, path, RECORD, username="test_user", account="TEST")
+
+    assert master.request("GET", URI).text == "<researcher>master view</researcher>"
+    with pytest.raises(HTTPError):
+        test.request("GET", URI)
+    assert master.cassette is test.cassette is cassette
+    cassette.save()
+
+    lims_cassette._cassettes.clear()
+    assert cassette_username(path, "MASTER") == "master_user"
+    assert cassette_username(path, "TEST") == "test_user"
+
+    master, test = FakeLims(), FakeLims()
+    use_cassette(master, path, REPLAY, account="MASTER")
+    use_cassette(test, path, REPLAY, account="TEST")
+    assert master.request("GET", URI).text == "<researcher>master view</researcher>"
+    with pytest.raises(ReplayedError) as error:
+        test.request("GET", URI)
+    assert error.value.response.status_code == 403
+
+
+def test_replay_misses_calls_another_account_never_made(tmp_path):
+    path = str(tmp_path / "lims.cassette")
+    master = FakeLims({URI: "<researcher/>"})
+    cassette = use_cassette(master, path, RECORD, username="master_user", account="MASTER")
+    master.request("GET", URI)
+    cassette.save()
+
+    lims_cassette._cassettes.clear()
+    test = FakeLims()
+    use_cassette(test, path, REPLAY, account="TEST")
+    with pytest.raises(CassetteMiss):
+        test.request("GET", URI)
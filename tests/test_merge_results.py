@@ -0,0 +1,50 @@
+"""
+Tests for merge_results: only one run's shards are merged.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import role_matrix
+from merge_results import merge_results, run_files
+from role_matrix import shard_results_file
+
+
+@pytest.fixture
+def runs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(role_matrix, "RUNS_DIR", str(tmp_path / "runs"))
+    return tmp_path
+
+
+def write_shard(index, count, run_id, combination):
+    path = shard_results_file(index, count, run_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"server": "dev", "timestamp": f"2026-10-19 10:00:0{index}",
+                   "run": {"id": run_id, "shard": [index, count]}, "tests": {combination: []}}, f)
+    return path
+
+
+def test_run_files_leave_out_other_runs(runs_dir):
+    write_shard(1, 2, "old", "Stale")
+    write_shard(1, 2, "new", "A")
+    write_shard(2, 2, "new", "B")
+    merged = merge_results(run_files("new"), str(runs_dir / "merged.json"))
+    assert sorted(merged["tests"]) == ["A", "B"]
+
+
+def test_shards_of_different_splits_are_rejected(runs_dir):
+    files = [write_shard(1, 3, "nightly", "A"), write_shard(2, 4, "nightly", "B")]
+    with pytest.raises(ValueError, match="different splits"):
+        merge_results(files, str(runs_dir / "merged.json"))
+
+
+def test_files_of_different_runs_are_rejected(runs_dir):
+    files = [write_shard(1, 2, "old", "A"), write_shard(2, 2, "new", "B")]
+    with pytest.raises(ValueError, match="different runs"):
+        merge_results(files, str(runs_dir / "merged.json"))
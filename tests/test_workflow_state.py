@@ -0,0 +1,68 @@
+"""
+Tests for workflow_state: which analytes get routed, and how.
+"""
+
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workflow_state import diff_placements, routing_xml
+
+WORKFLOW = "https://clarity.example/api/v2/configuration/workflows/1"
+QC = WORKFLOW + "/stages/1"
+PREP = WORKFLOW + "/stages/2"
+ROOT = "https://clarity.example/api/v2/artifacts/2-1"
+DERIVED = "https://clarity.example/api/v2/artifacts/2-2"
+
+
+def stage(uri, status="QUEUED"):
+    return {"uri": uri, "name": uri.rsplit("/", 1)[-1], "workflow_uri": WORKFLOW, "status": status}
+
+
+def placed(name, *stages):
+    return {"name": name, "stages": list(stages)}
+
+
+def routes(body):
+    """[(action, stage URI, [artifact URIs])] in a routing body."""
+    return [(action, uri, re.findall(r'<artifact uri="([^"]+)"/>', artifacts))
+            for action, uri, artifacts in re.findall(r'<(assign|unassign) stage-uri="([^"]+)">(.*?)</\1>', body)]
+
+
+def test_unchanged_placements_send_nothing():
+    current = {ROOT: placed("S1", stage(QC))}
+    wanted = {ROOT: placed("S1", stage(QC))}
+    changes = diff_placements(current, wanted)
+    assert changes == {}
+    assert routing_xml(changes) == []
+
+
+def test_derived_analyte_missing_from_snapshot_is_routed_out():
+    current = {ROOT: placed("S1", stage(QC)), DERIVED: placed("S1", stage(PREP))}
+    wanted = {ROOT: placed("S1", stage(QC))}
+    changes = diff_placements(current, wanted)
+    assert list(changes) == [DERIVED]
+    assert [routes(body) for body in routing_xml(changes)] == [[("unassign", PREP, [DERIVED])]]
+
+
+def test_moving_within_a_workflow_unassigns_only_the_stage_left():
+    current = {ROOT: placed("S1", stage(PREP))}
+    wanted = {ROOT: placed("S1", stage(QC))}
+    bodies = routing_xml(diff_placements(current, wanted))
+    # Unassigns are sent before assigns, and never by workflow
+    assert [routes(body) for body in bodies] == [[("unassign", PREP, [ROOT])], [("assign", QC, [ROOT])]]
+    assert "workflow-uri" not in "".join(bodies)
+
+
+def test_stages_kept_on_both_sides_are_left_alone():
+    current = {ROOT: placed("S1", stage(QC), stage(PREP))}
+    wanted = {ROOT: placed("S1", stage(QC))}
+    assert [routes(body) for body in routing_xml(diff_placements(current, wanted))] == [
+        [("unassign", PREP, [ROOT])]]
+
+
+def test_analyte_placed_nowhere_now_is_assigned_back():
+    wanted = {ROOT: placed("S1", stage(QC))}
+    assert [routes(body) for body in routing_xml(diff_placements({}, wanted))] == [[("assign", QC, [ROOT])]]
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Matrix Work Queue
+=================
+A job queue stored in a local SQLite file. `run_all_roles.py --enqueue`
+adds role combinations, and any number of `run_all_roles.py --worker`
+processes claim and run them until the queue is empty.
+
+A claimed job is hidden from other workers for a visibility timeout. If the
+worker dies and stops sending heartbeats, the job becomes visible again and
+another worker retries it, up to max_attempts.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_QUEUE_FILE = "test_results/matrix_queue.db"
+DEFAULT_VISIBILITY_TIMEOUT = 1800  # seconds a claim stays hidden without a heartbeat
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    ready_at REAL NOT NULL,
+    enqueued_at REAL NOT NULL,
+    claimed_at REAL,
+    visible_at REAL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS claims (
+    job_id INTEGER NOT NULL,
+    worker TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    latency REAL NOT NULL,
+    finished_at REAL,
+    outcome TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority);
+"""
+
+
+def default_worker_id():
+    """Worker id of this process, e.g. "host-1:4242"."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Work-stealing job queue backed by a SQLite file."""
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Open (and create if needed) a queue file.
+
+        Args:
+            path: SQLite file shared by all producers and workers
+            visibility_timeout: Seconds a claimed job stays hidden without a heartbeat
+            max_attempts: Claims allowed per job before it is marked failed
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """Open a connection; each thread and process uses its own."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Exclusive write transaction, so a job is never claimed twice."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, name, payload, priority=0):
+        """
+        Add a job. Re-enqueueing an existing name is a no-op.
+
+        Args:
+            name: Unique job name (the role combination name)
+            payload: JSON-serializable job data
+            priority: Higher priorities are claimed first
+
+        Returns:
+            bool: True if the job was added
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO jobs (name, payload, priority, ready_at, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (name, json.dumps(payload), priority, now, now)
+            )
+            return cursor.rowcount == 1
+
+    def run_id(self):
+        """
+        Id of the run this queue holds: the file name and when its first job
+        was enqueued, e.g. "matrix_queue-20261019-140512". A queue that is
+        deleted and filled again gets a new id.
+        """
+        conn = self._connect()
+        try:
+            first = conn.execute("SELECT MIN(enqueued_at) FROM jobs").fetchone()[0]
+        finally:
+            conn.close()
+        name = os.path.splitext(os.path.basename(self.path))[0]
+        return f"{name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(first))}" if first else name
+
+    def claim(self, worker_id):
+        """
+        Claim the highest-priority visible job.
+
+        Jobs whose claim expired (the worker died) are visible again. Expired
+        jobs that already used max_attempts are marked failed instead.
+
+        Returns:
+            dict: Job with "id", "name", "payload" and "attempts", or None if
+                  nothing is available
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                "error = COALESCE(error, 'Worker stopped responding') "
+                "WHERE status = 'claimed' AND visible_at < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', ready_at = visible_at "
+                "WHERE status = 'claimed' AND visible_at < ?",
+                (now,)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'claimed', attempts = attempts + 1, worker = ?, "
+                "claimed_at = ?, visible_at = ? WHERE id = ?",
+                (worker_id, now, now + self.visibility_timeout, row["id"])
+            )
+            conn.execute(
+                "INSERT INTO claims (job_id, worker, claimed_at, latency) VALUES (?, ?, ?, ?)",
+                (row["id"], worker_id, now, now - row["ready_at"])
+            )
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "payload": json.loads(row["payload"]),
+            "attempts": row["attempts"] + 1,
+        }
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        Extend the claim on a job.
+
+        Returns:
+            bool: False if the claim was lost (it expired and another worker took it)
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET visible_at = ? WHERE id = ? AND worker = ? AND status = 'claimed'",
+                (time.time() + self.visibility_timeout, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    @contextmanager
+    def keep_alive(self, job_id, worker_id, interval=None):
+        """Send heartbeats for a job from a background thread while the block runs."""
+        interval = interval or max(self.visibility_timeout / 3, 1)
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                if not self.heartbeat(job_id, worker_id):
+                    print(f"Warning: Lost claim on job {job_id}")
+                    return
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, job_id, worker_id):
+        """
+        Mark a claimed job as done.
+
+        Returns:
+            bool: False if the worker had lost its claim (the job is left to its new owner)
+        """
+        return self._finish(job_id, worker_id, "done", None)
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """
+        Record a failed attempt. The job is re-queued while attempts remain.
+
+        Returns:
+            bool: False if the worker had lost its claim (the job is left to its new owner)
+        """
+        return self._finish(job_id, worker_id, "failed", str(error), retry=retry)
+
+    def _finish(self, job_id, worker_id, outcome, error, retry=False):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if retry and row is not None and row["attempts"] < self.max_attempts:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL, ready_at = ?, error = ? "
+                    "WHERE id = ? AND worker = ? AND status = 'claimed'",
+                    (now, error, job_id, worker_id)
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, error = ? "
+                    "WHERE id = ? AND worker = ? AND status = 'claimed'",
+                    (outcome, now, error, job_id, worker_id)
+                )
+            owned = cursor.rowcount == 1
+            # A claim another worker took over is closed as lost, not credited to this worker
+            conn.execute(
+                "UPDATE claims SET finished_at = ?, outcome = ? "
+                "WHERE job_id = ? AND worker = ? AND finished_at IS NULL",
+                (now, outcome if owned else "lost", job_id, worker_id)
+            )
+            return owned
+
+    def stats(self):
+        """
+        Queue metrics for monitoring.
+
+        Returns:
+            dict: "depth" (job count per status), "claim_latency" (seconds a
+                  job waited to be claimed: count/avg/p95/max) and "workers"
+                  (per-worker completed/failed/lost counts and jobs per hour)
+        """
+        conn = self._connect()
+        try:
+            depth = {"queued": 0, "claimed": 0, "done": 0, "failed": 0}
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+                depth[row["status"]] = row["n"]
+
+            latencies = sorted(r["latency"] for r in conn.execute("SELECT latency FROM claims"))
+            claim_latency = {"count": len(latencies)}
+            if latencies:
+                claim_latency.update({
+                    "avg": round(sum(latencies) / len(latencies), 2),
+                    "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                    "max": round(latencies[-1], 2),
+                })
+
+            workers = {}
+            for row in conn.execute(
+                "SELECT worker, SUM(outcome = 'done') AS done, SUM(outcome = 'failed') AS failed, "
+                "SUM(outcome = 'lost') AS lost, "
+                "MIN(claimed_at) AS first, MAX(COALESCE(finished_at, claimed_at)) AS last "
+                "FROM claims GROUP BY worker"
+            ):
+                hours = max((row["last"] - row["first"]) / 3600, 1 / 3600)
+                workers[row["worker"]] = {
+                    "done": row["done"] or 0,
+                    "failed": row["failed"] or 0,
+                    "lost": row["lost"] or 0,
+                    "jobs_per_hour": round((row["done"] or 0) / hours, 2),
+                }
+            return {"depth": depth, "claim_latency": claim_latency, "workers": workers}
+        finally:
+            conn.close()
+
+
+def print_stats(stats):
+    """Print queue metrics in the run log format."""
+    depth = stats["depth"]
+    print("Queue depth: " + ", ".join(f"{status}={count}" for status, count in depth.items()))
+    latency = stats["claim_latency"]
+    if latency["count"]:
+        print(f"Claim latency: avg {latency['avg']}s, p95 {latency['p95']}s, max {latency['max']}s "
+              f"({latency['count']} claims)")
+    for worker, worker_stats in sorted(stats["workers"].items()):
+        lost = f", {worker_stats['lost']} lost" if worker_stats.get("lost") else ""
+        print(f"  {worker}: {worker_stats['done']} done, {worker_stats['failed']} failed{lost}, "
+              f"{worker_stats['jobs_per_hour']} jobs/hour")
+
+
+def main():
+    """Print metrics for a queue file."""
+    parser = argparse.ArgumentParser(description="Show role matrix work queue metrics")
+    parser.add_argument("queue", nargs="?", default=DEFAULT_QUEUE_FILE,
+                        help=f"Queue file (default: {DEFAULT_QUEUE_FILE})")
+    parser.add_argument("--json", action="store_true", help="Print metrics as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.queue):
+        print(f"Error: Queue file '{args.queue}' not found.")
+        sys.exit(1)
+
+    stats = WorkQueue(args.queue).stats()
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    else:
+        print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
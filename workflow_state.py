@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Workflow State
+==============
+Snapshot and restore where a project's samples sit in their workflows.
+
+Step-based tests (move to next step, requeue, rework, remove from workflow)
+need the samples in ED_TEST queued at particular steps, and each of them
+leaves the samples somewhere else. Instead of rebuilding that state through
+the UI, capture it once while it is right:
+
+    python workflow_state.py capture ED_TEST
+
+and the tester puts it back through the API before every test that declares
+
+    WORKFLOW_STATE = ("ED_TEST",)
+
+Every analyte of the project's samples is tracked, not just the root ones:
+when a step (move to next step, rework) creates output analytes, those are
+queued at later stages, and a restore takes them out again. Reading the
+current placements takes an artifact query and one batch retrieve; putting
+them back unassigns each analyte from exactly the stages it has to leave,
+then assigns it to the stages it is missing, as two routing calls so the
+unassigns are done before anything is queued. When nothing moved, nothing
+is sent. Snapshots live in test_results/workflow_state/.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+from clarity_api import ClarityAPI, list_uris, xml_escape
+from clarity_servers import SERVER_NAMES
+
+SNAPSHOT_DIR = "test_results/workflow_state"
+PLACED = ("QUEUED", "IN_PROGRESS")  # stage statuses that mean "the analyte is here now"
+
+
+def _local(tag):
+    """Tag name without its namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _links(uris, rel):
+    links = "".join(f'<link uri="{xml_escape(uri)}" rel="{rel}"/>' for uri in uris)
+    return f'<ri:links xmlns:ri="http://genologics.com/ri">{links}</ri:links>'
+
+
+def snapshot_file(server, project):
+    return os.path.join(SNAPSHOT_DIR, server, f"{project}.json")
+
+
+def diff_placements(current, wanted):
+    """
+    Analytes whose placements differ from the snapshot.
+
+    Analytes that are placed now but not in the snapshot (outputs of steps
+    run since) are expected nowhere, so they are routed out.
+
+    Args:
+        current: Placements now (see WorkflowState.placements())
+        wanted: Placements in the snapshot
+
+    Returns:
+        dict: Artifact URI -> (current stages, wanted stages), for analytes
+              that have to be routed
+    """
+    changes = {}
+    for uri in list(wanted) + [uri for uri in current if uri not in wanted]:
+        now = current.get(uri, {}).get("stages", [])
+        then = wanted.get(uri, {}).get("stages", [])
+        if {s["uri"] for s in now} != {s["uri"] for s in then}:
+            changes[uri] = (now, then)
+    return changes
+
+
+def _routing(action, stages):
+    """<routing> body with one <assign>/<unassign> per stage, or None if there is nothing to route."""
+    if not stages:
+        return None
+    body = "".join(
+        f'<{action} stage-uri="{xml_escape(stage)}">'
+        + "".join(f'<artifact uri="{xml_escape(u)}"/>' for u in uris)
+        + f"</{action}>"
+        for stage, uris in stages.items()
+    )
+    return f'<rt:routing xmlns:rt="http://genologics.com/ri/routing">{body}</rt:routing>'
+
+
+def routing_xml(changes):
+    """
+    Routing requests for all changes, to be sent in order.
+
+    Each analyte is unassigned from exactly the stages it is in but shouldn't
+    be, and assigned to the snapshot stages it is missing; stages it is in on
+    both sides are left alone. The unassigns go in the first request, so no
+    assign depends on the order Clarity applies a mixed request in.
+
+    Returns:
+        list: Up to two routing XML bodies (unassigns, then assigns)
+    """
+    unassign, assign = {}, {}
+    for uri, (now, wanted) in changes.items():
+        now_uris = {s["uri"] for s in now}
+        wanted_uris = {s["uri"] for s in wanted}
+        for stage in now:
+            if stage["uri"] not in wanted_uris:
+                unassign.setdefault(stage["uri"], []).append(uri)
+        for stage in wanted:
+            if stage["uri"] not in now_uris:
+                assign.setdefault(stage["uri"], []).append(uri)
+    return [body for body in (_routing("unassign", unassign), _routing("assign", assign)) if body]
+
+
+class WorkflowState:
+    """Captures and restores sample placements for projects on one server."""
+
+    def __init__(self, server="dev", account="MASTER", api=None):
+        """
+        Args:
+            server: Server environment
+            account: Stored account used to read and route samples
+            api: Existing ClarityAPI client to share instead of opening one
+        """
+        self.server = server
+        self.api = api or ClarityAPI.for_account(server, account)
+        self._snapshots = {}
+        self._samples = {}  # project -> sample LIMS ids
+        self._lock = threading.Lock()
+        self.restores = self.routed = 0
+        self.restore_time = 0.0
+
+    def _batch_retrieve(self, kind, uris):
+        """Batch retrieve entities, returning their XML elements."""
+        if not uris:
+            return []
+        response = self.api.post(f"{kind}/batch/retrieve", _links(uris, kind))
+        if response.status_code != 200:
+            raise RuntimeError(f"Retrieving {kind} failed: HTTP {response.status_code} {response.text[:200]}")
+        return list(ET.fromstring(response.content))
+
+    def sample_ids(self, project):
+        """LIMS ids of a project's samples (cached; samples don't change)."""
+        if project not in self._samples:
+            sample_uris = list_uris(self.api.get("samples", params={"projectname": project}), "sample")
+            if not sample_uris:
+                raise RuntimeError(f"No samples found in project '{project}'")
+            self._samples[project] = [uri.split("?")[0].rstrip("/").rsplit("/", 1)[-1] for uri in sample_uris]
+        return self._samples[project]
+
+    def analyte_uris(self, project):
+        """
+        URIs of every analyte of a project's samples: the root analytes and
+        the outputs of the steps run on them. Queried every time, since steps
+        keep adding analytes.
+        """
+        response = self.api.get("artifacts", params={"samplelimsid": self.sample_ids(project), "type": "Analyte"})
+        if response.status_code != 200:
+            raise RuntimeError(f"Listing analytes of '{project}' failed: HTTP {response.status_code} "
+                               f"{response.text[:200]}")
+        return list(dict.fromkeys(uri.split("?")[0] for uri in list_uris(response, "artifact")))
+
+    def route(self, changes):
+        """
+        Send the routing requests for changes (see routing_xml()).
+
+        Raises:
+            RuntimeError: If Clarity rejects a request
+        """
+        for body in routing_xml(changes):
+            response = self.api.post("route/artifacts", body)
+            if response.status_code not in (200, 204):
+                raise RuntimeError(f"Routing failed: HTTP {response.status_code} {response.text[:200]}")
+
+    def placements(self, project):
+        """
+        Where each of a project's analytes is queued or in progress right now.
+
+        Returns:
+            dict: Artifact URI -> {"name", "stages": [{"uri", "name",
+                  "workflow_uri", "status"}]}; analytes placed nowhere are
+                  left out
+        """
+        placements = {}
+        for artifact in self._batch_retrieve("artifacts", self.analyte_uris(project)):
+            name = next((c.text for c in artifact if _local(c.tag) == "name"), "")
+            stages = []
+            for group in artifact:
+                if _local(group.tag) != "workflow-stages":
+                    continue
+                for stage in group:
+                    if stage.get("status") in PLACED:
+                        uri = stage.get("uri")
+                        stages.append({
+                            "uri": uri,
+                            "name": stage.get("name"),
+                            "workflow_uri": uri.split("/stages/")[0],
+                            "status": stage.get("status"),
+                        })
+            if stages:
+                placements[artifact.get("uri").split("?")[0]] = {"name": name, "stages": stages}
+        return placements
+
+    def capture(self, project):
+        """Save the project's current placements as its snapshot."""
+        placements = self.placements(project)
+        path = snapshot_file(self.server, project)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "project": project,
+                "server": self.server,
+                "captured": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "placements": placements,
+            }, f, indent=2)
+        self._snapshots[project] = placements
+        return placements
+
+    def snapshot(self, project):
+        """The saved snapshot of a project."""
+        if project not in self._snapshots:
+            path = snapshot_file(self.server, project)
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"No workflow snapshot for '{project}' on {self.server}. "
+                    f"Run: python workflow_state.py capture {project} --server {self.server}"
+                )
+            with open(path, "r") as f:
+                self._snapshots[project] = json.load(f)["placements"]
+        return self._snapshots[project]
+
+    def restore(self, project):
+        """
+        Route the project's samples back to their snapshot placements.
+
+        Analytes in progress in a step they should leave cannot be routed
+        away; they are reported and left alone.
+
+        Returns:
+            int: Number of analytes routed
+        """
+        start = time.time()
+        with self._lock:
+            wanted = self.snapshot(project)
+            current = self.placements(project)
+            changes = diff_placements(current, wanted)
+            for uri, (now, then) in list(changes.items()):
+                then_uris = {s["uri"] for s in then}
+                if any(s["status"] == "IN_PROGRESS" and s["uri"] not in then_uris for s in now):
+                    name = (wanted.get(uri) or current[uri])["name"]
+                    print(f"  Warning: {name} is in progress in a step and can't be restored")
+                    del changes[uri]
+            if changes:
+                try:
+                    self.route(changes)
+                except RuntimeError as e:
+                    raise RuntimeError(f"Restoring '{project}' failed: {e}")
+            self.restores += 1
+            self.routed += len(changes)
+            self.restore_time += time.time() - start
+        if changes:
+            print(f"Workflow state of '{project}' restored: {len(changes)} sample(s) routed "
+                  f"({time.time() - start:.1f}s)")
+        return len(changes)
+
+    def stats(self):
+        return {"restores": self.restores, "routed": self.routed, "seconds": round(self.restore_time, 1)}
+
+    def close(self):
+        self.api.close()
+
+
+def main():
+    """Capture, check or restore a project's workflow placements."""
+    parser = argparse.ArgumentParser(
+        description="Snapshot and restore sample workflow placements",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python workflow_state.py capture ED_TEST      # save the current placements
+  python workflow_state.py diff ED_TEST         # what moved since the snapshot
+  python workflow_state.py restore ED_TEST      # put the samples back
+"""
+    )
+    parser.add_argument("command", choices=["capture", "diff", "restore"])
+    parser.add_argument("project", help="Project name, e.g. ED_TEST")
+    parser.add_argument("-s", "--server", default="dev", choices=SERVER_NAMES, help="Server environment (default: dev)")
+    args = parser.parse_args()
+
+    state = WorkflowState(server=args.server)
+    try:
+        if args.command == "capture":
+            placements = state.capture(args.project)
+            print(f"Captured {len(placements)} sample(s) in '{args.project}' to "
+                  f"{snapshot_file(args.server, args.project)}")
+            for entry in placements.values():
+                stages = ", ".join(s["name"] for s in entry["stages"]) or "(not in a workflow)"
+                print(f"  {entry['name']}: {stages}")
+        elif args.command == "diff":
+            current, wanted = state.placements(args.project), state.snapshot(args.project)
+            changes = diff_placements(current, wanted)
+            if not changes:
+                print(f"'{args.project}' matches its snapshot")
+            for uri, (now, then) in changes.items():
+                print(f"  {(wanted.get(uri) or current[uri])['name']}: "
+                      f"{', '.join(s['name'] for s in now) or '(none)'} -> "
+                      f"{', '.join(s['name'] for s in then) or '(none)'}")
+            sys.exit(1 if changes else 0)
+        else:
+            state.restore(args.project)
+    finally:
+        state.close()
+
+
+if __name__ == "__main__":
+    main()